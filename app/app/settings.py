@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/2.1/ref/settings/
 """
 
 import os
+import tempfile
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -54,6 +55,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.db_router.ReplicaRoutingMiddleware',
 ]
 
 ROOT_URLCONF = 'app.urls'
@@ -90,6 +92,38 @@ DATABASES = {
     }
 }
 
+# 읽기 전용 replica, DB_REPLICA_HOSTS 에 쉼표로 구분하여 지정(replica1, replica2, ...)
+# 테스트에서는 default 의 mirror 로 동작하므로 로컬에서도 두 alias 로 테스트할 수 있음
+DATABASE_REPLICAS = []
+for number, host in enumerate(filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')), 1):
+    DATABASES[f'replica{number}'] = dict(DATABASES['default'], HOST=host.strip(), TEST={'MIRROR': 'default'})
+    DATABASE_REPLICAS.append(f'replica{number}')
+
+# recipe, tag, ingredient 를 user 별로 나누어 저장하는 shard, default 가 첫 번째 shard
+# DB_SHARD_NAMES 에 쉼표로 구분한 DB 이름을 지정하면 shard1, shard2, ... alias 가 추가 됨
+DATABASE_SHARDS = ['default']
+for number, name in enumerate(filter(None, os.environ.get('DB_SHARD_NAMES', '').split(',')), 1):
+    DATABASES[f'shard{number}'] = dict(DATABASES['default'], NAME=name.strip())
+    DATABASE_SHARDS.append(f'shard{number}')
+
+DATABASE_ROUTERS = ['core.sharding.ShardRouter', 'core.db_router.ReplicaRouter']
+
+# Cache
+# 같은 호스트의 worker 프로세스들이 함께 사용하는 SQLite(WAL) 캐시
+# 경로는 CACHE_LOCATION 으로 지정, 테스트는 core.test_runner 가 실행마다 임시 경로를 사용
+
+CACHES = {
+    'default': {
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.environ.get('CACHE_LOCATION', os.path.join(tempfile.gettempdir(), 'app-cache.sqlite3')),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+        },
+    }
+}
+
+TEST_RUNNER = 'core.test_runner.TestRunner'
+
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
 
@@ -134,3 +168,83 @@ STATIC_ROOT = '/vol/web/static'
 
 
 AUTH_USER_MODEL = 'core.User'
+
+
+# 서명된 access / refresh 토큰의 수명(초)
+SIGNED_TOKEN_ACCESS_LIFETIME = 5 * 60
+SIGNED_TOKEN_REFRESH_LIFETIME = 14 * 24 * 60 * 60
+# 토큰 세대 번호를 캐시에 보관하는 시간(초)
+SIGNED_TOKEN_GENERATION_CACHE_TIMEOUT = 60
+
+# /api/batch/ 요청 하나에 담을 수 있는 최대 요청 수와 동시에 실행할 스레드 수
+BATCH_MAX_REQUESTS = 20
+BATCH_MAX_WORKERS = 4
+
+# delta sync 에서 이전 cursor 보다 앞으로 겹쳐서 조회하는 시간(초)
+SYNC_CURSOR_OVERLAP = 1
+
+# Server-Sent Events 변경 스트림
+# 새 이벤트를 확인하는 간격, 쉬는 연결에 보내는 heartbeat 간격, 한 연결의 최대 시간(초)
+SSE_POLL_INTERVAL = 1
+SSE_HEARTBEAT = 15
+SSE_MAX_DURATION = 5 * 60
+# 재연결한 클라이언트가 놓친 이벤트를 받을 수 있도록 이벤트를 남겨두는 시간(초)과 최대 개수
+SSE_EVENT_TTL = 10 * 60
+SSE_MAX_BACKLOG = 1000
+# 연결이 끊어진 클라이언트가 다시 연결하기까지 기다리는 시간(ms)
+SSE_RETRY_MS = 3000
+# 프로세스마다 동시에 열 수 있는 스트림 수, 연결마다 worker thread 를 하나씩 잡고 있으므로
+# worker 의 thread 수보다 작게 두어 다른 요청을 처리할 thread 를 남김
+SSE_MAX_SUBSCRIBERS = int(os.environ.get('SSE_MAX_SUBSCRIBERS', 50))
+
+# 프로세스마다 메모리에 유지하는 recipe 유사도 색인의 최대 유저 수
+RECIPE_INDEX_MAX_USERS = 1000
+
+# 응답 렌더링과 요청 파싱에 orjson 기반 renderer / parser 를 사용
+# Accept / Content-Type 이 application/msgpack 이면 MessagePack 을 사용
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.FastJSONRenderer',
+        'core.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'core.renderers.FastJSONParser',
+        'core.renderers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+    # 모든 worker 가 함께 사용하는 캐시의 token bucket 으로 요청 수를 제한
+    'DEFAULT_THROTTLE_CLASSES': (
+        'core.throttling.UserRateThrottle',
+        'core.throttling.AnonRateThrottle',
+    ),
+    'DEFAULT_THROTTLE_RATES': {
+        'user': os.environ.get('THROTTLE_USER_RATE', '1200/min'),
+        'anon': os.environ.get('THROTTLE_ANON_RATE', '120/min'),
+        'login': os.environ.get('THROTTLE_LOGIN_RATE', '20/min'),
+    },
+}
+
+# 이 값보다 행이 많을 것으로 추정되면 COUNT(*) 대신 추정값을 사용(admin 페이지 등)
+ESTIMATED_COUNT_THRESHOLD = 100000
+# API 목록의 전체 수를 정확하게 세는 최대 행 수, 넘으면 추정값을 응답
+LIST_EXACT_COUNT_THRESHOLD = 1000
+
+# 계정 삭제, recipe 일괄 삭제에서 한 트랜잭션에 삭제하는 행 수
+DELETION_BATCH_SIZE = 200
+# RUNNING 상태로 이 시간(초) 동안 진행이 없는 삭제 작업은 멈춘 것으로 보고 다시 실행
+DELETION_JOB_STALE_AFTER = 10 * 60
+
+# 쓰기 요청을 보낸 사용자를 replica 대신 primary 에서 읽도록 고정하는 시간(초)
+REPLICA_PIN_SECONDS = 5
+
+# shard 마다 id 가 겹치지 않도록 shard 번호 * SHARD_ID_RANGE 부터 id 를 사용
+SHARD_ID_RANGE = 100000000
+# 유저의 shard 위치를 캐시하는 시간(초), shard 를 옮기는 도구는 위치를 바꾼 뒤 이만큼 기다림
+SHARD_CACHE_TIMEOUT = 5
+
+# 업로드 이미지의 헤더만 읽어 확인하는 제한, 넘으면 디코딩하지 않고 거절
+IMAGE_MAX_BYTES = 10 * 1024 * 1024
+IMAGE_MAX_PIXELS = 40 * 1000 * 1000
+IMAGE_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
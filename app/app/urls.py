@@ -18,9 +18,12 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
 
+from core.views import BatchView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/user/', include('user.tests.urls')),
     path('api/recipe/', include('recipe.urls')),
+    path('api/batch/', BatchView.as_view(), name='batch'),
 ]
 urlpatterns += static(prefix=settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
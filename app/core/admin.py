@@ -1,13 +1,135 @@
+from django.conf import settings
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.core.paginator import Paginator
+from django.http import QueryDict
+from django.utils.functional import cached_property
 from django.utils.translation import gettext as _
 
-from .models import User, Tag, Ingredient, Recipe
+from .counting import estimate_count
+from .models import User, Tag, Ingredient, IngredientName, Recipe, DeletionJob
+from .sharding import use_shard
 
+SHARD_PARAM = 'shard'
+SHARD_SESSION_KEY = 'admin_shard'
 
-class UserAdmin(BaseUserAdmin):
+
+class EstimatedCountPaginator(Paginator):
+    """큰 테이블은 COUNT(*) 대신 추정한 행 수로 페이지를 나누는 paginator"""
+
+    @cached_property
+    def count(self):
+        return estimate_count(self.object_list)
+
+
+class ScalableAdminMixin:
+    """
+    행이 많아도 changelist 가 느려지지 않도록 하는 설정
+
+    전체 행 수를 따로 세지 않고, 결과 수는 추정값을 사용한다
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class ShardListFilter(admin.SimpleListFilter):
+    """changelist 에서 볼 shard 를 고르는 filter, 실제 조회는 ShardAdminMixin 이 정한 shard 를 사용"""
+    title = 'shard'
+    parameter_name = SHARD_PARAM
+
+    def lookups(self, request, model_admin):
+        self.current = model_admin.get_shard(request)
+        return [(alias, alias) for alias in settings.DATABASE_SHARDS]
+
+    def has_output(self):
+        return len(self.lookup_choices) > 1
+
+    def choices(self, changelist):
+        # 전체 shard 를 한 번에 볼 수는 없으므로 'All' 은 두지 않음
+        for lookup, title in self.lookup_choices:
+            yield {
+                'selected': lookup == self.current,
+                'query_string': changelist.get_query_string({self.parameter_name: lookup}),
+                'display': title,
+            }
+
+    def queryset(self, request, queryset):
+        return queryset
+
+
+class ShardAdminMixin:
+    """
+    shard 가 여러 개일 때 admin 화면이 사용할 shard 를 정하는 설정
+
+    ?shard= 로 고른 shard 를 세션에 기억하고, admin view 안에서 유저를 알 수 없는 쿼리는
+    그 shard 로 보낸다(use_shard). user 는 default DB 에 있으므로 join 하지 않고 따로 읽음
+    """
+
+    def get_shard(self, request):
+        shard = request.GET.get(SHARD_PARAM) \
+            or QueryDict(request.GET.get('_changelist_filters', '')).get(SHARD_PARAM) \
+            or request.session.get(SHARD_SESSION_KEY)
+        if shard not in settings.DATABASE_SHARDS:
+            shard = settings.DATABASE_SHARDS[0]
+
+        return shard
+
+    def _sharded(self, view, request, *args, **kwargs):
+        shard = self.get_shard(request)
+        if request.GET.get(SHARD_PARAM):
+            request.session[SHARD_SESSION_KEY] = shard
+        with use_shard(shard):
+            response = view(request, *args, **kwargs)
+            # TemplateResponse 는 view 가 끝난 뒤에 렌더링 되므로 shard 를 지정한 채로 렌더링
+            if callable(getattr(response, 'render', None)):
+                response.render()
+
+        return response
+
+    def changelist_view(self, request, *args, **kwargs):
+        return self._sharded(super().changelist_view, request, *args, **kwargs)
+
+    def changeform_view(self, request, *args, **kwargs):
+        return self._sharded(super().changeform_view, request, *args, **kwargs)
+
+    def delete_view(self, request, *args, **kwargs):
+        return self._sharded(super().delete_view, request, *args, **kwargs)
+
+    def history_view(self, request, *args, **kwargs):
+        return self._sharded(super().history_view, request, *args, **kwargs)
+
+    def autocomplete_view(self, request, *args, **kwargs):
+        return self._sharded(super().autocomplete_view, request, *args, **kwargs)
+
+    def get_list_filter(self, request):
+        # shard 가 하나이면 filter 는 보이지 않고 ?shard= 만 받음
+        return [ShardListFilter, *super().get_list_filter(request)]
+
+    def _joins_user(self):
+        # shard 의 user 테이블은 비어 있으므로 join 하면 행이 사라짐
+        return len(settings.DATABASE_SHARDS) > 1 and isinstance(self.list_select_related, (list, tuple)) \
+            and 'user' in self.list_select_related
+
+    def get_list_select_related(self, request):
+        select_related = super().get_list_select_related(request)
+        if self._joins_user():
+            return [name for name in select_related if name != 'user']
+
+        return select_related
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if self._joins_user():
+            queryset = queryset.prefetch_related('user')
+
+        return queryset
+
+
+class UserAdmin(ScalableAdminMixin, BaseUserAdmin):
     ordering = ['id']
     list_display = ['email', 'name']
+    # email 은 unique 이므로 인덱스를 타는 앞부분 일치 검색만 허용
+    search_fields = ['email__startswith']
     fieldsets = (
         (None, {'fields': ('email', 'password')}),
         (_('Personal Info'), {'fields': ('name',)}),
@@ -25,7 +147,50 @@ class UserAdmin(BaseUserAdmin):
     )
 
 
+class NameAdmin(ShardAdminMixin, ScalableAdminMixin, admin.ModelAdmin):
+    """Tag, Ingredient 의 admin, recipe 폼의 autocomplete 에서도 사용"""
+    ordering = ['-id']
+    list_display = ['name', 'user']
+    list_select_related = ['user']
+    raw_id_fields = ['user']
+    search_fields = ['name__startswith']
+
+
+class IngredientAdmin(NameAdmin):
+    """이름은 IngredientName 에 있으므로 join 하여 검색"""
+    list_select_related = ['user', 'catalog']
+    raw_id_fields = ['user', 'catalog']
+    search_fields = ['catalog__name__startswith']
+
+
+class IngredientNameAdmin(ShardAdminMixin, ScalableAdminMixin, admin.ModelAdmin):
+    """유저들이 함께 쓰는 재료 이름"""
+    ordering = ['-id']
+    search_fields = ['name__startswith']
+
+
+class RecipeAdmin(ShardAdminMixin, ScalableAdminMixin, admin.ModelAdmin):
+    ordering = ['-id']
+    list_display = ['title', 'user', 'price', 'time_minutes']
+    list_select_related = ['user']
+    raw_id_fields = ['user']
+    # 전체 tag / ingredient 를 select 로 그리지 않고 검색하여 선택
+    autocomplete_fields = ['tags', 'ingredients']
+    search_fields = ['title__startswith']
+
+
+class DeletionJobAdmin(ScalableAdminMixin, admin.ModelAdmin):
+    """계정 삭제 작업의 진행 상황"""
+    ordering = ['-id']
+    list_display = ['user_id', 'status', 'stage', 'deleted', 'updated_at']
+    list_filter = ['status']
+    readonly_fields = ['user_id', 'status', 'stage', 'deleted', 'error', 'created_at', 'updated_at', 'finished_at']
+    exclude = ['user']
+
+
 admin.site.register(User, UserAdmin)
-admin.site.register(Tag)
-admin.site.register(Ingredient)
-admin.site.register(Recipe)
+admin.site.register(Tag, NameAdmin)
+admin.site.register(Ingredient, IngredientAdmin)
+admin.site.register(IngredientName, IngredientNameAdmin)
+admin.site.register(Recipe, RecipeAdmin)
+admin.site.register(DeletionJob, DeletionJobAdmin)
@@ -1,5 +1,17 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        """
+        alias 별 쿼리 수를 세도록 새 DB 연결에 execute wrapper 를 등록하고,
+        migrate 한 shard 의 id 범위를 설정
+        """
+        from .db_router import install_query_counter
+        from .sharding import configure_id_ranges
+        connection_created.connect(install_query_counter, dispatch_uid='core.query_counter')
+        post_migrate.connect(configure_id_ranges, sender=self, dispatch_uid='core.shard_id_ranges')
@@ -0,0 +1,254 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+# accessed 시각을 갱신하는 최소 간격(초). 조회할 때마다 쓰기가 일어나지 않도록
+# LRU 순서는 이 간격 단위로 근사한다.
+ACCESS_RESOLUTION = 1.0
+# cull 여부를 확인하는 쓰기 횟수 간격
+CULL_CHECK_INTERVAL = 100
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache ('
+    ' key TEXT PRIMARY KEY,'
+    ' value BLOB NOT NULL,'
+    ' expires REAL,'
+    ' accessed REAL NOT NULL'
+    ') WITHOUT ROWID',
+    'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)',
+    'CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)',
+    # throttle 의 token bucket, tat 는 bucket 이 가득 차는 시각(GCRA 의 theoretical arrival time)
+    'CREATE TABLE IF NOT EXISTS buckets ('
+    ' key TEXT PRIMARY KEY,'
+    ' tat REAL NOT NULL'
+    ') WITHOUT ROWID',
+)
+
+
+class SQLiteCache(BaseCache):
+    """
+    같은 호스트의 여러 worker 프로세스가 함께 사용하는 SQLite(WAL) 캐시
+
+    LOCATION 은 SQLite 파일 경로. 프로세스/스레드마다 연결을 하나씩 사용하고,
+    WAL 모드와 mmap 으로 읽기가 쓰기를 기다리지 않도록 한다.
+    정수 값은 그대로 저장하여 incr() 를 SQL 한 문장으로 원자적으로 처리한다.
+    MAX_ENTRIES 를 넘으면 만료된 항목과 오래 사용하지 않은 항목부터 삭제(LRU)
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        self._local = threading.local()
+
+    def _connection(self):
+        """현재 프로세스/스레드의 연결을 반환, fork 이후에는 새로 연결"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        conn = sqlite3.connect(self._path, timeout=5, isolation_level=None, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA mmap_size=268435456')
+        for statement in SCHEMA:
+            conn.execute(statement)
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        self._local.writes = 0
+
+        return conn
+
+    def _encode(self, value):
+        # bool 은 int 의 하위 클래스이므로 pickle 로 저장해야 타입이 유지 됨
+        if type(value) is int:
+            return value
+        return sqlite3.Binary(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+
+    def _decode(self, value):
+        if isinstance(value, int):
+            return value
+        return pickle.loads(value)
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+
+        return key
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('DELETE FROM cache WHERE key = ? AND expires <= ?', (key, now))
+            cursor = conn.execute(
+                'INSERT OR IGNORE INTO cache (key, value, expires, accessed) VALUES (?, ?, ?, ?)',
+                (key, self._encode(value), self.get_backend_timeout(timeout), now),
+            )
+            added = cursor.rowcount == 1
+        if added:
+            self._maybe_cull(conn)
+
+        return added
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        conn = self._connection()
+        row = conn.execute('SELECT value, expires, accessed FROM cache WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return default
+
+        value, expires, accessed = row
+        if expires is not None and expires <= now:
+            return default
+        if now - accessed > ACCESS_RESOLUTION:
+            conn.execute('UPDATE cache SET accessed = ? WHERE key = ?', (now, key))
+
+        return self._decode(value)
+
+    def get_many(self, keys, version=None):
+        key_map = {self._key(key, version): key for key in keys}
+        if not key_map:
+            return {}
+
+        now = time.time()
+        rows = self._connection().execute(
+            'SELECT key, value FROM cache WHERE key IN (%s) AND (expires IS NULL OR expires > ?)'
+            % ', '.join('?' * len(key_map)),
+            list(key_map) + [now],
+        ).fetchall()
+
+        return {key_map[key]: self._decode(value) for key, value in rows}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        conn = self._connection()
+        conn.execute(
+            'INSERT OR REPLACE INTO cache (key, value, expires, accessed) VALUES (?, ?, ?, ?)',
+            (key, self._encode(value), self.get_backend_timeout(timeout), time.time()),
+        )
+        self._maybe_cull(conn)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        cursor = self._connection().execute(
+            'UPDATE cache SET expires = ?, accessed = ? '
+            'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self.get_backend_timeout(timeout), now, key, now),
+        )
+
+        return cursor.rowcount == 1
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            cursor = conn.execute(
+                "UPDATE cache SET value = value + ?, accessed = ? "
+                "WHERE key = ? AND typeof(value) = 'integer' AND (expires IS NULL OR expires > ?)",
+                (delta, now, key, now),
+            )
+            if cursor.rowcount == 1:
+                return conn.execute('SELECT value FROM cache WHERE key = ?', (key,)).fetchone()[0]
+
+            row = conn.execute(
+                'SELECT value FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)', (key, now)
+            ).fetchone()
+            if row is None:
+                raise ValueError("Key '%s' not found" % key)
+            # 정수가 아닌 값(pickle)은 BaseCache 와 같이 읽고 다시 저장
+            new_value = self._decode(row[0]) + delta
+            conn.execute(
+                'UPDATE cache SET value = ?, accessed = ? WHERE key = ?',
+                (self._encode(new_value), now, key),
+            )
+
+        return new_value
+
+    def take_token(self, key, interval, capacity, version=None):
+        """
+        interval 초마다 하나씩 채워지는 capacity 크기의 bucket 에서 token 을 하나 꺼냄
+
+        꺼냈으면 0, 비어 있으면 다음 token 까지 기다려야 하는 시간(초)을 반환.
+        token 수 대신 bucket 이 가득 차는 시각 하나만 저장하여(GCRA) UPDATE 한 문장으로 원자적으로 처리한다.
+        """
+        key = self._key(key, version)
+        burst = interval * capacity
+        conn = self._connection()
+        for _ in range(3):
+            now = time.time()
+            cursor = conn.execute(
+                'UPDATE buckets SET tat = MAX(tat, ?) + ? WHERE key = ? AND MAX(tat, ?) + ? - ? <= ?',
+                (now, interval, key, now, interval, now, burst),
+            )
+            if cursor.rowcount == 1:
+                return 0.0
+            cursor = conn.execute('INSERT OR IGNORE INTO buckets (key, tat) VALUES (?, ?)', (key, now + interval))
+            if cursor.rowcount == 1:
+                return 0.0
+            row = conn.execute('SELECT tat FROM buckets WHERE key = ?', (key,)).fetchone()
+            # 그 사이에 다른 프로세스가 bucket 을 지웠거나(cull) 채워진 경우에만 다시 시도
+            if row is not None and row[0] + interval - now > burst:
+                return row[0] + interval - now - burst
+
+        return interval
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        row = self._connection().execute(
+            'SELECT 1 FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)', (key, time.time())
+        ).fetchone()
+
+        return row is not None
+
+    def delete(self, key, version=None):
+        key = self._key(key, version)
+        self._connection().execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        if keys:
+            self._connection().execute(
+                'DELETE FROM cache WHERE key IN (%s)' % ', '.join('?' * len(keys)), keys
+            )
+
+    def clear(self):
+        conn = self._connection()
+        conn.execute('DELETE FROM cache')
+        conn.execute('DELETE FROM buckets')
+
+    def close(self, **kwargs):
+        """연결은 요청 사이에도 재사용하므로 요청이 끝나도 닫지 않음"""
+
+    def _maybe_cull(self, conn):
+        self._local.writes += 1
+        if self._local.writes % CULL_CHECK_INTERVAL == 0:
+            self._cull(conn)
+
+    def _cull(self, conn):
+        """만료된 항목을 지우고, 그래도 MAX_ENTRIES 를 넘으면 오래 사용하지 않은 항목부터 삭제"""
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('DELETE FROM cache WHERE expires <= ?', (time.time(),))
+            # 가득 찬 bucket 은 없는 것과 같음
+            conn.execute('DELETE FROM buckets WHERE tat <= ?', (time.time(),))
+            count = conn.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+            if count <= self._max_entries:
+                return
+            if self._cull_frequency == 0:
+                conn.execute('DELETE FROM cache')
+                return
+            conn.execute(
+                'DELETE FROM cache WHERE key IN '
+                '(SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+                (count - self._max_entries + count // self._cull_frequency,),
+            )
@@ -0,0 +1,65 @@
+from django.conf import settings
+from django.db import connections
+
+
+def _planner_estimate(queryset):
+    """PostgreSQL 의 통계로 행 수를 추정, 추정할 수 없으면 None"""
+    connection = connections[queryset.db]
+    with connection.cursor() as cursor:
+        if not queryset.query.where:
+            # 조건이 없으면 ANALYZE / autovacuum 이 갱신하는 테이블의 행 수를 사용
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                [connection.ops.quote_name(queryset.model._meta.db_table)],
+            )
+            row = cursor.fetchone()
+            return int(row[0]) if row else None
+
+        # 조건이 있으면 실행 계획에서 planner 가 예상한 행 수를 사용
+        sql, params = queryset.query.sql_with_params()
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+        return int(plan[0]['Plan']['Plan Rows'])
+
+
+def estimate_count(queryset, threshold=None):
+    """
+    queryset 의 행 수를 반환, 큰 테이블은 COUNT(*) 대신 추정값을 사용
+
+    추정값이 threshold 보다 작거나, PostgreSQL 이 아니어서 추정할 수 없으면
+    정확한 COUNT(*) 를 반환한다. 작은 결과는 정확하고, 큰 결과는 테이블을 훑지 않는다.
+    """
+    if threshold is None:
+        threshold = settings.ESTIMATED_COUNT_THRESHOLD
+
+    estimate = None
+    if connections[queryset.db].vendor == 'postgresql':
+        estimate = _planner_estimate(queryset)
+
+    if estimate is None or estimate < threshold:
+        return queryset.count()
+
+    return estimate
+
+
+def count_with_estimate(queryset, threshold=None, estimate=None):
+    """
+    (행 수, 추정값 여부) 를 반환
+
+    threshold 개까지는 LIMIT 을 건 COUNT 로 정확하게 세므로 결과가 커도 threshold 개만 훑는다.
+    넘으면 estimate(유저별 카운터 등)나 PostgreSQL planner 의 추정값을 사용하고,
+    둘 다 없으면 정확한 COUNT(*) 를 반환한다.
+    """
+    if threshold is None:
+        threshold = settings.LIST_EXACT_COUNT_THRESHOLD
+
+    bounded = queryset.order_by()[:threshold + 1].count()
+    if bounded <= threshold:
+        return bounded, False
+
+    if estimate is None and connections[queryset.db].vendor == 'postgresql':
+        estimate = _planner_estimate(queryset)
+    if estimate is None:
+        return queryset.count(), False
+
+    return max(estimate, bounded), True
@@ -0,0 +1,129 @@
+import hashlib
+import hmac
+import random
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_CACHE_KEY = 'db:pin:{}'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+# replica 를 사용하는 요청에서도 primary 에서 읽는 모델
+# 토큰 폐기, 계정 비활성화가 replica 지연과 관계없이 바로 반영되어야 함
+PRIMARY_ONLY_MODELS = {'authtoken.token', 'core.user', 'core.deletionjob', 'sessions.session'}
+
+_local = threading.local()
+_lock = threading.Lock()
+_totals = Counter()
+
+
+def get_read_alias():
+    """현재 요청에서 읽기에 사용할 replica alias, replica 를 사용하지 않으면 None"""
+    return getattr(_local, 'read_alias', None)
+
+
+def query_counts():
+    """프로세스가 시작된 뒤 alias 별로 실행한 쿼리 수"""
+    with _lock:
+        return dict(_totals)
+
+
+def reset_query_counts():
+    with _lock:
+        _totals.clear()
+
+
+def count_query(execute, sql, params, many, context):
+    """connection.execute_wrappers 에 등록하여 alias 별 쿼리 수를 셈"""
+    alias = context['connection'].alias
+    with _lock:
+        _totals[alias] += 1
+    per_request = getattr(_local, 'queries', None)
+    if per_request is not None:
+        per_request[alias] += 1
+
+    return execute(sql, params, many, context)
+
+
+def install_query_counter(sender, connection, **kwargs):
+    """connection_created 에서 호출, 다시 연결되어도 한 번만 등록"""
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_query)
+
+
+class ReplicaRouter:
+    """
+    ReplicaRoutingMiddleware 가 replica 를 고른 요청의 읽기만 replica 로 보내는 router
+
+    그 밖의 읽기(쓰기 요청, 명령어, worker)와 모든 쓰기는 primary(default)를 사용.
+    primary 의 트랜잭션 안에서는 커밋 전 데이터가 replica 에 없으므로 primary 에서 읽음
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = get_read_alias()
+        if alias is None or model._meta.label_lower in PRIMARY_ONLY_MODELS:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replica 는 primary 와 같은 데이터
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # replica 는 복제로 스키마를 받음
+        return db not in settings.DATABASE_REPLICAS
+
+
+def _pin_key(request):
+    """
+    같은 사용자의 요청을 구분하는 키, 인증 헤더가 없으면 세션이나 IP 를 사용
+
+    토큰이 캐시 키로 남지 않도록 SECRET_KEY 로 만든 HMAC 만 사용한다.
+    """
+    credential = request.META.get('HTTP_AUTHORIZATION') \
+        or request.COOKIES.get(settings.SESSION_COOKIE_NAME) \
+        or request.META.get('REMOTE_ADDR', '')
+    digest = hmac.new(settings.SECRET_KEY.encode(), credential.encode(), hashlib.sha256).hexdigest()
+
+    return PIN_CACHE_KEY.format(digest)
+
+
+class ReplicaRoutingMiddleware:
+    """
+    안전한(GET, HEAD, OPTIONS) 요청의 읽기를 replica 로 보내는 middleware
+
+    쓰기 요청을 보낸 사용자는 REPLICA_PIN_SECONDS 동안 primary 에서 읽어서
+    replica 지연으로 자신이 쓴 데이터가 보이지 않는 일이 없도록 한다.
+    DEBUG 일 때만 응답의 X-DB-Queries 헤더에 alias 별 쿼리 수를 담는다.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        replicas = settings.DATABASE_REPLICAS
+        safe = request.method in SAFE_METHODS
+        if replicas and safe and not cache.get(_pin_key(request)):
+            _local.read_alias = random.choice(replicas)
+        _local.queries = Counter()
+
+        try:
+            response = self.get_response(request)
+        finally:
+            _local.read_alias = None
+            queries, _local.queries = _local.queries, None
+
+        if replicas and not safe:
+            cache.set(_pin_key(request), True, settings.REPLICA_PIN_SECONDS)
+        if settings.DEBUG:
+            response['X-DB-Queries'] = ', '.join(f'{alias}={count}' for alias, count in sorted(queries.items()))
+
+        return response
@@ -0,0 +1,120 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import router, transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from user.tests.authentication import revoke_tokens
+from .models import DeletionJob, Recipe, Tag, Ingredient, RecipeStats, RecipeStatsBucket, Tombstone
+from .sharding import use_user_shard
+
+
+def delete_in_batches(queryset, batch_size=None, on_batch=None):
+    """
+    queryset 을 batch_size 개씩 각각의 트랜잭션에서 삭제하고 삭제한 수를 반환
+
+    한 번에 지우면 cascade 로 테이블이 오래 잠기므로 나누어 지운다.
+    Model.delete() 와 같이 signal 이 발생하므로 캐시, 색인, 통계, 이미지 파일도 정리 된다.
+    """
+    batch_size = batch_size or settings.DELETION_BATCH_SIZE
+    label = queryset.model._meta.label
+    using = router.db_for_write(queryset.model)
+    queryset = queryset.using(using)
+    total = 0
+    while True:
+        with transaction.atomic(using=using):
+            ids = list(queryset.order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+            _, per_model = queryset.model.objects.using(using).filter(pk__in=ids).delete()
+        total += per_model.get(label, 0)
+        if on_batch:
+            on_batch(per_model.get(label, 0))
+
+    return total
+
+
+def schedule_user_deletion(user):
+    """
+    계정을 바로 비활성화하고 데이터 삭제 작업을 등록
+
+    로그인과 발급된 토큰은 즉시 사용할 수 없게 되고, 데이터는 process_deletion_jobs 가 삭제한다.
+    이미 등록된 작업이 있으면 그 작업을 반환
+    """
+    with transaction.atomic():
+        get_user_model().objects.filter(pk=user.pk).update(is_active=False)
+        Token.objects.filter(user_id=user.pk).delete()
+        revoke_tokens(user)
+        job = DeletionJob.objects.filter(user_id=user.pk).exclude(status=DeletionJob.DONE).first()
+        if job is None:
+            job = DeletionJob.objects.create(user_id=user.pk)
+
+    return job
+
+
+def _stages(user_id):
+    """삭제 순서, recipe 를 먼저 지워야 tag / ingredient 를 지울 때 연결된 recipe 가 없다"""
+    return (
+        ('recipes', Recipe.objects.filter(user_id=user_id)),
+        ('tags', Tag.objects.filter(user_id=user_id)),
+        ('ingredients', Ingredient.objects.filter(user_id=user_id)),
+        ('stats', RecipeStatsBucket.objects.filter(user_id=user_id)),
+        ('summary', RecipeStats.objects.filter(user_id=user_id)),
+        # 위 단계에서 남긴 tombstone 도 더는 필요 없음
+        ('tombstones', Tombstone.objects.filter(user_id=user_id)),
+    )
+
+
+def claimable_jobs():
+    """실행할 작업, 실패했거나 실행 중에 멈춘 작업도 다시 실행"""
+    stale = timezone.now() - timedelta(seconds=settings.DELETION_JOB_STALE_AFTER)
+    return DeletionJob.objects.filter(
+        Q(status__in=(DeletionJob.PENDING, DeletionJob.FAILED)) |
+        Q(status=DeletionJob.RUNNING, updated_at__lt=stale)
+    ).order_by('id')
+
+
+def claim(job):
+    """다른 worker 가 먼저 가져가지 않았을 때만 작업을 RUNNING 으로 바꾸고 True 를 반환"""
+    claimed = DeletionJob.objects.filter(pk=job.pk, status=job.status, updated_at=job.updated_at) \
+        .update(status=DeletionJob.RUNNING, updated_at=timezone.now())
+    if claimed:
+        job.refresh_from_db()
+
+    return bool(claimed)
+
+
+def run_deletion_job(job, batch_size=None, progress=None):
+    """
+    유저의 데이터를 단계별로 나누어 삭제하고 마지막에 유저를 삭제
+
+    배치마다 삭제한 수를 job 에 기록한다. 중간에 멈추어도 다시 실행하면 남은 데이터부터 삭제
+    """
+    def on_batch(count):
+        job.deleted += count
+        job.save(update_fields=['stage', 'deleted', 'updated_at'])
+        if progress:
+            progress(job)
+
+    try:
+        with use_user_shard(job.user_id):
+            for stage, queryset in _stages(job.user_id):
+                job.stage = stage
+                delete_in_batches(queryset, batch_size, on_batch)
+        get_user_model().objects.filter(pk=job.user_id).delete()
+    except Exception as exc:
+        job.status = DeletionJob.FAILED
+        job.error = str(exc)
+        job.save(update_fields=['status', 'error', 'updated_at'])
+        raise
+
+    job.status = DeletionJob.DONE
+    job.stage = ''
+    job.error = ''
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'stage', 'error', 'finished_at', 'updated_at'])
+
+    return job
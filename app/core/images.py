@@ -0,0 +1,139 @@
+import struct
+from collections import namedtuple
+
+ImageHeader = namedtuple('ImageHeader', ('format', 'width', 'height'))
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+# 크기가 들어있는 JPEG 의 SOF(start of frame) marker, C4(DHT), C8, CC 는 제외
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+# 길이 필드가 없는 JPEG marker
+JPEG_STANDALONE_MARKERS = {0x01, *range(0xD0, 0xD8)}
+JPEG_CHUNK_SIZE = 4096
+# SOF 앞에서 segment 가 아닌 바이트를 찾으며 훑는 최대 크기, 정상 파일은 거의 없음
+JPEG_SCAN_LIMIT = 4096
+# SOF 가 있어야 하는 파일 앞부분의 최대 크기(EXIF, ICC profile 등의 metadata 포함)
+JPEG_HEADER_LIMIT = 1024 * 1024
+# SOF 앞의 최대 segment 수
+JPEG_MAX_SEGMENTS = 512
+
+
+def _read_png(file, head):
+    if head[12:16] != b'IHDR':
+        return None
+    width, height = struct.unpack('>II', head[16:24])
+
+    return ImageHeader('PNG', width, height)
+
+
+def _read_gif(file, head):
+    width, height = struct.unpack('<HH', head[6:10])
+
+    return ImageHeader('GIF', width, height)
+
+
+def _read_webp(file, head):
+    chunk = head[12:16]
+    if chunk == b'VP8 ' and head[23:26] == b'\x9d\x01\x2a':
+        width, height = struct.unpack('<HH', head[26:30])
+        return ImageHeader('WEBP', width & 0x3FFF, height & 0x3FFF)
+    if chunk == b'VP8L' and head[20:21] == b'\x2f':
+        bits = struct.unpack('<I', head[21:25])[0]
+        return ImageHeader('WEBP', (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1)
+    if chunk == b'VP8X':
+        return ImageHeader('WEBP', int.from_bytes(head[24:27], 'little') + 1, int.from_bytes(head[27:30], 'little') + 1)
+
+    return None
+
+
+class _ChunkReader:
+    """파일을 JPEG_CHUNK_SIZE 단위로 읽어두고 위치로 잘라 반환, 1 byte 씩 read 하지 않음"""
+
+    def __init__(self, file):
+        self.file = file
+        self.start = 0
+        self.buffer = b''
+
+    def read(self, position, size=JPEG_CHUNK_SIZE):
+        end = position + size
+        if position < self.start or end > self.start + len(self.buffer):
+            self.file.seek(position)
+            self.buffer = self.file.read(max(size, JPEG_CHUNK_SIZE))
+            self.start = position
+
+        return self.buffer[position - self.start:end - self.start]
+
+
+def _read_jpeg(file, head):
+    """
+    SOF marker 가 나올 때까지 segment 의 길이만 읽고 건너뜀, 이미지 데이터는 읽지 않음
+
+    marker 사이의 바이트는 chunk 단위로 find 하여 건너뛰고, 그 바이트가 JPEG_SCAN_LIMIT 를 넘거나
+    SOF 가 JPEG_HEADER_LIMIT 안에 없거나 segment 가 JPEG_MAX_SEGMENTS 보다 많으면 올바른 JPEG 가 아님
+    """
+    reader = _ChunkReader(file)
+    position, scanned = 2, 0
+    for _ in range(JPEG_MAX_SEGMENTS):
+        # 다음 marker 의 0xFF 와 그 뒤의 채움 0xFF 를 건너뜀
+        while True:
+            if position > JPEG_HEADER_LIMIT or scanned > JPEG_SCAN_LIMIT:
+                return None
+            chunk = reader.read(position)
+            if not chunk:
+                return None
+            if chunk[0] == 0xFF:
+                skipped = len(chunk) - len(chunk.lstrip(b'\xff'))
+                position += skipped
+                if skipped < len(chunk):
+                    break
+                continue
+            index = chunk.find(b'\xff')
+            skipped = len(chunk) if index < 0 else index
+            position += skipped
+            scanned += skipped
+        marker = chunk[skipped]
+        position += 1
+        if marker in JPEG_STANDALONE_MARKERS:
+            continue
+        # SOS(이미지 데이터 시작), EOI 전에 SOF 가 없으면 올바른 JPEG 가 아님
+        if marker in (0xD9, 0xDA):
+            return None
+        segment = reader.read(position, 7)
+        if len(segment) < 2:
+            return None
+        length = struct.unpack('>H', segment[:2])[0]
+        if marker in JPEG_SOF_MARKERS:
+            if len(segment) < 7:
+                return None
+            height, width = struct.unpack('>HH', segment[3:7])
+            return ImageHeader('JPEG', width, height)
+        if length < 2:
+            return None
+        position += length
+
+    return None
+
+
+def read_image_header(file):
+    """
+    파일 앞부분의 헤더만 읽어 (형식, 가로, 세로) 를 반환, 알 수 없는 형식이면 None
+
+    픽셀 데이터를 디코딩하지 않으므로 파일 크기와 관계없이 몇 번의 작은 read 로 끝난다.
+    JPEG, PNG, GIF, WEBP 를 지원하고, 파일 위치는 처음으로 되돌린다.
+    """
+    file.seek(0)
+    head = file.read(32)
+    try:
+        if head.startswith(PNG_SIGNATURE):
+            return _read_png(file, head)
+        if head[:6] in (b'GIF87a', b'GIF89a'):
+            return _read_gif(file, head)
+        if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+            return _read_webp(file, head)
+        if head[:2] == b'\xff\xd8':
+            return _read_jpeg(file, head)
+    except struct.error:
+        return None
+    finally:
+        file.seek(0)
+
+    return None
@@ -0,0 +1,149 @@
+import os
+import timeit
+from collections import OrderedDict
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO
+from types import SimpleNamespace
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import BaseCommand
+from django.utils import timezone
+from rest_framework.fields import ImageField
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.throttling import SimpleRateThrottle
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+
+from core.images import read_image_header
+from core.renderers import FastJSONRenderer, FastJSONParser
+from core.throttling import TokenBucketThrottle
+
+
+def recipe_payloads(count):
+    """
+    recipe list / detail / sync 응답과 같은 모양의 payload 를 만듦
+
+    serializer 출력처럼 OrderedDict 로 구성하고, Decimal 과 datetime 값도 포함한다
+    """
+    now = timezone.now()
+    tags = [OrderedDict(id=i, name=f'태그 {i}') for i in range(1, 6)]
+    ingredients = [OrderedDict(id=i, name=f'Ingredient {i}') for i in range(1, 13)]
+
+    def recipe(i, detail=False):
+        data = OrderedDict()
+        data['id'] = i
+        data['title'] = f'Recipe {i} 된장찌개'
+        data['ingredients'] = ingredients[:i % 12 + 1] if detail else [x['id'] for x in ingredients[:i % 12 + 1]]
+        data['tags'] = tags[:i % 5 + 1] if detail else [x['id'] for x in tags[:i % 5 + 1]]
+        data['time_minutes'] = i % 120
+        data['price'] = f'{i % 100}.50'
+        data['link'] = f'https://example.com/recipes/{i}'
+        if detail:
+            data['image'] = None
+        return data
+
+    sync = OrderedDict()
+    sync['cursor'] = str(int(now.timestamp() * 10 ** 6))
+    sync['recipes'] = [
+        OrderedDict(recipe(i), price=Decimal(f'{i % 100}.50'), updated_at=now - timedelta(minutes=i))
+        for i in range(count)
+    ]
+    sync['deleted'] = OrderedDict(recipe=list(range(count // 10)), tag=[], ingredient=[])
+
+    return OrderedDict([
+        ('list', ReturnList([recipe(i) for i in range(count)], serializer=None)),
+        ('detail', ReturnDict(recipe(count, detail=True), serializer=None)),
+        ('sync', sync),
+    ])
+
+
+class Command(BaseCommand):
+    '''직렬화 등 핫 패스의 구현을 기존 구현과 비교하여 op 당 소요 시간을 출력'''
+
+    targets = ('renderers', 'throttle', 'images')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', action='append', dest='targets', choices=self.targets,
+                            help='측정할 대상 (여러 번 지정 가능, 없으면 전체)')
+        parser.add_argument('--size', type=int, default=500,
+                            help='payload 의 recipe 수')
+        parser.add_argument('--repeat', type=int, default=200,
+                            help='측정 반복 횟수')
+
+    def handle(self, *args, **options):
+        for target in options['targets'] or self.targets:
+            getattr(self, f'benchmark_{target}')(options['size'], options['repeat'])
+
+    def report(self, name, repeat, baseline, candidates, per=1, unit='ms'):
+        """기준 함수 대비 각 후보 함수의 op 당 시간(ms, per 로 나눈 값)과 속도 비율을 출력"""
+        base_ms = min(timeit.repeat(baseline[1], number=1, repeat=repeat)) * 1000 / per
+        self.stdout.write(f'{name:<24} {baseline[0]:<20} {base_ms:10.4f} {unit}')
+        for label, func in candidates:
+            ms = min(timeit.repeat(func, number=1, repeat=repeat)) * 1000 / per
+            self.stdout.write(f'{"":<24} {label:<20} {ms:10.4f} {unit}  x{base_ms / ms:.1f}')
+
+    def benchmark_renderers(self, size, repeat):
+        stock_renderer, fast_renderer = JSONRenderer(), FastJSONRenderer()
+        stock_parser, fast_parser = JSONParser(), FastJSONParser()
+
+        for name, data in recipe_payloads(size).items():
+            self.report(
+                f'render {name}', repeat,
+                ('JSONRenderer', lambda: stock_renderer.render(data)),
+                [('FastJSONRenderer', lambda: fast_renderer.render(data))],
+            )
+            body = stock_renderer.render(data)
+            self.report(
+                f'parse {name}', repeat,
+                ('JSONParser', lambda: stock_parser.parse(BytesIO(body))),
+                [('FastJSONParser', lambda: fast_parser.parse(BytesIO(body)))],
+            )
+
+    def benchmark_throttle(self, size, repeat):
+        """size 명의 유저가 한 번씩 요청할 때 throttle 의 비용, 요청 기록을 저장하는 DRF 구현과 비교"""
+        def throttle(base):
+            return type(base.__name__, (base,), {
+                'scope': 'benchmark', 'rate': '100000/min',
+                'get_cache_key': lambda self, request, view: f'benchmark:{base.__name__}:{request.user.pk}',
+            })()
+
+        requests = [SimpleNamespace(user=SimpleNamespace(is_authenticated=True, pk=i)) for i in range(size)]
+        stock, bucket = throttle(SimpleRateThrottle), throttle(TokenBucketThrottle)
+        try:
+            self.report(
+                f'throttle {size} requests', repeat,
+                ('SimpleRateThrottle', lambda: [stock.allow_request(request, None) for request in requests]),
+                [('TokenBucketThrottle', lambda: [bucket.allow_request(request, None) for request in requests])],
+            )
+        finally:
+            # bucket 은 금방 가득 차서 cull 될 때 지워짐
+            stock.cache.delete_many([stock.get_cache_key(request, None) for request in requests])
+
+    def benchmark_images(self, size, repeat):
+        """업로드 이미지 검증의 MB 당 시간, ImageField(Pillow 로 열고 verify) 와 헤더만 읽는 검증을 비교"""
+        from PIL import Image
+
+        # size 개의 recipe 와 비슷하게 size * 4000 픽셀의 잡음 이미지, 압축이 거의 되지 않아 파일이 큼
+        width = 1000
+        height = max(size * 4, 1)
+        image = Image.frombytes('RGB', (width, height), os.urandom(width * height * 3))
+        field = ImageField()
+
+        for fmt in ('JPEG', 'PNG'):
+            buffer = BytesIO()
+            image.save(buffer, format=fmt)
+            content = buffer.getvalue()
+            upload = SimpleUploadedFile(f'sample.{fmt.lower()}', content)
+            megabytes = len(content) / 1024 / 1024
+
+            def decode():
+                upload.seek(0)
+                Image.open(upload).load()
+
+            self.report(
+                f'validate {fmt} {megabytes:.1f}MB', repeat,
+                ('ImageField', lambda: field.to_internal_value(upload)),
+                [('read_image_header', lambda: read_image_header(upload)), ('full decode', decode)],
+                per=megabytes, unit='ms/MB',
+            )
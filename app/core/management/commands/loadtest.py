@@ -0,0 +1,322 @@
+import cProfile
+import http.client
+import json
+import math
+import pstats
+import random
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict
+from io import BytesIO, StringIO
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand, CommandError
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.db import connections
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from core.models import Recipe, Tag, Ingredient
+from core.sharding import use_user_shard
+from user.tests.authentication import issue_token_pair
+
+SEED_EMAIL = 'loadtest{}@loadtest.com'
+DEFAULT_MIX = 'recipes=4,recipe=3,tags=1,ingredients=1,me=1'
+
+# 이름: (method, path, body) 를 만드는 함수, 'me' 는 TokenAuthentication 만 받음
+ROUTES = OrderedDict([
+    ('recipes', lambda user, rng: ('GET', reverse('recipe:recipe-list'), None)),
+    ('recipe', lambda user, rng: ('GET', reverse('recipe:recipe-detail', args=[rng.choice(user.recipe_ids)]), None)),
+    ('tags', lambda user, rng: ('GET', reverse('recipe:tag-list'), None)),
+    ('ingredients', lambda user, rng: ('GET', reverse('recipe:ingredient-list'), None)),
+    ('sync', lambda user, rng: ('GET', reverse('recipe:sync'), None)),
+    ('stats', lambda user, rng: ('GET', reverse('recipe:stats'), None)),
+    ('me', lambda user, rng: ('GET', reverse('user:me'), None)),
+    ('create', lambda user, rng: ('POST', reverse('recipe:recipe-list'), json.dumps({
+        'title': f'Load test {rng.randrange(10 ** 6)}', 'time_minutes': rng.randrange(1, 120), 'price': '5.00',
+        'tags': user.tag_ids[:1], 'ingredients': user.ingredient_ids[:2],
+    }).encode())),
+])
+
+
+def parse_mix(value):
+    """'recipes=4,tags=1' 형식의 요청 비율을 {이름: 가중치} 로 변환"""
+    mix = OrderedDict()
+    for item in value.split(','):
+        name, _, weight = item.strip().partition('=')
+        if name not in ROUTES:
+            raise CommandError(f'알 수 없는 요청: {name} (가능한 값: {", ".join(ROUTES)})')
+        try:
+            mix[name] = float(weight or 1)
+        except ValueError:
+            raise CommandError(f'{name} 의 비율은 숫자여야 합니다.')
+    if not any(mix.values()):
+        raise CommandError('비율이 0 보다 큰 요청이 하나 이상 있어야 합니다.')
+
+    return mix
+
+
+def default_host():
+    """ALLOWED_HOSTS 에서 Host 헤더로 보낼 값, 없으면 localhost"""
+    for host in settings.ALLOWED_HOSTS:
+        if host and host[0] not in '.*':
+            return host
+
+    return 'localhost'
+
+
+def percentile(values, p):
+    """정렬된 values 의 p 백분위 값(nearest rank)"""
+    if not values:
+        return 0.0
+
+    return values[max(0, min(len(values) - 1, math.ceil(p / 100 * len(values)) - 1))]
+
+
+class LoadUser:
+    """부하를 보내는 유저의 토큰과 recipe, tag, ingredient id"""
+
+    def __init__(self, user, recipe_ids, tag_ids, ingredient_ids):
+        self.user = user
+        self.recipe_ids = recipe_ids
+        self.tag_ids = tag_ids
+        self.ingredient_ids = ingredient_ids
+        self.token = Token.objects.get_or_create(user=user)[0].key
+        self._access, self._expires = None, 0
+
+    def headers(self, route, auth):
+        if auth == 'token' or route == 'me':
+            return {'Authorization': f'Token {self.token}'}
+        # access 토큰은 수명이 짧으므로 절반이 지나면 다시 발급
+        if time.time() > self._expires:
+            self._access = issue_token_pair(self.user)['access']
+            self._expires = time.time() + settings.SIGNED_TOKEN_ACCESS_LIFETIME / 2
+
+        return {'Authorization': f'Bearer {self._access}'}
+
+
+def seed_users(count, recipes):
+    """부하 테스트용 유저와 recipe, tag, ingredient 를 없을 때만 만듦"""
+    users = []
+    for i in range(count):
+        email = SEED_EMAIL.format(i)
+        user = get_user_model().objects.filter(email=email).first()
+        if user is None:
+            user = get_user_model().objects.create_user(email, get_user_model().objects.make_random_password(),
+                                                        name=f'Load test {i}')
+        with use_user_shard(user.pk):
+            tags = [Tag.objects.get_or_create(user=user, name=f'Tag {n}')[0] for n in range(3)]
+            ingredients = [Ingredient.objects.get_or_create(user=user, name=f'Ingredient {n}')[0] for n in range(3)]
+            recipe_ids = list(Recipe.objects.filter(user=user).order_by('id').values_list('id', flat=True)[:recipes])
+            if len(recipe_ids) < recipes:
+                for n in range(len(recipe_ids), recipes):
+                    recipe = Recipe.objects.create(user=user, title=f'Recipe {n}', time_minutes=n % 60 + 1,
+                                                   price=n % 30 + 1)
+                    recipe.tags.add(tags[n % 3])
+                    recipe.ingredients.add(*ingredients[:n % 3 + 1])
+                    recipe_ids.append(recipe.id)
+        users.append(LoadUser(user, recipe_ids, [tag.id for tag in tags], [item.id for item in ingredients]))
+
+    return users
+
+
+class ProfiledApplication:
+    """WSGI application 을 감싸 요청을 처리하는 thread 마다 cProfile 로 기록"""
+
+    def __init__(self, application):
+        self.application = application
+        self.profiles = []
+        self._local = threading.local()
+
+    def __call__(self, environ, start_response):
+        profile = getattr(self._local, 'profile', None)
+        if profile is None:
+            profile = self._local.profile = cProfile.Profile()
+            self.profiles.append(profile)
+        profile.enable()
+        try:
+            # 응답 본문을 만들고 request_finished 를 보내는 시간까지 포함
+            response = self.application(environ, start_response)
+            try:
+                return [b''.join(response)]
+            finally:
+                response.close()
+        finally:
+            profile.disable()
+
+    def stats(self, stream):
+        stats = pstats.Stats(self.profiles[0], stream=stream)
+        for profile in self.profiles[1:]:
+            stats.add(profile)
+
+        return stats
+
+
+class InProcessClient:
+    """WSGI application 을 같은 프로세스에서 직접 호출"""
+
+    def __init__(self, application):
+        self.application = application
+
+    def request(self, method, path, body, headers):
+        body = body or b''
+        environ = {
+            'REQUEST_METHOD': method, 'PATH_INFO': path, 'wsgi.input': BytesIO(body),
+            'CONTENT_LENGTH': str(len(body)), 'CONTENT_TYPE': 'application/json', 'SERVER_NAME': 'localhost',
+        }
+        environ.update({f'HTTP_{name.upper().replace("-", "_")}': value for name, value in headers.items()})
+        setup_testing_defaults(environ)
+        status = []
+        response = self.application(environ, lambda line, response_headers, exc_info=None: status.append(line))
+        try:
+            for _ in response:
+                pass
+        finally:
+            if hasattr(response, 'close'):
+                response.close()
+
+        return int(status[0].split()[0])
+
+    def close(self):
+        # thread 마다 열린 DB 연결을 닫음
+        connections.close_all()
+
+
+class SocketClient:
+    """로컬 socket 의 HTTP 서버로 요청, worker 마다 연결을 유지"""
+
+    def __init__(self, address):
+        self.connection = http.client.HTTPConnection(*address)
+
+    def request(self, method, path, body, headers):
+        if body is not None:
+            headers = dict(headers, **{'Content-Type': 'application/json'})
+        self.connection.request(method, path, body, headers)
+        response = self.connection.getresponse()
+        response.read()
+
+        return response.status
+
+    def close(self):
+        self.connection.close()
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    '''
+    WSGI application 에 부하를 보내고 처리량과 지연 시간(p50 / p95 / p99)을 출력
+
+    기본은 같은 프로세스에서 application 을 직접 호출하고, --socket 이면 로컬 HTTP 서버를 띄워 요청한다.
+    요청은 부하 테스트용 유저의 토큰으로 보내므로 유저마다 throttle 이 적용된다,
+    throttle 없이 측정하려면 THROTTLE_USER_RATE 환경 변수로 rate 를 높인다.
+    '''
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=8,
+                            help='동시에 요청을 보내는 worker(thread) 수')
+        parser.add_argument('--duration', type=float, default=10,
+                            help='측정 시간(초)')
+        parser.add_argument('--mix', default=DEFAULT_MIX,
+                            help=f'요청 종류와 비율, 가능한 값: {", ".join(ROUTES)}')
+        parser.add_argument('--users', type=int, default=10,
+                            help='요청을 나누어 보낼 유저 수')
+        parser.add_argument('--recipes', type=int, default=20,
+                            help='유저마다 만들어 둘 recipe 수')
+        parser.add_argument('--auth', choices=('token', 'signed'), default='token',
+                            help="인증 방식, signed 는 서명 토큰(Bearer)을 사용 ('me' 는 항상 token)")
+        parser.add_argument('--socket', action='store_true',
+                            help='127.0.0.1 의 HTTP 서버를 거쳐 요청')
+        parser.add_argument('--host', default=None,
+                            help='Host 헤더 (기본값 ALLOWED_HOSTS 의 첫 host, 없으면 localhost)')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='요청 순서를 정하는 random seed')
+        parser.add_argument('--profile', metavar='PATH',
+                            help='서버의 cProfile 결과를 PATH 에 저장하고 상위 함수를 출력')
+
+    def handle(self, *args, **options):
+        from app.wsgi import application
+
+        mix = parse_mix(options['mix'])
+        if options['concurrency'] < 1 or options['users'] < 1 or options['recipes'] < 1:
+            raise CommandError('concurrency, users, recipes 는 1 이상이어야 합니다.')
+
+        users = seed_users(options['users'], options['recipes'])
+        app = ProfiledApplication(application) if options['profile'] else application
+
+        server = None
+        if options['socket']:
+            server = ThreadedWSGIServer(('127.0.0.1', 0), QuietRequestHandler)
+            server.set_app(app)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            address = server.server_address[:2]
+
+            def make_client():
+                return SocketClient(address)
+        else:
+            def make_client():
+                return InProcessClient(app)
+
+        results = []
+        deadline = time.monotonic() + options['duration']
+        names, weights = list(mix), list(mix.values())
+        host = options['host'] or default_host()
+
+        def worker(index):
+            rng = random.Random(f'{options["seed"]}:{index}')
+            client = make_client()
+            try:
+                while time.monotonic() < deadline:
+                    user = rng.choice(users)
+                    route = rng.choices(names, weights)[0]
+                    method, path, body = ROUTES[route](user, rng)
+                    headers = dict(user.headers(route, options['auth']), Host=host)
+                    start = time.perf_counter()
+                    status = client.request(method, path, body, headers)
+                    results.append((route, status, time.perf_counter() - start))
+            finally:
+                client.close()
+
+        started = time.monotonic()
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(options['concurrency'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+        self.report(results, elapsed, options)
+        if options['profile'] and app.profiles:
+            stream = StringIO()
+            stats = app.stats(stream)
+            stats.dump_stats(options['profile'])
+            stats.sort_stats('cumulative').print_stats(20)
+            self.stdout.write(f'\nprofile: {options["profile"]}')
+            self.stdout.write(stream.getvalue())
+
+    def report(self, results, elapsed, options):
+        mode = 'socket' if options['socket'] else 'in-process'
+        self.stdout.write(f'{mode}, concurrency {options["concurrency"]}, {options["users"]} users, '
+                          f'{elapsed:.1f} s')
+        statuses = Counter(status for _, status, _ in results)
+        errors = sum(count for status, count in statuses.items() if status >= 400)
+        self.stdout.write(f'requests {len(results)}  ({len(results) / elapsed:.1f} req/s), errors {errors}')
+        self.stdout.write('status   ' + ', '.join(f'{status}: {count}' for status, count in sorted(statuses.items())))
+
+        latencies = defaultdict(list)
+        for route, _, seconds in results:
+            latencies['all'].append(seconds * 1000)
+            latencies[route].append(seconds * 1000)
+        self.stdout.write(f'\n{"route":<12} {"count":>7} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9}')
+        for route in ['all'] + [name for name in ROUTES if name in latencies]:
+            values = sorted(latencies[route])
+            self.stdout.write(f'{route:<12} {len(values):>7} {percentile(values, 50):9.2f} '
+                              f'{percentile(values, 95):9.2f} {percentile(values, 99):9.2f}')
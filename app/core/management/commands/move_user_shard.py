@@ -0,0 +1,23 @@
+from django.core.management import BaseCommand, CommandError
+
+from core.shard_move import move_user
+
+
+class Command(BaseCommand):
+    '''유저의 recipe 데이터를 다른 shard 로 옮김, 옮기는 동안 읽기는 계속 가능'''
+
+    def add_arguments(self, parser):
+        parser.add_argument('user_id', type=int)
+        parser.add_argument('shard', help='옮길 shard 의 DB alias')
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='한 번에 복사, 삭제할 행 수 (기본값 DELETION_BATCH_SIZE)')
+        parser.add_argument('--wait', type=float, default=None,
+                            help='위치를 바꾼 뒤 기다리는 시간(초) (기본값 SHARD_CACHE_TIMEOUT)')
+
+    def handle(self, *args, **options):
+        try:
+            move_user(options['user_id'], options['shard'], options['batch_size'], options['wait'],
+                      log=self.stdout.write)
+        except ValueError as exc:
+            raise CommandError(exc)
+        self.stdout.write(self.style.SUCCESS(f'유저 {options["user_id"]} 를 {options["shard"]} 로 옮겼습니다.'))
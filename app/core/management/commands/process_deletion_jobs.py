@@ -0,0 +1,46 @@
+import time
+
+from django.core.management import BaseCommand
+
+from core import deletion
+
+
+class Command(BaseCommand):
+    '''등록된 계정 삭제 작업을 실행, --forever 를 주면 worker 로 계속 실행'''
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='한 트랜잭션에서 삭제할 행 수 (기본값 DELETION_BATCH_SIZE)')
+        parser.add_argument('--forever', action='store_true',
+                            help='작업이 없어도 종료하지 않고 기다림')
+        parser.add_argument('--interval', type=float, default=5,
+                            help='--forever 일 때 작업을 확인하는 간격(초)')
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        while True:
+            processed = self.process(options['batch_size'])
+            if not options['forever']:
+                break
+            if not processed:
+                time.sleep(options['interval'])
+
+    def process(self, batch_size):
+        processed = 0
+        for job in deletion.claimable_jobs():
+            if not deletion.claim(job):
+                continue
+            self.stdout.write(f'유저 {job.user_id} 의 데이터를 삭제합니다.')
+            try:
+                deletion.run_deletion_job(job, batch_size, progress=self.progress)
+            except Exception as exc:
+                self.stderr.write(f'유저 {job.user_id} 삭제 실패: {exc}')
+                continue
+            processed += 1
+            self.stdout.write(self.style.SUCCESS(f'유저 {job.user_id} 삭제 완료 ({job.deleted} 건)'))
+
+        return processed
+
+    def progress(self, job):
+        if self.verbosity > 1:
+            self.stdout.write(f'  {job.stage}: {job.deleted} 건 삭제')
@@ -0,0 +1,92 @@
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import Counter, namedtuple
+
+from django.conf import settings
+from django.core.management import BaseCommand
+
+ImportTime = namedtuple('ImportTime', ('module', 'self_us', 'cumulative_us', 'depth'))
+
+READY_MARKER = '-- ready --'
+IMPORT_TIME = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+# 새 프로세스에서 실행하는 코드, -X importtime 의 출력(stderr)을 READY_MARKER 로 두 구간으로 나눔
+SCRIPT = f'''
+import json, sys, time
+start = time.perf_counter()
+import django
+django.setup()
+ready = time.perf_counter()
+sys.stderr.write({READY_MARKER!r} + '\\n')
+sys.stderr.flush()
+from wsgiref.util import setup_testing_defaults
+from django.core.handlers.wsgi import WSGIHandler
+environ = {{'PATH_INFO': sys.argv[1], 'REQUEST_METHOD': 'GET'}}
+setup_testing_defaults(environ)
+response = WSGIHandler()(environ, lambda status, headers: None)
+done = time.perf_counter()
+print(json.dumps({{'setup': ready - start, 'request': done - ready, 'status': response.status_code}}))
+'''
+
+
+def parse_import_times(lines):
+    """-X importtime 출력에서 모듈별 (self, cumulative) 시간(us)을 읽음"""
+    times = []
+    for line in lines:
+        match = IMPORT_TIME.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            times.append(ImportTime(module, int(self_us), int(cumulative_us), len(indent) // 2))
+
+    return times
+
+
+def run_profile(url):
+    """새 프로세스에서 django.setup() 과 첫 요청을 실행하고 (시간, setup 의 import, 첫 요청의 import) 를 반환"""
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', SCRIPT, url],
+        cwd=settings.BASE_DIR, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        universal_newlines=True, check=True,
+    )
+    before, _, after = process.stderr.partition(READY_MARKER)
+
+    return (json.loads(process.stdout.strip().splitlines()[-1]),
+            parse_import_times(before.splitlines()), parse_import_times(after.splitlines()))
+
+
+class Command(BaseCommand):
+    '''새 프로세스에서 app ready 와 첫 요청까지의 시간, 모듈별 import 시간을 출력'''
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='/api/user/create/',
+                            help='첫 요청으로 보낼 GET 경로')
+        parser.add_argument('--repeat', type=int, default=3,
+                            help='측정 횟수, 시간은 가장 빠른 값을 사용')
+        parser.add_argument('--limit', type=int, default=15,
+                            help='출력할 모듈, 패키지 수')
+
+    def handle(self, *args, **options):
+        runs = [run_profile(options['url']) for _ in range(options['repeat'])]
+        timings, setup_imports, request_imports = min(runs, key=lambda run: run[0]['setup'] + run[0]['request'])
+
+        self.stdout.write(f'django.setup()       {timings["setup"] * 1000:8.1f} ms  ({len(setup_imports)} modules)')
+        self.stdout.write(f'first request        {timings["request"] * 1000:8.1f} ms  '
+                          f'({len(request_imports)} modules, GET {options["url"]} -> {timings["status"]})')
+        self.stdout.write(f'total                {(timings["setup"] + timings["request"]) * 1000:8.1f} ms')
+
+        imports = setup_imports + request_imports
+        if not options['limit']:
+            return
+        packages = Counter()
+        for item in imports:
+            packages[item.module.split('.')[0]] += item.self_us
+        self.stdout.write('\npackages (self)')
+        for package, us in packages.most_common(options['limit']):
+            self.stdout.write(f'  {package:<40} {us / 1000:8.1f} ms')
+
+        self.stdout.write('\nmodules (cumulative)')
+        for item in sorted(imports, key=lambda item: -item.cumulative_us)[:options['limit']]:
+            self.stdout.write(f'  {"  " * item.depth}{item.module:<{40 - item.depth * 2}} {item.cumulative_us / 1000:8.1f} ms')
@@ -0,0 +1,24 @@
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand
+
+from recipe import stats
+
+
+class Command(BaseCommand):
+    '''유저별 recipe 통계(요약 행, 히스토그램 버킷)를 Recipe 테이블에서 다시 집계'''
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='users',
+                            help='다시 집계할 유저 id (여러 번 지정 가능, 없으면 전체 유저)')
+
+    def handle(self, *args, **options):
+        user_ids = options['users']
+        if not user_ids:
+            user_ids = get_user_model().objects.order_by('id').values_list('id', flat=True).iterator()
+
+        rebuilt = 0
+        for user_id in user_ids:
+            stats.rebuild(user_id)
+            rebuilt += 1
+
+        self.stdout.write(self.style.SUCCESS(f'{rebuilt} 명의 recipe 통계를 다시 집계했습니다.'))
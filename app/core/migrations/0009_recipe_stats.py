@@ -0,0 +1,75 @@
+# Generated by Django 2.1.15 on 2026-10-19 07:33
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+import django.db.models.deletion
+
+# recipe/stats.py 의 BUCKET_WIDTHS, 이후 코드가 바뀌어도 이 migration 은 그대로 동작하도록 복사
+BUCKET_WIDTHS = {'price': 1, 'time_minutes': 5}
+
+
+def backfill_stats(apps, schema_editor):
+    """
+    이미 있는 recipe 로 유저별 요약 행과 버킷을 만듦, stats._rebuild 와 같은 집계
+
+    만들지 않으면 이후의 증감이 0 에서 시작하여 count 가 실제보다 작거나 음수가 된다.
+    """
+    using = schema_editor.connection.alias
+    Recipe = apps.get_model('core', 'Recipe')
+    RecipeStats = apps.get_model('core', 'RecipeStats')
+    RecipeStatsBucket = apps.get_model('core', 'RecipeStatsBucket')
+
+    recipes = Recipe.objects.using(using).order_by()
+    summaries = recipes.values('user_id').annotate(
+        count=Count('id'), price_total=Sum('price'), time_total=Sum('time_minutes'))
+    RecipeStats.objects.using(using).bulk_create([
+        RecipeStats(user_id=row['user_id'], count=row['count'],
+                    price_total=row['price_total'] or 0, time_total=row['time_total'] or 0)
+        for row in summaries
+    ], batch_size=500)
+
+    buckets = {}
+    for user_id, price, time_minutes in recipes.values_list('user_id', 'price', 'time_minutes').iterator():
+        for metric, value in (('price', price), ('time_minutes', time_minutes)):
+            width = BUCKET_WIDTHS[metric]
+            key = (user_id, metric, int(value // width) * width)
+            buckets[key] = buckets.get(key, 0) + 1
+    RecipeStatsBucket.objects.using(using).bulk_create([
+        RecipeStatsBucket(user_id=user_id, metric=metric, bucket=bucket, count=count)
+        for (user_id, metric, bucket), count in buckets.items()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_recipe_range_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='recipe_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('price_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('time_total', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='RecipeStatsBucket',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(choices=[('price', 'Price'), ('time_minutes', 'Time minutes')], max_length=20)),
+                ('bucket', models.IntegerField()),
+                ('count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='recipestatsbucket',
+            unique_together={('user', 'metric', 'bucket')},
+        ),
+        migrations.RunPython(backfill_stats, migrations.RunPython.noop),
+    ]
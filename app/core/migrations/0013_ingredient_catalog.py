@@ -0,0 +1,106 @@
+# Generated by Django 2.1.15 on 2026-10-19 12:10
+
+from django.db import migrations, models
+from django.db.models import Count, Min, OuterRef, Subquery
+import django.db.models.deletion
+from django.utils import timezone
+
+
+def dedupe_ingredients(apps, schema_editor):
+    """
+    재료 이름을 IngredientName 으로 옮기고, 유저마다 같은 이름의 재료를 하나로 합침
+
+    합쳐진 재료의 recipe 연결은 남기는 재료(가장 작은 id)로 옮기고,
+    delta sync 에서 클라이언트가 지울 수 있도록 tombstone 을 남긴다.
+    """
+    using = schema_editor.connection.alias
+    if schema_editor.connection.vendor == 'postgresql':
+        # 지운 행의 deferred FK 검사가 남아 있으면 migration 끝에 catalog FK 를 추가하는
+        # ALTER TABLE 이 실패하므로 이 트랜잭션의 FK 검사를 바로 실행
+        schema_editor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+    Ingredient = apps.get_model('core', 'Ingredient')
+    IngredientName = apps.get_model('core', 'IngredientName')
+    Recipe = apps.get_model('core', 'Recipe')
+    Tombstone = apps.get_model('core', 'Tombstone')
+    through = Recipe.ingredients.through
+
+    names = Ingredient.objects.using(using).order_by().values_list('name', flat=True).distinct()
+    IngredientName.objects.using(using).bulk_create([IngredientName(name=name) for name in names], batch_size=500)
+    Ingredient.objects.using(using).update(catalog_id=Subquery(
+        IngredientName.objects.using(using).filter(name=OuterRef('name')).values('id')[:1]
+    ))
+
+    duplicates = {}
+    owners = {}
+    groups = Ingredient.objects.using(using).values('user_id', 'catalog_id') \
+        .annotate(keep=Min('id'), count=Count('id')).filter(count__gt=1).order_by()
+    for group in groups:
+        ids = Ingredient.objects.using(using).filter(user_id=group['user_id'], catalog_id=group['catalog_id']) \
+            .exclude(pk=group['keep']).values_list('id', flat=True)
+        for ingredient_id in ids:
+            duplicates[ingredient_id] = group['keep']
+            owners[ingredient_id] = group['user_id']
+    if not duplicates:
+        return
+
+    rows = list(through.objects.using(using).filter(ingredient_id__in=duplicates)
+                .values_list('id', 'recipe_id', 'ingredient_id'))
+    recipe_ids = {recipe_id for _, recipe_id, _ in rows}
+    linked = set(through.objects.using(using)
+                 .filter(recipe_id__in=recipe_ids, ingredient_id__in=set(duplicates.values()))
+                 .values_list('recipe_id', 'ingredient_id'))
+    stale = []
+    for row_id, recipe_id, ingredient_id in rows:
+        keep = duplicates[ingredient_id]
+        if (recipe_id, keep) in linked:
+            stale.append(row_id)
+        else:
+            linked.add((recipe_id, keep))
+            through.objects.using(using).filter(pk=row_id).update(ingredient_id=keep)
+    through.objects.using(using).filter(pk__in=stale).delete()
+
+    # 연결이 바뀐 recipe 와 지운 재료를 delta sync 에서 내려받도록 기록
+    Recipe.objects.using(using).filter(pk__in=recipe_ids).update(updated_at=timezone.now())
+    Tombstone.objects.using(using).bulk_create([
+        Tombstone(user_id=owners[ingredient_id], model='ingredient', object_id=ingredient_id)
+        for ingredient_id in duplicates
+    ], batch_size=500)
+    Ingredient.objects.using(using).filter(pk__in=list(duplicates)).delete()
+
+    # 캐시된 recipe detail 문서는 지운 재료를 가리키므로 무효화
+    from recipe.documents import invalidate_details
+    invalidate_details(recipe_ids, using=using)
+
+
+def restore_names(apps, schema_editor):
+    """되돌릴 때 IngredientName 의 이름을 다시 복사, 합쳐진 재료는 되살리지 않음"""
+    using = schema_editor.connection.alias
+    Ingredient = apps.get_model('core', 'Ingredient')
+    IngredientName = apps.get_model('core', 'IngredientName')
+
+    Ingredient.objects.using(using).update(name=Subquery(
+        IngredientName.objects.using(using).filter(pk=OuterRef('catalog_id')).values('name')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_sharding'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngredientName',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='ingredient',
+            name='catalog',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.IngredientName'),
+        ),
+        migrations.RunPython(dedupe_ingredients, restore_names),
+    ]
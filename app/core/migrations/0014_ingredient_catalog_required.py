@@ -0,0 +1,35 @@
+# Generated by Django 2.1.15 on 2026-10-19 12:10
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0013_ingredient_catalog'),
+    ]
+
+    operations = [
+        # 되돌릴 때 기존 행에 name 컬럼을 다시 추가할 수 있도록 기본값을 둠
+        migrations.AlterField(
+            model_name='ingredient',
+            name='name',
+            field=models.CharField(db_index=True, default='', max_length=255),
+        ),
+        migrations.RemoveField(
+            model_name='ingredient',
+            name='name',
+        ),
+        migrations.AlterField(
+            model_name='ingredient',
+            name='catalog',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.IngredientName'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='ingredient',
+            unique_together={('user', 'catalog')},
+        ),
+    ]
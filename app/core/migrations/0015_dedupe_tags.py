@@ -0,0 +1,69 @@
+# Generated by Django 2.1.15 on 2026-10-19 08:47
+
+from django.db import migrations
+from django.db.models import Count, Min
+from django.utils import timezone
+
+
+def dedupe_tags(apps, schema_editor):
+    """
+    유저마다 같은 이름의 태그를 하나로 합침, 다음 migration 의 (user, name) unique 제약을 위해 실행
+
+    합쳐진 태그의 recipe 연결은 남기는 태그(가장 작은 id)로 옮기고,
+    delta sync 에서 클라이언트가 지울 수 있도록 tombstone 을 남긴다.
+    """
+    using = schema_editor.connection.alias
+    Tag = apps.get_model('core', 'Tag')
+    Recipe = apps.get_model('core', 'Recipe')
+    Tombstone = apps.get_model('core', 'Tombstone')
+    through = Recipe.tags.through
+
+    duplicates = {}
+    owners = {}
+    groups = Tag.objects.using(using).values('user_id', 'name') \
+        .annotate(keep=Min('id'), count=Count('id')).filter(count__gt=1).order_by()
+    for group in groups:
+        ids = Tag.objects.using(using).filter(user_id=group['user_id'], name=group['name']) \
+            .exclude(pk=group['keep']).values_list('id', flat=True)
+        for tag_id in ids:
+            duplicates[tag_id] = group['keep']
+            owners[tag_id] = group['user_id']
+    if not duplicates:
+        return
+
+    rows = list(through.objects.using(using).filter(tag_id__in=duplicates).values_list('id', 'recipe_id', 'tag_id'))
+    recipe_ids = {recipe_id for _, recipe_id, _ in rows}
+    linked = set(through.objects.using(using)
+                 .filter(recipe_id__in=recipe_ids, tag_id__in=set(duplicates.values()))
+                 .values_list('recipe_id', 'tag_id'))
+    stale = []
+    for row_id, recipe_id, tag_id in rows:
+        keep = duplicates[tag_id]
+        if (recipe_id, keep) in linked:
+            stale.append(row_id)
+        else:
+            linked.add((recipe_id, keep))
+            through.objects.using(using).filter(pk=row_id).update(tag_id=keep)
+    through.objects.using(using).filter(pk__in=stale).delete()
+
+    # 연결이 바뀐 recipe 와 지운 태그를 delta sync 에서 내려받도록 기록
+    Recipe.objects.using(using).filter(pk__in=recipe_ids).update(updated_at=timezone.now())
+    Tombstone.objects.using(using).bulk_create([
+        Tombstone(user_id=owners[tag_id], model='tag', object_id=tag_id) for tag_id in duplicates
+    ], batch_size=500)
+    Tag.objects.using(using).filter(pk__in=list(duplicates)).delete()
+
+    # 캐시된 recipe detail 문서는 지운 태그를 가리키므로 무효화
+    from recipe.documents import invalidate_details
+    invalidate_details(recipe_ids, using=using)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_ingredient_catalog_required'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_tags, migrations.RunPython.noop),
+    ]
@@ -3,7 +3,9 @@ import os
 
 from django.conf import settings
 from django.contrib.auth.models import BaseUserManager, PermissionsMixin, AbstractBaseUser
-from django.db import models
+from django.db import IntegrityError, models, router, transaction
+
+from .sharding import ShardedManager
 
 
 def recipe_image_file_path(instance, filename):
@@ -51,6 +53,12 @@ class User(AbstractBaseUser, PermissionsMixin):
     name = models.CharField(max_length=255)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    # 서명된 access/refresh 토큰의 세대 번호, 증가시키면 기존 토큰이 모두 무효화 됨
+    token_generation = models.PositiveIntegerField(default=0)
+    # recipe, tag, ingredient 를 저장하는 shard 의 DB alias, 비어 있으면 처음 사용할 때 배정
+    shard = models.CharField(max_length=30, blank=True)
+    # 다른 shard 로 옮기는 중이면 대상 alias, 그동안 쓰기 요청은 거절 됨
+    shard_moving_to = models.CharField(max_length=30, blank=True)
 
     objects = UserManager()
     # USERNAME 를 email 로 사용
@@ -59,17 +67,111 @@ class User(AbstractBaseUser, PermissionsMixin):
 
 class Tag(models.Model):
     """레시피에 사용할 태그"""
-    name = models.CharField(max_length=255)
-    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    # admin 의 앞부분 일치 검색(name__startswith)에 사용
+    name = models.CharField(max_length=255, db_index=True)
+    # user 는 default DB 에, 이 모델은 user 의 shard 에 있으므로 DB 제약 조건을 두지 않음
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, db_constraint=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ShardedManager()
+
+    class Meta:
+        # 유저마다 같은 이름은 하나만 가짐, 유저별 목록의 이름 정렬에도 이 인덱스를 사용
+        unique_together = ('user', 'name')
+        indexes = [models.Index(fields=['user', 'updated_at'])]
 
     def __str__(self):
         return self.name
 
 
+class IngredientNameManager(models.Manager):
+    """IngredientName 을 이름으로 찾거나 만드는 manager"""
+
+    def resolve(self, names, using=None):
+        """
+        이름 목록의 {이름: id} 를 반환, 없는 이름은 만듦
+
+        조회 한 번과 bulk INSERT 한 번으로 처리한다. using 을 지정하지 않으면 router 가 정한 DB 를 사용
+        동시에 같은 이름을 만든 요청이 있어 unique 제약에 걸리면 get_or_create 로 하나씩 다시 처리한다.
+        """
+        names = set(names)
+        if not names:
+            return {}
+        queryset = self.using(using) if using else self.all()
+        found = dict(queryset.filter(name__in=names).values_list('name', 'id'))
+        missing = names - set(found)
+        if missing:
+            try:
+                with transaction.atomic(using=using or router.db_for_write(self.model)):
+                    created = queryset.bulk_create([self.model(name=name) for name in missing])
+            except IntegrityError:
+                # 다른 요청이 같은 이름을 먼저 만든 경우 하나씩 찾거나 만듦
+                created = [queryset.get_or_create(name=name)[0] for name in missing]
+            if any(obj.pk is None for obj in created):
+                # id 를 돌려주지 않는 DB(SQLite 등)는 새로 만든 이름만 다시 조회
+                created = queryset.filter(name__in=missing)
+            found.update((obj.name, obj.pk) for obj in created)
+
+        return found
+
+
+class IngredientName(models.Model):
+    """
+    재료 이름의 공유 목록
+
+    같은 이름을 유저마다 저장하지 않도록 shard 안의 모든 유저가 함께 참조한다.
+    Ingredient 와 join 할 수 있도록 shard 마다 따로 두므로 shard 간에는 id 가 다를 수 있다.
+    """
+    name = models.CharField(max_length=255, unique=True)
+
+    objects = IngredientNameManager()
+
+    def __str__(self):
+        return self.name
+
+
+class IngredientManager(ShardedManager):
+    """이름을 join 하여 name 으로 조회, 정렬할 수 있는 manager, recipe.ingredients 에서도 사용"""
+
+    def get_queryset(self):
+        return super().get_queryset().annotate(name=models.F('catalog__name'))
+
+
 class Ingredient(models.Model):
-    """레시피 재료 모델"""
-    name = models.CharField(max_length=255)
-    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    """
+    유저의 레시피 재료
+
+    이름은 IngredientName 을 참조하고, 유저마다 같은 이름은 한 번만 가진다.
+    name 으로 만들거나 바꾸면 저장할 때 IngredientName 을 찾아 연결한다.
+    """
+    # 유저별 조회는 unique_together 의 인덱스를 사용하므로 따로 인덱스를 두지 않음
+    catalog = models.ForeignKey(IngredientName, on_delete=models.PROTECT, related_name='+', db_index=False)
+    # user 는 default DB 에, 이 모델은 user 의 shard 에 있으므로 DB 제약 조건을 두지 않음
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, db_constraint=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = IngredientManager()
+
+    class Meta:
+        unique_together = ('user', 'catalog')
+        indexes = [models.Index(fields=['user', 'updated_at'])]
+
+    @property
+    def name(self):
+        if self.__dict__.get('_name') is None and self.catalog_id is not None:
+            self._name = self.catalog.name
+        return self.__dict__.get('_name')
+
+    @name.setter
+    def name(self, value):
+        self._name = value
+
+    def save(self, *args, **kwargs):
+        name = self.__dict__.get('_name')
+        if name is not None and (self.catalog_id is None or self.catalog.name != name):
+            using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+            self.catalog = IngredientName(pk=IngredientName.objects.resolve([name], using=using)[name], name=name)
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.name
@@ -77,8 +179,10 @@ class Ingredient(models.Model):
 
 class Recipe(models.Model):
     """레시피 모델"""
-    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
-    title = models.CharField(max_length=255)
+    # user 는 default DB 에, 이 모델은 user 의 shard 에 있으므로 DB 제약 조건을 두지 않음
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, db_constraint=False)
+    # admin 의 앞부분 일치 검색(title__startswith)에 사용
+    title = models.CharField(max_length=255, db_index=True)
     time_minutes = models.IntegerField()
     # 최대 999 를 소수점 2자리 이하로 저장
     # 항상 max_digits 가 decimal_places 보다 크거나 같아야 함
@@ -87,6 +191,128 @@ class Recipe(models.Model):
     ingredients = models.ManyToManyField('Ingredient')
     tags = models.ManyToManyField('Tag')
     image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ShardedManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'updated_at']),
+            # 범위 검색과 정렬(?price_min, ?time_max, ?ordering=)에 사용, id 는 같은 값의 정렬 순서
+            models.Index(fields=['user', 'price', 'id']),
+            models.Index(fields=['user', 'time_minutes', 'id']),
+        ]
 
     def __str__(self):
         return self.title
+
+
+class Tombstone(models.Model):
+    """
+    삭제된 recipe, tag, ingredient 의 기록
+
+    delta sync 에서 삭제된 객체를 알려주기 위해 사용. 유저가 삭제되어도
+    남아 있을 수 있으므로 user 에 DB 제약 조건을 두지 않음
+    """
+    RECIPE = 'recipe'
+    TAG = 'tag'
+    INGREDIENT = 'ingredient'
+    MODEL_CHOICES = ((RECIPE, 'Recipe'), (TAG, 'Tag'), (INGREDIENT, 'Ingredient'))
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+    )
+    model = models.CharField(max_length=20, choices=MODEL_CHOICES)
+    object_id = models.IntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    objects = ShardedManager()
+
+    class Meta:
+        indexes = [models.Index(fields=['user', 'deleted_at'])]
+
+    def __str__(self):
+        return f'{self.model} {self.object_id}'
+
+
+class RecipeStats(models.Model):
+    """
+    유저별 recipe 통계 요약
+
+    Recipe 의 post_save / post_delete 에서 증감하므로 조회할 때 집계하지 않음
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='recipe_stats',
+        db_constraint=False,
+    )
+    count = models.PositiveIntegerField(default=0)
+    price_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    time_total = models.BigIntegerField(default=0)
+
+    objects = ShardedManager()
+
+    def __str__(self):
+        return f'{self.user_id}: {self.count}'
+
+
+class RecipeStatsBucket(models.Model):
+    """유저별 price, time_minutes 분포의 히스토그램 버킷"""
+    PRICE = 'price'
+    TIME = 'time_minutes'
+    METRIC_CHOICES = ((PRICE, 'Price'), (TIME, 'Time minutes'))
+
+    # user 는 default DB 에, 이 모델은 user 의 shard 에 있으므로 DB 제약 조건을 두지 않음
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, db_constraint=False)
+    metric = models.CharField(max_length=20, choices=METRIC_CHOICES)
+    # 버킷의 하한값(price 는 1.00, time_minutes 는 5분 단위)
+    bucket = models.IntegerField()
+    count = models.IntegerField(default=0)
+
+    objects = ShardedManager()
+
+    class Meta:
+        unique_together = ('user', 'metric', 'bucket')
+
+    def __str__(self):
+        return f'{self.metric} {self.bucket}: {self.count}'
+
+
+class DeletionJob(models.Model):
+    """
+    계정 삭제 작업과 진행 상황
+
+    계정은 바로 비활성화하고, 데이터는 작업을 실행할 때 나누어서 삭제한다.
+    유저가 삭제된 뒤에도 기록이 남도록 user 에 DB 제약 조건을 두지 않음
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = ((PENDING, 'Pending'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed'))
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    # 현재 삭제 중인 데이터 종류(recipes, tags, ...)
+    stage = models.CharField(max_length=20, blank=True)
+    deleted = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'updated_at'])]
+
+    def __str__(self):
+        return f'{self.user_id}: {self.status}'
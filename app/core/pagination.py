@@ -0,0 +1,49 @@
+from collections import OrderedDict
+
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
+
+from .counting import count_with_estimate
+
+
+class EstimatedCountPagination(LimitOffsetPagination):
+    """
+    ?limit=&offset= 을 주었을 때만 나누어 반환하는 pagination, 주지 않으면 기존처럼 전체 목록
+
+    전체 수는 LIST_EXACT_COUNT_THRESHOLD 까지 정확하게 세고, 넘으면 view 의 get_count_estimate()
+    (유저별 카운터 등)나 planner 의 추정값을 사용하고 count_estimated 를 true 로 응답한다.
+    """
+    default_limit = None
+    max_limit = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # limit 이 없으면 COUNT 를 실행하지 않음
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+
+        estimate = view.get_count_estimate() if hasattr(view, 'get_count_estimate') else None
+        self.count, self.count_estimated = count_with_estimate(queryset, estimate=estimate)
+        self.offset = self.get_offset(request)
+        self.request = request
+        if self.count > self.limit and self.template is not None:
+            self.display_page_controls = True
+
+        self.page = list(queryset[self.offset:self.offset + self.limit])
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('count', self.count),
+            ('count_estimated', self.count_estimated),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_next_link(self):
+        if self.count_estimated and len(self.page) == self.limit:
+            # 추정값이 실제보다 작을 수 있으므로 페이지가 가득 찼으면 다음 페이지가 있는 것으로 봄
+            self.count = max(self.count, self.offset + self.limit + 1)
+
+        return super().get_next_link()
@@ -0,0 +1,84 @@
+from decimal import Decimal
+
+from django.conf import settings
+from django.urls import reverse
+from django.utils.translation import ugettext_lazy as _
+from rest_framework import serializers
+
+from .images import read_image_header
+
+
+class NativeDecimalField(serializers.DecimalField):
+    """
+    Decimal 을 표현할 수 있는 renderer(MessagePack 등)로 응답할 때는 문자열 대신 Decimal 을 반환
+    """
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+        if not getattr(getattr(request, 'accepted_renderer', None), 'native_decimal', False):
+            return super().to_representation(value)
+
+        if not isinstance(value, Decimal):
+            value = Decimal(str(value).strip())
+
+        return self.quantize(value)
+
+
+class HeaderCheckedImageField(serializers.ImageField):
+    """
+    Pillow 로 파일을 열기 전에 헤더만 읽어 크기, 형식, 픽셀 수를 확인하는 ImageField
+
+    IMAGE_MAX_BYTES, IMAGE_MAX_PIXELS 를 넘거나 IMAGE_FORMATS 가 아닌 파일은 디코딩하지 않고 거절한다.
+    """
+    default_error_messages = {
+        'max_bytes': _('이미지 파일은 {max_bytes} 바이트 이하여야 합니다.'),
+        'format': _('지원하지 않는 이미지 형식입니다.'),
+        'max_pixels': _('이미지는 {max_pixels} 픽셀 이하여야 합니다.'),
+    }
+
+    def to_internal_value(self, data):
+        # 파일이 아니거나 빈 파일은 ImageField 의 오류를 그대로 사용
+        if getattr(data, 'size', 0) and hasattr(data, 'seek'):
+            if data.size > settings.IMAGE_MAX_BYTES:
+                self.fail('max_bytes', max_bytes=settings.IMAGE_MAX_BYTES)
+            header = read_image_header(data)
+            if header is None or header.format not in settings.IMAGE_FORMATS:
+                self.fail('format')
+            if header.width * header.height > settings.IMAGE_MAX_PIXELS:
+                self.fail('max_pixels', max_pixels=settings.IMAGE_MAX_PIXELS)
+
+        return super().to_internal_value(data)
+
+
+class BatchSubRequestSerializer(serializers.Serializer):
+    """batch 요청에 포함된 하나의 API 요청"""
+    method = serializers.ChoiceField(
+        choices=('GET', 'POST', 'PUT', 'PATCH', 'DELETE'),
+        default='GET',
+    )
+    path = serializers.CharField()
+    body = serializers.JSONField(required=False)
+
+    def validate_path(self, value):
+        """/api/ 아래의 경로만 허용하고, batch 요청을 중첩하지 않음"""
+        if not value.startswith('/api/') or value.startswith(reverse('batch')):
+            raise serializers.ValidationError(_('batch 로 호출할 수 없는 경로입니다.'))
+
+        return value
+
+
+class BatchSerializer(serializers.Serializer):
+    """여러 API 요청을 한 번에 받는 batch 요청 직렬화"""
+    requests = BatchSubRequestSerializer(many=True)
+    # True 이면 서로 의존하지 않는 요청으로 보고 동시에 실행
+    parallel = serializers.BooleanField(default=False)
+
+    def validate_requests(self, value):
+        if not value:
+            raise serializers.ValidationError(_('요청이 비어 있습니다.'))
+        if len(value) > settings.BATCH_MAX_REQUESTS:
+            raise serializers.ValidationError(
+                _('한 번에 최대 %d 개의 요청만 보낼 수 있습니다.') % settings.BATCH_MAX_REQUESTS
+            )
+
+        return value
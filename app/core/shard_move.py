@@ -0,0 +1,174 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils import timezone
+
+from .models import User, Recipe, Tag, Ingredient, IngredientName, RecipeStats, RecipeStatsBucket, Tombstone
+from .sharding import SHARD_CACHE_KEY, shard_for_user
+
+THROUGH_MODELS = (Recipe.tags.through, Recipe.ingredients.through)
+# 복사하는 동안에도 쓰기를 받는 모델, 나머지(SUMMARY_MODELS)는 쓰기를 멈춘 뒤 통째로 복사
+LINKED_MODELS = (Tag, Ingredient, Recipe)
+SUMMARY_MODELS = (RecipeStats, RecipeStatsBucket, Tombstone)
+
+
+def _through_rows(through, using, recipe_ids):
+    return through.objects.using(using).filter(recipe_id__in=recipe_ids)
+
+
+def _upsert(model, rows, target):
+    """id 를 유지한 채 target 에 저장, signal 없이 INSERT / UPDATE 만 실행"""
+    if not rows:
+        return
+    if model is Ingredient:
+        # IngredientName 은 shard 마다 id 가 다르므로 이름으로 target 의 id 를 찾음
+        catalog = IngredientName.objects.resolve({row.name for row in rows}, using=target)
+        for row in rows:
+            row.catalog_id = catalog[row.name]
+    existing = set(model.objects.using(target).filter(pk__in=[row.pk for row in rows])
+                   .values_list('pk', flat=True))
+    model.objects.using(target).bulk_create([row for row in rows if row.pk not in existing])
+    fields = [field for field in model._meta.concrete_fields if not field.primary_key]
+    for row in rows:
+        if row.pk in existing:
+            model.objects.using(target).filter(pk=row.pk) \
+                .update(**{field.attname: getattr(row, field.attname) for field in fields})
+
+
+def _delete_rows(model, using, ids):
+    """signal 없이 행을 삭제, 옮기는 데이터의 삭제가 캐시, 통계, tombstone 에 반영되지 않도록 함"""
+    ids = list(ids)
+    if not ids:
+        return
+    connection = connections[using]
+    table = connection.ops.quote_name(model._meta.db_table)
+    column = connection.ops.quote_name(model._meta.pk.column)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE {column} IN ({", ".join(["%s"] * len(ids))})', ids)
+
+
+def _batches(queryset, batch_size):
+    """pk 순서로 batch_size 개씩 객체를 반환"""
+    last = None
+    while True:
+        page = queryset.order_by('pk')
+        if last is not None:
+            page = page.filter(pk__gt=last)
+        rows = list(page[:batch_size])
+        if not rows:
+            return
+        yield rows
+        last = rows[-1].pk
+
+
+def _set_placement(user_id, shard, moving_to=''):
+    User.objects.using(DEFAULT_DB_ALIAS).filter(pk=user_id).update(shard=shard, shard_moving_to=moving_to)
+    cache.delete(SHARD_CACHE_KEY.format(user_id))
+
+
+def _copy_all(user_id, source, target, batch_size):
+    """쓰기를 받는 중에 recipe, tag, ingredient 와 연결을 복사, 복사한 id 를 반환"""
+    copied = {}
+    for model in LINKED_MODELS:
+        copied[model] = set()
+        for rows in _batches(model.objects.using(source).filter(user_id=user_id), batch_size):
+            _upsert(model, rows, target)
+            copied[model].update(row.pk for row in rows)
+
+    for through, column, model in zip(THROUGH_MODELS, ('tag_id', 'ingredient_id'), (Tag, Ingredient)):
+        queryset = _through_rows(through, source, copied[Recipe])
+        for rows in _batches(queryset, batch_size):
+            # 복사한 뒤에 만든 tag / ingredient 와의 연결은 쓰기를 멈춘 뒤에 복사
+            _upsert(through, [row for row in rows if getattr(row, column) in copied[model]], target)
+
+
+def _sync_changes(user_id, source, target, since):
+    """쓰기를 멈춘 뒤 복사 이후의 변경, 삭제와 요약 데이터를 반영"""
+    changed_recipes = set()
+    for model in LINKED_MODELS:
+        rows = list(model.objects.using(source).filter(user_id=user_id, updated_at__gte=since))
+        _upsert(model, rows, target)
+        if model is Recipe:
+            changed_recipes = {row.pk for row in rows}
+
+    deleted = {}
+    for model in LINKED_MODELS:
+        source_ids = set(model.objects.using(source).filter(user_id=user_id).values_list('pk', flat=True))
+        target_ids = set(model.objects.using(target).filter(user_id=user_id).values_list('pk', flat=True))
+        deleted[model] = target_ids - source_ids
+
+    # 연결이 바뀌면 recipe 의 updated_at 이 갱신되므로 바뀐 recipe 의 연결만 다시 복사
+    for through, column, model in zip(THROUGH_MODELS, ('tag_id', 'ingredient_id'), (Tag, Ingredient)):
+        stale = through.objects.using(target).filter(recipe_id__in=changed_recipes | deleted[Recipe]) \
+            .values_list('pk', flat=True)
+        _delete_rows(through, target, stale)
+        stale = through.objects.using(target).filter(**{f'{column}__in': deleted[model]}) \
+            .values_list('pk', flat=True)
+        _delete_rows(through, target, stale)
+        _upsert(through, list(_through_rows(through, source, changed_recipes)), target)
+
+    for model in LINKED_MODELS:
+        _delete_rows(model, target, deleted[model])
+
+    for model in SUMMARY_MODELS:
+        _delete_rows(model, target, model.objects.using(target).filter(user_id=user_id).values_list('pk', flat=True))
+        _upsert(model, list(model.objects.using(source).filter(user_id=user_id)), target)
+
+
+def _purge(user_id, using, batch_size):
+    """shard 에서 유저의 데이터를 나누어 삭제"""
+    recipes = Recipe.objects.using(using).filter(user_id=user_id)
+    querysets = [through.objects.using(using).filter(recipe__in=recipes) for through in THROUGH_MODELS]
+    querysets += [model.objects.using(using).filter(user_id=user_id) for model in LINKED_MODELS[::-1]]
+    querysets += [model.objects.using(using).filter(user_id=user_id) for model in SUMMARY_MODELS]
+    for queryset in querysets:
+        while True:
+            ids = list(queryset.order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+            _delete_rows(queryset.model, using, ids)
+
+
+def move_user(user_id, target, batch_size=None, wait=None, log=None):
+    """
+    유저의 데이터를 다른 shard 로 옮김
+
+    1. 쓰기를 받으면서 전체를 복사
+    2. 쓰기를 멈추고(shard_moving_to) 모든 프로세스의 위치 캐시가 만료될 때까지 기다림
+    3. 복사 이후의 변경, 삭제와 요약 데이터를 반영하고 위치를 바꾼 뒤 쓰기를 다시 받음
+    4. 이전 위치를 읽던 요청이 끝날 때까지 기다린 뒤 원래 shard 의 데이터를 삭제
+
+    읽기는 옮기는 동안에도 계속 가능하고, 쓰기는 2~3 단계 동안만 503 으로 거절 된다.
+    id 는 그대로 유지하고, updated_at 은 옮긴 시각이 되므로 delta sync 에서 한 번 더 내려받는다.
+    """
+    batch_size = batch_size or settings.DELETION_BATCH_SIZE
+    wait = settings.SHARD_CACHE_TIMEOUT if wait is None else wait
+    log = log or (lambda message: None)
+    source = shard_for_user(user_id)
+    if target not in settings.DATABASE_SHARDS:
+        raise ValueError(f'{target} 은 shard 가 아닙니다.')
+    if target == source:
+        raise ValueError(f'이미 {target} 에 있습니다.')
+
+    since = timezone.now() - timedelta(seconds=settings.SYNC_CURSOR_OVERLAP)
+    log(f'{source} -> {target} 복사')
+    _copy_all(user_id, source, target, batch_size)
+
+    log('쓰기 중지')
+    _set_placement(user_id, source, moving_to=target)
+    time.sleep(wait)
+    try:
+        _sync_changes(user_id, source, target, since)
+        _set_placement(user_id, target)
+    except Exception:
+        _set_placement(user_id, source)
+        _purge(user_id, target, batch_size)
+        raise
+    log('쓰기 재개')
+
+    time.sleep(wait)
+    _purge(user_id, source, batch_size)
+    log(f'{source} 의 데이터 삭제')
@@ -0,0 +1,275 @@
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, models
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+SHARD_CACHE_KEY = 'db:shard:{}'
+# user_id 를 shard key 로 하여 user 의 shard 에 저장하는 모델
+SHARDED_MODELS = {
+    'core.recipe',
+    'core.recipe_tags',
+    'core.recipe_ingredients',
+    'core.tag',
+    'core.ingredient',
+    # 유저의 데이터는 아니지만 Ingredient 와 join 하므로 shard 마다 둠
+    'core.ingredientname',
+    'core.recipestats',
+    'core.recipestatsbucket',
+    'core.tombstone',
+}
+
+# filter(), create() 의 인자 중 유저를 가리키는 것
+USER_LOOKUPS = ('user', 'user_id', 'user__id', 'user__pk', 'user__exact', 'user_id__exact')
+
+_local = threading.local()
+
+
+class ShardNotSelected(RuntimeError):
+    """shard 가 여러 개인데 어느 유저의 데이터인지, 어느 shard 인지 알 수 없는 쿼리"""
+
+
+class ShardMoving(APIException):
+    """다른 shard 로 옮기는 중인 유저의 쓰기 요청"""
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = '데이터를 옮기는 중입니다. 잠시 후 다시 시도해주세요.'
+    default_code = 'shard_moving'
+
+
+def is_sharded(model):
+    return model._meta.label_lower in SHARDED_MODELS
+
+
+def _load_placement(user_id):
+    """User 테이블에서 (shard, 옮기는 중인지) 를 읽고, 처음이면 shard 를 배정하여 저장"""
+    from .models import User
+
+    shards = settings.DATABASE_SHARDS
+    row = User.objects.using(DEFAULT_DB_ALIAS).filter(pk=user_id) \
+        .values_list('shard', 'shard_moving_to').first()
+    if row is None:
+        return shards[user_id % len(shards)], False
+    shard, moving_to = row
+    if not shard:
+        # 처음 사용할 때 배정한 shard 를 저장, shard 가 늘어나도 기존 유저의 위치는 바뀌지 않음
+        shard = shards[user_id % len(shards)]
+        User.objects.using(DEFAULT_DB_ALIAS).filter(pk=user_id, shard='').update(shard=shard)
+        shard = User.objects.using(DEFAULT_DB_ALIAS).values_list('shard', flat=True).get(pk=user_id)
+
+    return shard, bool(moving_to)
+
+
+def placement(user_id):
+    """
+    유저의 (shard alias, 쓰기 중지 여부)
+
+    SHARD_CACHE_TIMEOUT 동안 캐시하므로 옮기는 도구는 값을 바꾼 뒤 그만큼 기다린다
+    """
+    if len(settings.DATABASE_SHARDS) == 1:
+        return settings.DATABASE_SHARDS[0], False
+
+    key = SHARD_CACHE_KEY.format(user_id)
+    value = cache.get(key)
+    if value is None:
+        value = _load_placement(user_id)
+        cache.set(key, value, settings.SHARD_CACHE_TIMEOUT)
+
+    return tuple(value)
+
+
+def shard_for_user(user_id):
+    return placement(user_id)[0]
+
+
+def current_user_id():
+    return getattr(_local, 'user_id', None)
+
+
+def current_shard():
+    return getattr(_local, 'shard', None)
+
+
+@contextmanager
+def use_user_shard(user_id):
+    """with 블록 안에서 user_id 를 알 수 없는 쿼리를 이 유저의 shard 로 보냄"""
+    previous = current_user_id()
+    _local.user_id = user_id
+    try:
+        yield
+    finally:
+        _local.user_id = previous
+
+
+@contextmanager
+def use_shard(alias):
+    """
+    with 블록 안에서 유저를 알 수 없는 쿼리를 alias shard 로 보냄
+
+    admin, 명령어, shell 처럼 특정 유저가 아닌 shard 전체를 다루는 코드에서 사용.
+    instance 나 user 로 유저를 알 수 있는 쿼리는 그대로 유저의 shard 를 사용한다
+    """
+    if alias not in settings.DATABASE_SHARDS:
+        raise ValueError(f'알 수 없는 shard: {alias}')
+    previous = current_shard()
+    _local.shard = alias
+    try:
+        yield
+    finally:
+        _local.shard = previous
+
+
+def lookup_user_id(lookups):
+    """filter(), create() 의 인자에서 유저 id 를 찾음, 없으면 None"""
+    for name in USER_LOOKUPS:
+        value = lookups.get(name)
+        if value is not None:
+            return getattr(value, 'pk', value)
+
+    return None
+
+
+class ShardedQuerySet(models.QuerySet):
+    """
+    filter(), get(), create() 등에 user / user_id 를 주면 그 유저의 shard 를 사용하는 QuerySet
+
+    유저를 router 의 hint 로 넘기므로 use_user_shard() 없이도 shard 를 정할 수 있다
+    """
+
+    def _for_user(self, user_id):
+        if user_id is None or self._hints.get('user_id') == user_id:
+            return self
+        clone = self._chain()
+        clone._hints = dict(self._hints, user_id=user_id)
+
+        return clone
+
+    def _filter_or_exclude(self, negate, *args, **kwargs):
+        queryset = self if negate else self._for_user(lookup_user_id(kwargs))
+        return super(ShardedQuerySet, queryset)._filter_or_exclude(negate, *args, **kwargs)
+
+    def create(self, **kwargs):
+        return super(ShardedQuerySet, self._for_user(lookup_user_id(kwargs))).create(**kwargs)
+
+    def get_or_create(self, defaults=None, **kwargs):
+        queryset = self._for_user(lookup_user_id(kwargs))
+        return super(ShardedQuerySet, queryset).get_or_create(defaults, **kwargs)
+
+    def update_or_create(self, defaults=None, **kwargs):
+        queryset = self._for_user(lookup_user_id(kwargs))
+        return super(ShardedQuerySet, queryset).update_or_create(defaults, **kwargs)
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        user_ids = {obj.user_id for obj in objs}
+        queryset = self._for_user(user_ids.pop()) if len(user_ids) == 1 else self
+        return super(ShardedQuerySet, queryset).bulk_create(objs, *args, **kwargs)
+
+
+ShardedManager = models.Manager.from_queryset(ShardedQuerySet)
+
+
+class UserShardMixin:
+    """
+    인증된 유저의 shard 를 요청이 끝날 때까지 사용하는 APIView mixin
+
+    view 안의 queryset, serializer 저장, M2M 변경이 모두 유저의 shard 로 간다
+    """
+
+    def initial(self, request, *args, **kwargs):
+        self._previous_shard_user = current_user_id()
+        super().initial(request, *args, **kwargs)
+        if request.user and request.user.is_authenticated:
+            _local.user_id = request.user.pk
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        _local.user_id = getattr(self, '_previous_shard_user', None)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class ShardRouter:
+    """
+    SHARDED_MODELS 의 쿼리를 유저의 shard 로 보내는 router
+
+    instance hint 의 user_id(또는 User 자신)나 ShardedQuerySet 이 넘긴 user_id hint 로
+    shard 를 정하고, hint 가 없으면 use_user_shard / UserShardMixin 으로 지정한 유저,
+    use_shard 로 지정한 shard 순서로 사용한다.
+    그 밖의 모델은 다음 router(ReplicaRouter)가 정한다.
+    """
+
+    def _user_id(self, hints):
+        instance = hints.get('instance')
+        if instance is not None:
+            if instance._meta.label_lower == settings.AUTH_USER_MODEL.lower():
+                return instance.pk
+            if getattr(instance, 'user_id', None) is not None:
+                return instance.user_id
+        if hints.get('user_id') is not None:
+            return hints['user_id']
+        return current_user_id()
+
+    def _placement(self, hints):
+        user_id = self._user_id(hints)
+        if user_id is None:
+            if len(settings.DATABASE_SHARDS) == 1:
+                return settings.DATABASE_SHARDS[0], False
+            instance = hints.get('instance')
+            if instance is not None and instance._state.db:
+                # through 테이블 행처럼 user_id 가 없는 객체는 읽어온 DB 를 사용
+                return instance._state.db, False
+            if current_shard() is not None:
+                return current_shard(), False
+            raise ShardNotSelected('user 로 조회하거나 use_user_shard(), use_shard() 로 지정해야 합니다.')
+
+        return placement(user_id)
+
+    def db_for_read(self, model, **hints):
+        if not is_sharded(model):
+            return None
+        alias, _ = self._placement(hints)
+        # default 에 있는 유저는 ReplicaRouter 가 replica 를 고를 수 있도록 넘김
+        return None if alias == DEFAULT_DB_ALIAS else alias
+
+    def db_for_write(self, model, **hints):
+        if not is_sharded(model):
+            return None
+        alias, frozen = self._placement(hints)
+        if frozen:
+            raise ShardMoving()
+
+        return alias
+
+
+def configure_id_ranges(using, **kwargs):
+    """
+    shard 마다 겹치지 않는 id 범위를 사용하도록 sequence 의 시작값을 설정
+
+    shard 간에 유저를 옮길 때 id 를 그대로 복사할 수 있도록 shard 번호 * SHARD_ID_RANGE 부터 시작.
+    이미 그보다 큰 id 가 있으면 그대로 둔다. post_migrate 에서 호출
+    """
+    from django.apps import apps
+
+    if using not in settings.DATABASE_SHARDS:
+        return
+    start = settings.DATABASE_SHARDS.index(using) * settings.SHARD_ID_RANGE
+    if not start:
+        return
+
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        for model in apps.get_models(include_auto_created=True):
+            if not is_sharded(model) or not isinstance(model._meta.pk, models.AutoField):
+                continue
+            table = model._meta.db_table
+            if connection.vendor == 'postgresql':
+                cursor.execute(
+                    f"SELECT setval(pg_get_serial_sequence(%s, 'id'), "
+                    f"GREATEST(%s, (SELECT COALESCE(MAX(id), 0) FROM {connection.ops.quote_name(table)})))",
+                    [table, start],
+                )
+            elif connection.vendor == 'sqlite':
+                cursor.execute('UPDATE sqlite_sequence SET seq = MAX(seq, %s) WHERE name = %s', [start, table])
+                if not cursor.rowcount:
+                    cursor.execute('INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)', [table, start])
@@ -0,0 +1,58 @@
+import os
+import tempfile
+import unittest
+
+from django.conf import settings
+from django.test import TransactionTestCase
+from django.test.runner import DiscoverRunner
+from django.test.signals import setting_changed
+
+
+def _iter_tests(suite):
+    for test in suite:
+        if isinstance(test, unittest.TestSuite):
+            yield from _iter_tests(test)
+        else:
+            yield test
+
+
+class TestRunner(DiscoverRunner):
+    """
+    테스트 실행마다 임시 디렉토리의 캐시 파일을 사용하는 test runner
+
+    테스트는 cache.clear() 를 호출하므로 개발 서버나 동시에 실행한 다른 테스트와
+    같은 SQLite 캐시 파일을 함께 쓰지 않도록 한다.
+    shard 가 여러 개이면 유저의 데이터가 default 가 아닌 shard 에도 저장되므로
+    모든 테스트가 shard 마다 트랜잭션을 열고 롤백하도록 multi_db 를 켠다.
+    """
+
+    def build_suite(self, *args, **kwargs):
+        suite = super().build_suite(*args, **kwargs)
+        if len(settings.DATABASE_SHARDS) > 1:
+            for test in _iter_tests(suite):
+                if isinstance(test, TransactionTestCase):
+                    type(test).multi_db = True
+
+        return suite
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._cache_dir = tempfile.TemporaryDirectory(prefix='app-test-cache-')
+        caches = {
+            alias: dict(config, LOCATION=os.path.join(self._cache_dir.name, f'{alias}.sqlite3'))
+            if config['BACKEND'] == 'core.cache.SQLiteCache' else config
+            for alias, config in settings.CACHES.items()
+        }
+        self._saved_caches = settings.CACHES
+        self._set_caches(caches)
+
+    def teardown_test_environment(self, **kwargs):
+        self._set_caches(self._saved_caches)
+        self._cache_dir.cleanup()
+        super().teardown_test_environment(**kwargs)
+
+    def _set_caches(self, caches):
+        # override_settings 는 SETTINGS_MODULE 을 가리므로 직접 바꾸고,
+        # setting_changed 로 이미 만들어진 cache 객체를 새 경로로 다시 만들게 함
+        settings.CACHES = caches
+        setting_changed.send(sender=self.__class__, setting='CACHES', value=caches, enter=True)
@@ -0,0 +1,129 @@
+import json
+import os
+import re
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+# 1 이면 테스트 결과로 snapshot 을 모두 다시 저장
+UPDATE_ENV = 'UPDATE_QUERY_PLANS'
+# 실행 계획을 확인할 때 끄는 PostgreSQL planner 설정
+PG_DISABLED_PLANS = ('enable_seqscan', 'enable_hashjoin', 'enable_mergejoin')
+NUMBER = re.compile(r"(?<![\w.])\d+(\.\d+)?(?![\w.])|'[^']*'")
+
+
+def normalize_sql(sql):
+    """id, 문자열 등 실행마다 바뀌는 값을 ? 로 바꿈"""
+    return NUMBER.sub('?', sql)
+
+
+def explain(sql):
+    """
+    (실행 계획, 전체를 훑는 테이블 목록) 을 반환
+
+    SQLite 는 EXPLAIN QUERY PLAN 의 SCAN(인덱스 전체를 읽는 것도 포함),
+    PostgreSQL 은 EXPLAIN (FORMAT JSON) 의 Seq Scan 과 조건 없는 Index Scan 을 전체 탐색으로 본다.
+    PostgreSQL 은 테스트 데이터가 작으면 인덱스가 있어도 Seq Scan 이나 전체를 읽는 hash / merge join 을
+    고르므로, 이를 끄고 실행 계획을 확인하여 모든 테이블을 인덱스로 찾을 수 있는지 본다.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            for setting in PG_DISABLED_PLANS:
+                cursor.execute(f'SET {setting} = off')
+            try:
+                cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+                root = cursor.fetchone()[0][0]['Plan']
+            finally:
+                for setting in PG_DISABLED_PLANS:
+                    cursor.execute(f'RESET {setting}')
+            plan, scans = [], set()
+
+            def walk(node, depth=0):
+                relation = node.get('Relation Name')
+                index = node.get('Index Name')
+                plan.append('  ' * depth + ' '.join(filter(None, [node['Node Type'], relation, index])))
+                if node['Node Type'] == 'Seq Scan' or (index and 'Index Cond' not in node):
+                    scans.add(relation)
+                for child in node.get('Plans', ()):
+                    walk(child, depth + 1)
+            walk(root)
+            return plan, sorted(scans)
+
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        plan = [row[-1] for row in cursor.fetchall()]
+
+    scans = set()
+    for detail in plan:
+        match = re.match(r'SCAN (?:TABLE )?(\w+)', detail)
+        if match and match.group(1) not in ('CONSTANT', 'SUBQUERY'):
+            scans.add(match.group(1))
+
+    return plan, sorted(scans)
+
+
+class QueryPlanSnapshotMixin:
+    """
+    요청이 실행한 쿼리의 SQL, 실행 계획을 snapshot 과 비교하는 TestCase mixin
+
+    snapshot 은 plan_snapshot_dir 에 DB 종류별 JSON 으로 저장한다.
+    모든 쿼리가 인덱스로 찾는지(전체 탐색이 없는지) 확인하고, snapshot 보다 쿼리 수가 늘거나
+    snapshot 이 없으면 실패한다. snapshot 은 UPDATE_QUERY_PLANS=1 로 테스트를 실행할 때만 저장하고,
+    이때도 전체 탐색이 있으면 실패하므로 snapshot 으로 전체 탐색을 허용할 수 없다.
+    """
+    plan_snapshot_dir = None
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls._snapshot_path = os.path.join(cls.plan_snapshot_dir, f'{connection.vendor}.json')
+        cls._snapshots = {}
+        if os.path.exists(cls._snapshot_path):
+            with open(cls._snapshot_path) as file:
+                cls._snapshots = json.load(file)
+        cls._snapshots_changed = False
+
+    @classmethod
+    def tearDownClass(cls):
+        if cls._snapshots_changed:
+            os.makedirs(cls.plan_snapshot_dir, exist_ok=True)
+            with open(cls._snapshot_path, 'w') as file:
+                json.dump(cls._snapshots, file, indent=2, sort_keys=True, ensure_ascii=False)
+                file.write('\n')
+        super().tearDownClass()
+
+    def capture_plans(self, request):
+        """request() 가 실행한 SELECT 쿼리마다 SQL, 실행 계획, 전체 탐색 테이블을 반환"""
+        with CaptureQueriesContext(connection) as context:
+            request()
+        queries = []
+        for query in context.captured_queries:
+            if not query['sql'].lstrip().upper().startswith('SELECT'):
+                continue
+            plan, scans = explain(query['sql'])
+            queries.append({'sql': normalize_sql(query['sql']), 'plan': plan, 'scans': scans})
+
+        return queries
+
+    def assertQueryPlans(self, name, request):
+        queries = self.capture_plans(request)
+        for query in queries:
+            self.assertFalse(
+                query['scans'],
+                f'{name}: {", ".join(query["scans"])} 를 전체 탐색합니다.\n{query["sql"]}\n'
+                + '\n'.join(query['plan']),
+            )
+        if os.environ.get(UPDATE_ENV) == '1':
+            self._snapshots[name] = queries
+            type(self)._snapshots_changed = True
+            return
+
+        snapshot = self._snapshots.get(name)
+        self.assertIsNotNone(
+            snapshot,
+            f'{name}: {self._snapshot_path} 에 snapshot 이 없습니다. {UPDATE_ENV}=1 로 실행하여 저장하세요.',
+        )
+        self.assertLessEqual(
+            len(queries), len(snapshot),
+            f'{name}: 쿼리 수가 {len(snapshot)} 에서 {len(queries)} 로 늘었습니다.\n'
+            + '\n'.join(query['sql'] for query in queries),
+        )
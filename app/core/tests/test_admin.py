@@ -1,8 +1,17 @@
+from unittest import skipUnless
+from unittest.mock import patch
+
 from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
+from django.db import connection
 
 from django.urls import reverse
 
+from core import sharding
+from core.counting import estimate_count
+from core.models import Tag, Ingredient, Recipe
+
 
 class AdminSiteTest(TestCase):
     def setUp(self):
@@ -46,3 +55,90 @@ class AdminSiteTest(TestCase):
         res = self.client.get(url)
 
         self.assertEqual(res.status_code, 200)
+
+
+class ScalableAdminTest(TestCase):
+    """행이 많아도 동작하는 tag, ingredient, recipe admin 테스트"""
+
+    def setUp(self):
+        self.client = Client()
+        self.admin_user = get_user_model().objects.create_superuser(
+            email='admin@TEST.COM',
+            password='password123'
+        )
+        self.client.force_login(self.admin_user)
+
+    def sample_recipes(self, count):
+        start = get_user_model().objects.count()
+        for i in range(start, start + count):
+            user = get_user_model().objects.create_user(f'user{i}@test.com', 'password123')
+            Recipe.objects.create(user=user, title=f'Recipe {i}', time_minutes=5, price=5)
+
+    def test_recipe_changelist_constant_queries(self):
+        """recipe 수에 따라 user 를 조회하는 쿼리가 늘지 않는지 테스트"""
+        url = reverse('admin:core_recipe_changelist')
+        self.sample_recipes(2)
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(url)
+        self.sample_recipes(10)
+        with CaptureQueriesContext(connection) as many:
+            res = self.client.get(url)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(few), len(many))
+
+    def test_recipe_change_page_uses_autocomplete(self):
+        """recipe 폼이 전체 tag 를 select 로 그리지 않는지 테스트"""
+        user = get_user_model().objects.create_user('owner@test.com', 'password123')
+        recipe = Recipe.objects.create(user=user, title='Ramen', time_minutes=5, price=5)
+        recipe.tags.add(Tag.objects.create(user=user, name='Spicy'))
+        Tag.objects.create(user=user, name='Unrelated')
+
+        res = self.client.get(reverse('admin:core_recipe_change', args=[recipe.id]),
+                              {'shard': sharding.shard_for_user(user.pk)})
+
+        self.assertEqual(res.status_code, 200)
+        self.assertContains(res, 'Spicy')
+        self.assertNotContains(res, 'Unrelated')
+        self.assertContains(res, 'admin-autocomplete')
+
+    def test_search_by_prefix(self):
+        user = get_user_model().objects.create_user('owner@test.com', 'password123')
+        Ingredient.objects.create(user=user, name='Salt')
+        Ingredient.objects.create(user=user, name='Sea salt')
+
+        res = self.client.get(reverse('admin:core_ingredient_changelist'),
+                              {'q': 'Sa', 'shard': sharding.shard_for_user(user.pk)})
+
+        self.assertContains(res, 'Salt')
+        self.assertNotContains(res, 'Sea salt')
+
+    def test_estimated_count_paginator(self):
+        """추정값이 크면 COUNT(*) 대신 추정값으로 페이지를 나누는지 테스트"""
+        self.sample_recipes(3)
+        with patch('core.admin.estimate_count', return_value=1000000) as estimate:
+            res = self.client.get(reverse('admin:core_recipe_changelist'))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.context['cl'].result_count, 1000000)
+        self.assertIsNone(res.context['cl'].full_result_count)
+        estimate.assert_called_once()
+
+
+class EstimateCountTest(TestCase):
+
+    def test_exact_count_below_threshold(self):
+        """추정할 수 없거나 작은 결과는 정확한 COUNT(*) 를 반환"""
+        user = get_user_model().objects.create_user('owner@test.com', 'password123')
+        Tag.objects.create(user=user, name='Spicy')
+
+        self.assertEqual(estimate_count(Tag.objects.filter(user=user)), 1)
+        self.assertEqual(estimate_count(Tag.objects.filter(user=user, name='Sweet')), 0)
+
+    @skipUnless(connection.vendor == 'postgresql', 'PostgreSQL 의 통계를 사용')
+    def test_planner_estimate(self):
+        """threshold 를 넘으면 planner 의 추정값을 그대로 반환"""
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE core_tag')
+
+        self.assertGreaterEqual(estimate_count(Tag.objects.using('default').filter(name__startswith='S'), threshold=0), 0)
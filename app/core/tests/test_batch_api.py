@@ -0,0 +1,110 @@
+import gc
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Recipe
+from recipe import events
+
+
+BATCH_URL = reverse('batch')
+
+
+class PublicBatchApiTests(TestCase):
+    """인증받지 않은 batch API 테스트"""
+
+    def test_login_required(self):
+        res = APIClient().post(BATCH_URL, {'requests': [{'path': '/api/user/me/'}]}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateBatchApiTests(TestCase):
+    """인증된 유저의 batch API 테스트"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@master.com',
+            'pass1234',
+            name='smith',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_batch_dispatches_sub_requests(self):
+        """하위 요청들이 같은 유저로 실행되어 응답이 함께 반환되는지 테스트"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        payload = {'requests': [
+            {'path': '/api/user/me/'},
+            {'path': '/api/recipe/tags/'},
+            {'path': '/api/recipe/recipes/?tags=1'},
+        ]}
+
+        res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        me, tags, recipes = res.data['responses']
+        self.assertEqual(me['status'], status.HTTP_200_OK)
+        self.assertEqual(me['body']['email'], self.user.email)
+        self.assertEqual(tags['body'][0]['name'], 'Vegan')
+        self.assertEqual(recipes['body'], [])
+
+    def test_batch_prerendered_response(self):
+        """미리 렌더링 된 recipe detail 응답도 JSON 으로 담기는지 테스트"""
+        recipe = Recipe.objects.create(user=self.user, title='Soup', time_minutes=5, price=5)
+
+        res = self.client.post(
+            BATCH_URL, {'requests': [{'path': f'/api/recipe/recipes/{recipe.id}/'}]}, format='json'
+        )
+
+        self.assertEqual(res.data['responses'][0]['body']['title'], 'Soup')
+
+    def test_batch_write_sub_request(self):
+        """body 가 있는 하위 요청으로 객체를 생성할 수 있는지 테스트"""
+        payload = {'requests': [
+            {'method': 'POST', 'path': '/api/recipe/tags/', 'body': {'name': 'Dessert'}},
+            {'path': '/api/recipe/tags/'},
+        ]}
+
+        res = self.client.post(BATCH_URL, payload, format='json')
+
+        created, listed = res.data['responses']
+        self.assertEqual(created['status'], status.HTTP_201_CREATED)
+        self.assertEqual(listed['body'][0]['name'], 'Dessert')
+        self.assertTrue(Tag.objects.filter(user=self.user, name='Dessert').exists())
+
+    def test_batch_parallel(self):
+        """parallel 옵션으로 하위 요청을 동시에 실행하는 테스트"""
+        payload = {'parallel': True, 'requests': [{'path': '/api/user/me/'}] * 3}
+
+        res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['status'] for r in res.data['responses']], [200] * 3)
+
+    def test_batch_unknown_path(self):
+        """존재하지 않는 경로는 404 응답으로 담기는지 테스트"""
+        res = self.client.post(BATCH_URL, {'requests': [{'path': '/api/nothing/'}]}, format='json')
+
+        self.assertEqual(res.data['responses'][0]['status'], status.HTTP_404_NOT_FOUND)
+
+    def test_batch_nested_not_allowed(self):
+        """batch 요청 안에 batch 요청을 넣을 수 없음"""
+        res = self.client.post(BATCH_URL, {'requests': [{'path': BATCH_URL}]}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_batch_streaming_not_allowed(self):
+        """스트리밍 응답은 오류로 담고, 응답을 닫아 SSE 구독자 수를 돌려주는지 테스트"""
+        gc.collect()
+        subscribers = events.subscriber_count()
+        payload = {'requests': [{'path': reverse('recipe:events')}, {'path': '/api/user/me/'}]}
+
+        res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['status'] for r in res.data['responses']], [400, 200])
+        self.assertEqual(events.subscriber_count(), subscribers)
@@ -0,0 +1,104 @@
+import os
+import tempfile
+import time
+from unittest.mock import patch
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from core.cache import SQLiteCache
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    """SQLite 캐시 backend 테스트"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.location = os.path.join(self.tmpdir.name, 'cache.sqlite3')
+        self.cache = SQLiteCache(self.location, {'OPTIONS': {'MAX_ENTRIES': 10, 'CULL_FREQUENCY': 2}})
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_set_and_get(self):
+        """값을 저장하고 읽을 수 있는지 테스트"""
+        self.cache.set('recipe', {'title': 'Soup', 'tags': [1, 2]})
+        self.cache.set('count', 3)
+
+        self.assertEqual(self.cache.get('recipe'), {'title': 'Soup', 'tags': [1, 2]})
+        self.assertEqual(self.cache.get('count'), 3)
+        self.assertIsNone(self.cache.get('missing'))
+        self.assertEqual(self.cache.get_many(['recipe', 'missing']), {'recipe': {'title': 'Soup', 'tags': [1, 2]}})
+
+    def test_shared_between_instances(self):
+        """같은 파일을 사용하는 다른 인스턴스(프로세스)에서 값이 보이는지 테스트"""
+        other = SQLiteCache(self.location, {})
+        self.cache.set('shared', True)
+
+        self.assertIs(other.get('shared'), True)
+        other.delete('shared')
+        self.assertFalse(self.cache.has_key('shared'))
+
+    def test_timeout(self):
+        """만료 시간이 지나면 값을 반환하지 않는지 테스트"""
+        self.cache.set('key', 'value', timeout=10)
+
+        with patch('time.time', return_value=time.time() + 20):
+            self.assertIsNone(self.cache.get('key'))
+            self.assertTrue(self.cache.add('key', 'new'))
+        self.assertEqual(self.cache.get('key'), 'new')
+
+    def test_add(self):
+        """이미 존재하는 키에는 add 가 저장하지 않는지 테스트"""
+        self.assertTrue(self.cache.add('key', 1))
+        self.assertFalse(self.cache.add('key', 2))
+        self.assertEqual(self.cache.get('key'), 1)
+
+    def test_incr(self):
+        """incr 이 정수와 pickle 된 값 모두 증가시키는지 테스트"""
+        self.cache.set('counter', 1)
+        self.cache.set('decimal', 1.5)
+
+        self.assertEqual(self.cache.incr('counter'), 2)
+        self.assertEqual(self.cache.incr('counter', 10), 12)
+        self.assertEqual(self.cache.incr('decimal'), 2.5)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_take_token(self):
+        """capacity 만큼 바로 꺼낼 수 있고, 그 뒤로는 interval 마다 하나씩 꺼낼 수 있는지 테스트"""
+        now = time.time()
+        with patch('time.time', return_value=now):
+            self.assertEqual([self.cache.take_token('user:1', 10, 3) for _ in range(3)], [0, 0, 0])
+            self.assertAlmostEqual(self.cache.take_token('user:1', 10, 3), 10)
+            self.assertEqual(SQLiteCache(self.location, {}).take_token('user:2', 10, 3), 0)
+        with patch('time.time', return_value=now + 4):
+            self.assertAlmostEqual(self.cache.take_token('user:1', 10, 3), 6)
+        with patch('time.time', return_value=now + 10):
+            self.assertEqual(self.cache.take_token('user:1', 10, 3), 0)
+            self.assertAlmostEqual(self.cache.take_token('user:1', 10, 3), 10)
+
+    def test_lru_cull(self):
+        """MAX_ENTRIES 를 넘으면 오래 사용하지 않은 항목부터 삭제되는지 테스트"""
+        now = time.time()
+        for i in range(12):
+            with patch('time.time', return_value=now + i * 10):
+                self.cache.set(f'key{i}', i)
+        # 가장 먼저 저장한 key0 을 다시 사용
+        with patch('time.time', return_value=now + 200):
+            self.cache.get('key0')
+
+        self.cache._cull(self.cache._connection())
+
+        self.assertTrue(self.cache.has_key('key0'))
+        self.assertFalse(self.cache.has_key('key1'))
+        self.assertTrue(self.cache.has_key('key11'))
+
+    def test_tests_use_separate_cache_file(self):
+        """테스트는 개발 서버와 다른 임시 캐시 파일을 사용하는지 테스트"""
+        location = settings.CACHES['default']['LOCATION']
+
+        self.assertNotEqual(location, os.path.join(tempfile.gettempdir(), 'app-cache.sqlite3'))
+        self.assertNotEqual(location, os.environ.get('CACHE_LOCATION'))
+        self.assertEqual(cache._path, location)
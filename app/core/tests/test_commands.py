@@ -1,8 +1,15 @@
+import os
+import tempfile
+from io import StringIO
 from unittest.mock import patch
 
-from django.core.management import call_command
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
 from django.db.utils import OperationalError
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase
+
+from core.management.commands.loadtest import parse_mix, percentile
+from core.management.commands.profile_startup import ImportTime, parse_import_times
 
 
 class CommandsTestCase(TestCase):
@@ -23,3 +30,71 @@ class CommandsTestCase(TestCase):
             gi.side_effect = [OperationalError] * 5 + [True]
             call_command('wait_for_db')
             self.assertEqual(gi.call_count, 6)
+
+    def test_parse_import_times(self):
+        lines = [
+            'import time: self [us] | cumulative | imported package',
+            'import time:       120 |        120 |     django.utils.six',
+            'import time:      3000 |       3120 |   django.http',
+        ]
+
+        self.assertEqual(parse_import_times(lines), [
+            ImportTime('django.utils.six', 120, 120, 2),
+            ImportTime('django.http', 3000, 3120, 1),
+        ])
+
+    def test_profile_startup(self):
+        """새 프로세스에서 setup 과 첫 요청의 시간, 모듈별 import 시간을 출력하는지 테스트"""
+        out = StringIO()
+        call_command('profile_startup', repeat=1, limit=3, stdout=out)
+
+        self.assertIn('django.setup()', out.getvalue())
+        self.assertIn('-> 405', out.getvalue())
+        self.assertIn('modules (cumulative)', out.getvalue())
+
+    def test_parse_mix(self):
+        self.assertEqual(parse_mix('recipes=4, tags'), {'recipes': 4.0, 'tags': 1.0})
+        with self.assertRaises(CommandError):
+            parse_mix('unknown=1')
+        with self.assertRaises(CommandError):
+            parse_mix('recipes=0')
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([7], 95), 7)
+        self.assertEqual(percentile([], 95), 0.0)
+
+
+class LoadTestCommandTests(TransactionTestCase):
+    """worker thread 가 각자 DB 연결을 쓰므로 커밋된 데이터로 테스트"""
+
+    def setUp(self):
+        cache.clear()
+
+    def run_loadtest(self, **options):
+        out = StringIO()
+        call_command('loadtest', concurrency=2, duration=0.3, users=2, recipes=3, stdout=out, **options)
+        return out.getvalue()
+
+    def test_loadtest_in_process(self):
+        """seed 유저의 토큰으로 요청을 보내고 처리량과 지연 시간을 출력하는지 테스트"""
+        output = self.run_loadtest(mix='recipes,recipe,me', auth='signed')
+
+        self.assertIn('in-process', output)
+        self.assertIn('errors 0', output)
+        self.assertIn('p99 ms', output)
+        self.assertIn('recipe ', output)
+
+    def test_loadtest_socket_profile(self):
+        """로컬 HTTP 서버를 거쳐 요청하고 서버의 profile 을 저장하는지 테스트"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'loadtest.prof')
+            output = self.run_loadtest(mix='tags,ingredients', socket=True, profile=path)
+
+            self.assertTrue(os.path.exists(path))
+        self.assertIn('socket', output)
+        self.assertIn('errors 0', output)
+        self.assertIn('cumulative', output)
@@ -0,0 +1,137 @@
+from unittest import skipUnless
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, RequestFactory, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core import db_router
+from core.models import Recipe, User
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingMiddlewareTests(SimpleTestCase):
+    """요청에 따라 읽기 alias 를 고르는 middleware 와 router 테스트"""
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.router = db_router.ReplicaRouter()
+        self.seen = []
+
+        def get_response(request):
+            self.seen.append((self.router.db_for_read(Recipe), self.router.db_for_read(User)))
+            return HttpResponse()
+        self.middleware = db_router.ReplicaRoutingMiddleware(get_response)
+
+    def test_safe_request_reads_replica(self):
+        """GET 의 읽기는 replica 로, 인증 정보는 primary 에서 읽음"""
+        self.middleware(self.factory.get('/', HTTP_AUTHORIZATION='Token a'))
+
+        self.assertEqual(self.seen, [('replica', 'default')])
+        self.assertIsNone(db_router.get_read_alias())
+
+    def test_write_pins_to_primary(self):
+        """쓰기 요청 뒤에는 같은 사용자의 읽기를 primary 로 보냄"""
+        self.middleware(self.factory.post('/', HTTP_AUTHORIZATION='Token a'))
+        self.middleware(self.factory.get('/', HTTP_AUTHORIZATION='Token a'))
+        self.middleware(self.factory.get('/', HTTP_AUTHORIZATION='Token b'))
+
+        self.assertEqual([recipe for recipe, _ in self.seen], ['default', 'default', 'replica'])
+
+    def test_pin_key_hides_credential(self):
+        """토큰이 캐시 키에 남지 않는지 테스트"""
+        key = db_router._pin_key(self.factory.get('/', HTTP_AUTHORIZATION='Bearer secret-token'))
+
+        self.assertNotIn('secret-token', key)
+        self.assertNotEqual(key, db_router._pin_key(self.factory.get('/', HTTP_AUTHORIZATION='Bearer other')))
+
+    def test_writes_and_migrations_use_primary(self):
+        self.assertEqual(self.router.db_for_write(Recipe), 'default')
+        self.assertFalse(self.router.allow_migrate('replica', 'core'))
+        self.assertTrue(self.router.allow_migrate('default', 'core'))
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas(self):
+        self.middleware(self.factory.get('/'))
+
+        self.assertEqual(self.seen, [('default', 'default')])
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTransactionTests(TestCase):
+
+    def test_reads_primary_inside_transaction(self):
+        """커밋 전 데이터는 replica 에 없으므로 트랜잭션 안에서는 primary 에서 읽음"""
+        router = db_router.ReplicaRouter()
+        seen = []
+
+        def get_response(request):
+            seen.append(router.db_for_read(Recipe))
+            return HttpResponse()
+        db_router.ReplicaRoutingMiddleware(get_response)(RequestFactory().get('/'))
+
+        self.assertEqual(seen, ['default'])
+
+
+@override_settings(DATABASE_REPLICAS=[], DEBUG=True)
+class QueryCounterTests(TestCase):
+    """alias 별 쿼리 수 테스트"""
+
+    def test_query_counts(self):
+        cache.clear()
+        user = get_user_model().objects.create_user('test@master.com', 'pass1234', shard='default')
+        client = APIClient()
+        client.force_authenticate(user)
+        before = db_router.query_counts().get('default', 0)
+
+        res = client.get(RECIPES_URL)
+
+        self.assertRegex(res['X-DB-Queries'], r'^default=\d+$')
+        self.assertEqual(
+            db_router.query_counts()['default'] - before,
+            int(res['X-DB-Queries'].split('=')[1]),
+        )
+
+    @override_settings(DEBUG=False)
+    def test_query_counts_header_only_in_debug(self):
+        """운영 환경의 응답에는 쿼리 수를 노출하지 않음"""
+        user = get_user_model().objects.create_user('test@master.com', 'pass1234')
+        client = APIClient()
+        client.force_authenticate(user)
+
+        res = client.get(RECIPES_URL)
+
+        self.assertNotIn('X-DB-Queries', res)
+
+
+@skipUnless(settings.DATABASE_REPLICAS, 'DB_REPLICA_HOSTS 로 replica alias 를 설정해야 함')
+@override_settings(DEBUG=True)
+class ReplicaIntegrationTests(TransactionTestCase):
+    """default 의 test mirror 인 replica alias 를 사용하는 테스트"""
+    multi_db = True
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user('test@master.com', 'pass1234')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user).key}')
+
+    def queries(self, res):
+        return dict(item.split('=') for item in res['X-DB-Queries'].split(', '))
+
+    def test_list_reads_replica_until_write(self):
+        res = self.client.get(RECIPES_URL)
+        self.assertIn(settings.DATABASE_REPLICAS[0], self.queries(res))
+
+        self.client.post(RECIPES_URL, {'title': 'Ramen', 'time_minutes': 5, 'price': '5.00'})
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(list(self.queries(res)), ['default'])
+        self.assertEqual([r['title'] for r in res.data], ['Ramen'])
@@ -0,0 +1,116 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from PIL import Image
+
+from core import deletion, sharding
+from core.models import DeletionJob, Recipe, Tag, Ingredient, RecipeStats, Tombstone
+from user.tests.authentication import issue_token_pair, user_from_refresh_token
+
+
+def sample_recipe(user, **params):
+    defaults = {'title': 'sample recipe', 'time_minutes': 10, 'price': 5.00}
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+def sample_image():
+    with tempfile.NamedTemporaryFile(suffix='.jpg') as temp:
+        Image.new('RGB', (10, 10)).save(temp, format='JPEG')
+        temp.seek(0)
+        return SimpleUploadedFile('sample.jpg', temp.read())
+
+
+class UserDeletionTests(TestCase):
+    """계정을 나누어 삭제하는 작업 테스트"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user('test@master.com', 'pass1234')
+        tag = Tag.objects.create(user=self.user, name='Spicy')
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        for i in range(5):
+            recipe = sample_recipe(user=self.user, title=f'Recipe {i}')
+            recipe.tags.add(tag)
+            recipe.ingredients.add(ingredient)
+
+    def test_schedule_disables_account(self):
+        """삭제를 등록하면 바로 로그인과 토큰 사용이 불가능해짐"""
+        Token.objects.create(user=self.user)
+        refresh = issue_token_pair(self.user)['refresh']
+
+        job = deletion.schedule_user_deletion(self.user)
+
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        self.assertFalse(Token.objects.filter(user=self.user).exists())
+        with self.assertRaises(AuthenticationFailed):
+            user_from_refresh_token(refresh)
+        self.assertEqual(job.status, DeletionJob.PENDING)
+        self.assertEqual(deletion.schedule_user_deletion(self.user), job)
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 5)
+
+    def test_run_job_in_batches(self):
+        """batch 단위로 삭제하며 진행 상황을 기록하고 마지막에 유저를 삭제"""
+        job = deletion.schedule_user_deletion(self.user)
+        progress = []
+        shard = sharding.shard_for_user(self.user.pk)
+
+        deletion.run_deletion_job(job, batch_size=2, progress=lambda j: progress.append((j.stage, j.deleted)))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, DeletionJob.DONE)
+        self.assertEqual(progress[:3], [('recipes', 2), ('recipes', 4), ('recipes', 5)])
+        self.assertFalse(get_user_model().objects.filter(pk=self.user.pk).exists())
+        self.assertFalse(Tag.objects.using(shard).exists())
+        self.assertFalse(Ingredient.objects.using(shard).exists())
+        self.assertFalse(RecipeStats.objects.using(shard).exists())
+        self.assertFalse(Tombstone.objects.filter(user_id=self.user.pk).exists())
+        self.assertFalse(Recipe.tags.through.objects.using(shard).exists())
+
+    def test_failed_job_is_retried(self):
+        job = deletion.schedule_user_deletion(self.user)
+        DeletionJob.objects.filter(pk=job.pk).update(status=DeletionJob.FAILED)
+
+        call_command('process_deletion_jobs', batch_size=2, stdout=StringIO())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, DeletionJob.DONE)
+        self.assertFalse(get_user_model().objects.filter(pk=self.user.pk).exists())
+
+    def test_claim_once(self):
+        """같은 작업을 두 worker 가 동시에 가져가지 않음"""
+        job = deletion.schedule_user_deletion(self.user)
+        other = DeletionJob.objects.get(pk=job.pk)
+
+        self.assertTrue(deletion.claim(job))
+        self.assertFalse(deletion.claim(other))
+        self.assertEqual(list(deletion.claimable_jobs()), [])
+
+
+class RecipeImageDeletionTests(TransactionTestCase):
+    """삭제된 recipe 의 이미지 파일이 커밋 후에 삭제되는지 테스트"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user('test@master.com', 'pass1234')
+
+    def test_user_deletion_removes_images(self):
+        recipe = sample_recipe(user=self.user)
+        recipe.image = sample_image()
+        recipe.save()
+        path = recipe.image.path
+        self.assertTrue(os.path.exists(path))
+
+        deletion.run_deletion_job(deletion.schedule_user_deletion(self.user))
+
+        self.assertFalse(os.path.exists(path))
@@ -0,0 +1,61 @@
+from io import BytesIO, StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+from PIL import Image, features
+
+from core.images import ImageHeader, JPEG_CHUNK_SIZE, JPEG_HEADER_LIMIT, read_image_header
+
+
+def image_file(fmt, size=(30, 20), **params):
+    buffer = BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, format=fmt, **params)
+    buffer.seek(0)
+
+    return buffer
+
+
+class ReadImageHeaderTests(SimpleTestCase):
+    """헤더만 읽어 이미지 형식과 크기를 확인하는 테스트"""
+
+    def test_formats(self):
+        formats = ['JPEG', 'PNG', 'GIF'] + (['WEBP'] if features.check('webp') else [])
+        for fmt in formats:
+            with self.subTest(fmt):
+                self.assertEqual(read_image_header(image_file(fmt)), ImageHeader(fmt, 30, 20))
+
+    def test_jpeg_with_metadata_and_progressive(self):
+        """EXIF 등 SOF 앞의 segment 를 건너뛰고 크기를 읽음"""
+        file = image_file('JPEG', exif=b'Exif\x00\x00' + bytes(5000), progressive=True)
+
+        self.assertEqual(read_image_header(file), ImageHeader('JPEG', 30, 20))
+        self.assertEqual(file.tell(), 0)
+
+    def test_invalid_files(self):
+        truncated = image_file('JPEG').read(20)
+        for content in (b'', b'not an image', b'\x89PNG\r\n\x1a\n', truncated, image_file('BMP').read()):
+            with self.subTest(content[:10]):
+                self.assertIsNone(read_image_header(BytesIO(content)))
+
+    def test_jpeg_without_sof_stops_early(self):
+        """SOF 가 없는 큰 파일은 앞부분만 훑고 거절"""
+        class CountingFile(BytesIO):
+            read_bytes = 0
+
+            def read(self, size=-1):
+                data = super().read(size)
+                self.read_bytes += len(data)
+                return data
+
+        for filler in (b'\x00', b'\xff'):
+            with self.subTest(filler):
+                file = CountingFile(b'\xff\xd8' + filler * (10 * 1024 * 1024))
+
+                self.assertIsNone(read_image_header(file))
+                self.assertLessEqual(file.read_bytes, JPEG_HEADER_LIMIT + 2 * JPEG_CHUNK_SIZE)
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command('benchmark', target=['images'], size=1, repeat=1, stdout=out)
+
+        self.assertIn('ms/MB', out.getvalue())
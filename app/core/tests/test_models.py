@@ -1,14 +1,16 @@
 from unittest.mock import patch
 
+from django.core.cache import cache
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 
-from ..models import Tag, Ingredient, Recipe, recipe_image_file_path
+from ..models import Tag, Ingredient, IngredientName, Recipe, recipe_image_file_path
+from ..sharding import use_shard
 
 
-def sample_user(email='hello@world.com', password='test123123'):
+def sample_user(email='hello@world.com', password='test123123', **params):
     """sample user 생성"""
-    return get_user_model().objects.create_user(email, password)
+    return get_user_model().objects.create_user(email, password, **params)
 
 
 class ModelTest(TestCase):
@@ -62,6 +64,26 @@ class ModelTest(TestCase):
 
         self.assertEqual(str(ingredient), ingredient.name)
 
+    def test_ingredient_names_shared(self):
+        """같은 이름의 재료는 유저가 달라도 IngredientName 하나를 참조하는지 테스트"""
+        # IngredientName 은 shard 마다 있으므로 두 유저를 같은 shard 에 둠
+        cache.clear()
+        salt = Ingredient.objects.create(user=sample_user(shard='default'), name='Salt')
+        other = Ingredient.objects.create(user=sample_user('other@world.com', shard='default'), name='Salt')
+
+        self.assertEqual(salt.catalog_id, other.catalog_id)
+        with use_shard('default'):
+            self.assertEqual(IngredientName.objects.count(), 1)
+
+        # 이름을 바꾸면 다른 유저의 재료는 그대로 두고 새 이름을 참조
+        salt.name = 'Sea salt'
+        salt.save()
+        other.refresh_from_db()
+        self.assertEqual(Ingredient.objects.get(user=salt.user, pk=salt.pk).name, 'Sea salt')
+        self.assertEqual(Ingredient.objects.get(user=other.user, pk=other.pk).name, 'Salt')
+        with use_shard('default'):
+            self.assertEqual(IngredientName.objects.count(), 2)
+
     def test_recipe_str(self):
         """레시피의 문자열 테스트"""
         recipe = Recipe.objects.create(
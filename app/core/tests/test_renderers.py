@@ -0,0 +1,78 @@
+from datetime import datetime, date
+from decimal import Decimal
+from io import BytesIO, StringIO
+
+import pytz
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+from core.renderers import FastJSONRenderer, FastJSONParser
+
+
+class FastJSONRendererTests(TestCase):
+    """orjson 기반 renderer 가 JSONRenderer 와 같은 결과를 내는지 테스트"""
+
+    def assertSameAsStock(self, data, accepted_media_type=None, renderer_context=None):
+        self.assertEqual(
+            FastJSONRenderer().render(data, accepted_media_type, renderer_context),
+            JSONRenderer().render(data, accepted_media_type, renderer_context),
+        )
+
+    def test_render_recipe_payload(self):
+        """Decimal, datetime, lazy 문자열, 한글이 포함된 payload"""
+        self.assertSameAsStock({
+            'id': 1,
+            'title': '김치찌개',
+            'price': Decimal('5.50'),
+            'tags': [1, 2],
+            'updated_at': datetime(2019, 1, 2, 3, 4, 5, 123456, tzinfo=pytz.utc),
+            'created': date(2019, 1, 2),
+            'message': gettext_lazy('This field is required.'),
+            10: None,
+        })
+
+    def test_render_line_separators_escaped(self):
+        self.assertSameAsStock({'title': 'a\u2028b\u2029c'})
+
+    def test_render_indent_falls_back(self):
+        """indent 를 요청하면 기존 JSONRenderer 와 같은 들여쓰기로 렌더링"""
+        self.assertSameAsStock({'a': [1, 2]}, 'application/json; indent=4')
+
+    def test_render_none(self):
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+    def test_default_renderer(self):
+        self.assertIs(api_settings.DEFAULT_RENDERER_CLASSES[0], FastJSONRenderer)
+
+
+class FastJSONParserTests(TestCase):
+    """orjson 기반 parser 테스트"""
+
+    def test_parse(self):
+        data = FastJSONParser().parse(BytesIO('{"title": "된장찌개", "price": 5.5}'.encode()))
+
+        self.assertEqual(data, {'title': '된장찌개', 'price': 5.5})
+
+    def test_parse_other_encoding(self):
+        data = FastJSONParser().parse(
+            BytesIO('{"title": "된장찌개"}'.encode('utf-16')),
+            parser_context={'encoding': 'utf-16'},
+        )
+
+        self.assertEqual(data, {'title': '된장찌개'})
+
+    def test_parse_invalid(self):
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(BytesIO(b'{"title": '))
+
+    def test_benchmark_command(self):
+        """benchmark 명령이 renderer 와 parser 를 비교하여 출력하는지 테스트"""
+        out = StringIO()
+        call_command('benchmark', target=['renderers'], size=5, repeat=1, stdout=out)
+
+        self.assertIn('FastJSONRenderer', out.getvalue())
+        self.assertIn('FastJSONParser', out.getvalue())
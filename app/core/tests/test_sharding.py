@@ -0,0 +1,160 @@
+from io import StringIO
+from unittest import skipUnless
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import sharding
+from core.models import Recipe, Tag, Ingredient, IngredientName, RecipeStats
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def sample_user(email='test@master.com', **params):
+    return get_user_model().objects.create_user(email, 'pass1234', **params)
+
+
+@override_settings(DATABASE_SHARDS=['default', 'other'])
+class ShardRouterTests(TestCase):
+    """유저의 shard 를 정하는 router 테스트"""
+
+    def setUp(self):
+        cache.clear()
+        self.router = sharding.ShardRouter()
+
+    def test_placement_is_assigned_once(self):
+        """처음 사용할 때 배정한 shard 를 저장하여 shard 가 늘어나도 유지"""
+        user = sample_user()
+
+        shard = sharding.shard_for_user(user.pk)
+
+        user.refresh_from_db()
+        self.assertEqual(shard, ['default', 'other'][user.pk % 2])
+        self.assertEqual(user.shard, shard)
+        cache.clear()
+        with override_settings(DATABASE_SHARDS=['default', 'other', 'third']):
+            self.assertEqual(sharding.shard_for_user(user.pk), shard)
+
+    def test_routes_by_instance_and_context(self):
+        user = sample_user(shard='other')
+
+        self.assertEqual(self.router.db_for_write(Recipe, instance=Recipe(user_id=user.pk)), 'other')
+        with sharding.use_user_shard(user.pk):
+            self.assertEqual(self.router.db_for_read(Tag), 'other')
+            self.assertEqual(self.router.db_for_write(Recipe.tags.through), 'other')
+        self.assertIsNone(self.router.db_for_read(get_user_model()))
+
+    def test_default_shard_reads_fall_through(self):
+        """default shard 의 읽기는 ReplicaRouter 가 정하도록 넘김"""
+        user = sample_user(shard='default')
+
+        with sharding.use_user_shard(user.pk):
+            self.assertIsNone(self.router.db_for_read(Recipe))
+            self.assertEqual(self.router.db_for_write(Recipe), 'default')
+
+    def test_routes_by_user_lookup(self):
+        """filter(), create() 등의 user / user_id 로 shard 를 정함"""
+        user = sample_user(shard='other')
+
+        self.assertEqual(Recipe.objects.filter(user=user).db, 'other')
+        self.assertEqual(Tag.objects.filter(user_id=user.pk).order_by('name').db, 'other')
+        self.assertEqual(Ingredient.objects.filter(user__id=user.pk).db, 'other')
+        self.assertEqual(RecipeStats.objects.filter(user=user)._hints, {'user_id': user.pk})
+
+    def test_explicit_shard_context(self):
+        """유저를 알 수 없는 쿼리는 use_shard() 로 지정한 shard 를 사용"""
+        with sharding.use_shard('other'):
+            self.assertEqual(self.router.db_for_read(Tag), 'other')
+            self.assertEqual(Recipe.objects.all().db, 'other')
+        with self.assertRaises(ValueError):
+            with sharding.use_shard('missing'):
+                pass
+
+    def test_query_without_user_fails(self):
+        with self.assertRaises(sharding.ShardNotSelected):
+            self.router.db_for_write(Recipe)
+
+    def test_moving_user_writes_rejected(self):
+        """옮기는 중인 유저는 읽기만 가능하고 쓰기는 503"""
+        user = sample_user(shard='default', shard_moving_to='other')
+        client = APIClient()
+        client.force_authenticate(user)
+
+        self.assertEqual(client.get(RECIPES_URL).status_code, status.HTTP_200_OK)
+        res = client.post(RECIPES_URL, {'title': 'Ramen', 'time_minutes': 5, 'price': '5.00'})
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res.data['detail'].code, 'shard_moving')
+
+
+@skipUnless(len(settings.DATABASE_SHARDS) > 1, 'DB_SHARD_NAMES 로 shard 를 추가해야 함')
+class ShardIntegrationTests(TestCase):
+    """default 와 두 번째 shard 를 사용하는 테스트"""
+    multi_db = True
+
+    def setUp(self):
+        cache.clear()
+        self.target = settings.DATABASE_SHARDS[1]
+        self.client = APIClient()
+
+    def create_recipes(self, user):
+        self.client.force_authenticate(user)
+        tag = self.client.post(reverse('recipe:tag-list'), {'name': 'Spicy'}).data['id']
+        ingredient = self.client.post(reverse('recipe:ingredient-list'), {'name': 'Salt'}).data['id']
+        for i in range(3):
+            self.client.post(RECIPES_URL, {
+                'title': f'Recipe {i}', 'time_minutes': 5, 'price': '5.00',
+                'tags': [tag], 'ingredients': [ingredient],
+            })
+
+    def test_user_data_stored_in_shard(self):
+        user = sample_user(shard=self.target)
+
+        self.create_recipes(user)
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(len(res.data), 3)
+        self.assertEqual(Recipe.objects.using(self.target).filter(user=user).count(), 3)
+        self.assertFalse(Recipe.objects.using('default').filter(user=user).exists())
+        self.assertEqual(Recipe.tags.through.objects.using(self.target).count(), 3)
+
+    def test_admin_uses_selected_shard(self):
+        """admin 은 ?shard= 로 고른 shard 의 데이터를 보여주고 세션에 기억"""
+        admin = get_user_model().objects.create_superuser('admin@master.com', 'pass1234')
+        user = sample_user(shard=self.target)
+        recipe = Recipe.objects.create(user=user, title='Ramen', time_minutes=5, price=5)
+        self.client.force_login(admin)
+        url = reverse('admin:core_recipe_changelist')
+
+        self.assertNotContains(self.client.get(url), 'Ramen')
+        self.assertContains(self.client.get(url, {'shard': self.target}), 'Ramen')
+        res = self.client.get(reverse('admin:core_recipe_change', args=[recipe.id]))
+        self.assertContains(res, 'Ramen')
+
+    def test_move_user(self):
+        """옮긴 뒤에도 id, 연결, 통계가 그대로이고 원래 shard 에는 남지 않음"""
+        user = sample_user(shard='default')
+        self.create_recipes(user)
+        before = self.client.get(RECIPES_URL).data
+        ingredients = self.client.get(reverse('recipe:ingredient-list')).data
+        # 재료 이름의 id 는 shard 마다 다르므로 target 에서 다시 찾아 연결해야 함
+        IngredientName.objects.using(self.target).create(name='Pepper')
+
+        call_command('move_user_shard', user.pk, self.target, wait=0, stdout=StringIO())
+
+        user.refresh_from_db()
+        self.assertEqual((user.shard, user.shard_moving_to), (self.target, ''))
+        self.assertEqual(self.client.get(RECIPES_URL).data, before)
+        self.assertEqual(self.client.get(reverse('recipe:ingredient-list')).data, ingredients)
+        for model in (Recipe, Tag, Ingredient, RecipeStats, Recipe.tags.through):
+            self.assertFalse(model.objects.using('default').exists(), model)
+        with sharding.use_user_shard(user.pk):
+            self.assertEqual(RecipeStats.objects.get(user=user).count, 3)
+        res = self.client.post(RECIPES_URL, {'title': 'Ramen', 'time_minutes': 5, 'price': '5.00'})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
@@ -0,0 +1,58 @@
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+TAGS_URL = reverse('recipe:tag-list')
+TOKEN_URL = reverse('user:token')
+RATES = {'user': '2/min', 'anon': '2/min', 'login': '1/min'}
+
+
+@override_settings(REST_FRAMEWORK=dict(settings.REST_FRAMEWORK, DEFAULT_THROTTLE_RATES=RATES))
+class ThrottleApiTests(TestCase):
+    """token bucket throttle 테스트"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user('test@master.com', 'pass1234')
+        self.client = APIClient()
+
+    def test_user_throttled_with_retry_after(self):
+        """rate 를 넘은 요청은 429 와 다음 token 까지의 Retry-After 를 반환"""
+        self.client.force_authenticate(self.user)
+        codes = [self.client.get(TAGS_URL).status_code for _ in range(3)]
+
+        self.assertEqual(codes, [status.HTTP_200_OK, status.HTTP_200_OK, status.HTTP_429_TOO_MANY_REQUESTS])
+        res = self.client.get(TAGS_URL)
+        self.assertIn(int(res['Retry-After']), (29, 30))
+
+    def test_users_throttled_separately(self):
+        other = APIClient()
+        other.force_authenticate(get_user_model().objects.create_user('other@master.com', 'pass1234'))
+        self.client.force_authenticate(self.user)
+        for _ in range(2):
+            self.client.get(TAGS_URL)
+
+        self.assertEqual(other.get(TAGS_URL).status_code, status.HTTP_200_OK)
+
+    def test_login_throttled(self):
+        """비밀번호를 확인하는 토큰 발급은 login rate 로 제한"""
+        payload = {'email': 'test@master.com', 'password': 'pass1234'}
+
+        self.assertEqual(self.client.post(TOKEN_URL, payload).status_code, status.HTTP_200_OK)
+        res = self.client.post(TOKEN_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', res)
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command('benchmark', target=['throttle'], size=5, repeat=1, stdout=out)
+
+        self.assertIn('TokenBucketThrottle', out.getvalue())
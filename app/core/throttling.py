@@ -0,0 +1,81 @@
+from django.core.cache import cache as default_cache
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+
+def take_token(cache, key, interval, capacity):
+    """
+    cache 의 token bucket 에서 token 을 꺼내고 기다려야 하는 시간(초)을 반환, 꺼냈으면 0
+
+    SQLiteCache 는 프로세스 사이에서 원자적으로 처리하고, 그 밖의 cache 는 get / set 으로 근사한다.
+    """
+    if hasattr(cache, 'take_token'):
+        return cache.take_token(key, interval, capacity)
+
+    now = SimpleRateThrottle.timer()
+    tat = max(cache.get(key, now), now) + interval
+    if tat - now > interval * capacity:
+        return tat - now - interval * capacity
+    cache.set(key, tat, int(tat - now) + 1)
+
+    return 0.0
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    scope 의 rate('횟수/기간')로 채워지는 token bucket throttle
+
+    기간 동안 '횟수' 만큼 한 번에 요청할 수 있고(burst), 그 뒤로는 기간 / 횟수 마다 하나씩 가능해진다.
+    요청 기록 대신 bucket 상태 하나만 저장하므로 요청 당 cache 쓰기 한 번으로 끝난다.
+    거절하면 다음 token 까지의 시간을 Retry-After 헤더로 보낸다.
+    """
+    cache = default_cache
+
+    def get_rate(self):
+        # override_settings 로 바꾼 rate 도 반영되도록 클래스 속성 대신 매번 읽음
+        return api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.retry_after = take_token(self.cache, self.key, self.duration / self.num_requests, self.num_requests)
+        return not self.retry_after
+
+    def wait(self):
+        return self.retry_after
+
+
+class UserRateThrottle(TokenBucketThrottle):
+    """인증된 유저는 유저마다, 그 밖에는 IP 마다 제한"""
+    scope = 'user'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+
+class AnonRateThrottle(TokenBucketThrottle):
+    """인증되지 않은 요청을 IP 마다 제한"""
+    scope = 'anon'
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return None
+
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class LoginRateThrottle(TokenBucketThrottle):
+    """비밀번호 해시를 계산하는 토큰 발급을 IP 마다 제한"""
+    scope = 'login'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
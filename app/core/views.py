@@ -0,0 +1,117 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connections
+from django.http import Http404
+from django.urls import resolve
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from user.tests.authentication import SignedTokenAuthentication
+from .serializers import BatchSerializer
+
+# 하위 요청에 그대로 넘기지 않는 요청 헤더
+EXCLUDED_META = ('CONTENT_TYPE', 'CONTENT_LENGTH', 'QUERY_STRING', 'PATH_INFO', 'wsgi.input')
+
+
+class BatchView(APIView):
+    """
+    여러 API 요청을 한 번의 왕복으로 처리
+
+    인증은 batch 요청에서 한 번만 수행하고, 하위 요청은 같은 유저로 URLconf 를 통해
+    프로세스 내부에서 실행한다. 미들웨어는 하위 요청마다 다시 실행되지 않는다.
+    """
+    authentication_classes = (TokenAuthentication, SignedTokenAuthentication)
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request, *args, **kwargs):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        sub_requests = serializer.validated_data['requests']
+
+        if serializer.validated_data['parallel'] and len(sub_requests) > 1:
+            with ThreadPoolExecutor(max_workers=settings.BATCH_MAX_WORKERS) as executor:
+                responses = list(executor.map(
+                    lambda sub: self._dispatch_in_thread(request, sub), sub_requests
+                ))
+        else:
+            responses = [self._dispatch(request, sub) for sub in sub_requests]
+
+        return Response({'responses': responses})
+
+    def _dispatch_in_thread(self, request, sub):
+        """스레드에서 하위 요청을 실행하고, 스레드가 연 DB 연결을 정리"""
+        try:
+            return self._dispatch(request, sub)
+        finally:
+            connections.close_all()
+
+    def _dispatch(self, request, sub):
+        """하위 요청 하나를 실행하고 status / body 를 반환"""
+        url = urlsplit(sub['path'])
+        try:
+            match = resolve(url.path)
+        except Http404:
+            return {'path': sub['path'], 'status': 404, 'body': {'detail': 'Not found.'}}
+
+        sub_request = self._build_request(request, sub, url)
+        response = match.func(sub_request, *match.args, **match.kwargs)
+        try:
+            if response.streaming:
+                # SSE 처럼 끝나지 않는 스트림은 하나의 body 로 모을 수 없음
+                return {'path': sub['path'], 'status': 400,
+                        'body': {'detail': '스트리밍 응답은 batch 로 호출할 수 없습니다.'}}
+            if hasattr(response, 'data'):
+                body = response.data
+            elif response.get('Content-Type', '').startswith('application/json'):
+                # recipe detail 처럼 미리 렌더링 된 JSON 응답
+                body = json.loads(response.content)
+            else:
+                body = response.content.decode(response.charset) if response.content else None
+        finally:
+            self._close_response(response)
+
+        return {'path': sub['path'], 'status': response.status_code, 'body': body}
+
+    @staticmethod
+    def _close_response(response):
+        """
+        응답이 잡은 자원(SSE 구독자 수 등)을 돌려줌
+
+        response.close() 는 request_finished 를 보내 batch 요청이 쓰는 중인 DB 연결까지 닫으므로
+        WSGI 서버가 닫을 때처럼 닫을 객체만 닫는다.
+        """
+        for closable in response._closable_objects:
+            try:
+                closable.close()
+            except Exception:
+                pass
+        response.closed = True
+
+    def _build_request(self, request, sub, url):
+        """batch 요청의 헤더와 인증 정보를 이어받은 WSGIRequest 생성"""
+        payload = json.dumps(sub['body']).encode() if 'body' in sub else b''
+        environ = {
+            key: value for key, value in request._request.META.items()
+            if key not in EXCLUDED_META
+        }
+        environ.update({
+            'REQUEST_METHOD': sub['method'],
+            'PATH_INFO': url.path,
+            'QUERY_STRING': url.query,
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': str(len(payload)),
+            'wsgi.input': BytesIO(payload),
+        })
+        sub_request = WSGIRequest(environ)
+        # 이미 인증된 유저를 하위 요청에서 다시 인증하지 않도록 전달
+        sub_request._force_auth_user = request.user
+        sub_request._force_auth_token = request.auth
+
+        return sub_request
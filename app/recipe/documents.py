@@ -0,0 +1,73 @@
+from django.core.cache import cache
+from django.db import transaction
+
+DETAIL_CACHE_KEY = 'recipe:detail:{}'
+GENERATION_CACHE_KEY = 'recipe:detail:generation:{}'
+
+
+def _detail_key(recipe_id):
+    return DETAIL_CACHE_KEY.format(recipe_id)
+
+
+def _generation_key(recipe_id):
+    return GENERATION_CACHE_KEY.format(recipe_id)
+
+
+def get_cached_detail(recipe_id):
+    """
+    캐시에 저장된 recipe detail 문서와 현재 세대를 반환
+
+    ((user_id, JSON bytes) 또는 None, generation) 튜플
+    문서를 만든 뒤에 세대가 바뀌었으면 문서가 있어도 None
+    """
+    key, generation_key = _detail_key(recipe_id), _generation_key(recipe_id)
+    found = cache.get_many([key, generation_key])
+    generation = found.get(generation_key, 0)
+    cached = found.get(key)
+    if cached is None or cached[0] != generation:
+        return None, generation
+
+    return cached[1:], generation
+
+
+def build_detail(recipe, generation):
+    """
+    RecipeDetailSerializer 의 JSON 을 미리 렌더링하여 캐시에 저장하고 bytes 를 반환
+
+    generation 은 recipe 를 조회하기 전에 읽은 세대, 렌더링 중에 무효화되면
+    저장한 문서의 세대가 맞지 않으므로 다음 조회 때 다시 생성 됨
+    """
+    # app ready 때 signals 가 이 모듈을 읽으므로 renderer, serializer 는 처음 렌더링할 때 읽음
+    from core.renderers import FastJSONRenderer
+    from .serializer import RecipeDetailSerializer
+
+    document = FastJSONRenderer().render(RecipeDetailSerializer(recipe).data)
+    cache.set(_detail_key(recipe.pk), (generation, recipe.user_id, document), None)
+
+    return document
+
+
+def _bump_generations(recipe_ids):
+    for recipe_id in recipe_ids:
+        key = _generation_key(recipe_id)
+        cache.add(key, 0, None)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # 그 사이 캐시에서 삭제된 경우
+            cache.set(key, 1, None)
+    cache.delete_many([_detail_key(recipe_id) for recipe_id in recipe_ids])
+
+
+def invalidate_details(recipe_ids, using=None):
+    """
+    recipe detail 문서의 세대를 올려 무효화, 다음 조회 때 다시 생성 됨
+
+    커밋 전에 다른 요청이 이전 데이터로 문서를 다시 만들 수 있으므로 커밋한 뒤에 한번 더 올림
+    """
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return
+    _bump_generations(recipe_ids)
+    if transaction.get_connection(using).in_atomic_block:
+        transaction.on_commit(lambda: _bump_generations(recipe_ids), using=using)
@@ -0,0 +1,179 @@
+import json
+import math
+import threading
+import time
+import weakref
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+SEQUENCE_KEY = 'recipe:events:{}'
+EVENT_KEY = 'recipe:events:{}:{}'
+
+CREATED, UPDATED, DELETED = 'created', 'updated', 'deleted'
+
+_subscribers_lock = threading.Lock()
+_subscribers = 0
+
+
+class TooManySubscribers(APIException):
+    """프로세스의 구독자가 SSE_MAX_SUBSCRIBERS 에 도달"""
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = '변경 스트림의 연결이 너무 많습니다. 잠시 후 다시 시도해주세요.'
+    default_code = 'too_many_subscribers'
+
+    def __init__(self):
+        super().__init__()
+        # 클라이언트가 SSE retry 와 같은 간격으로 다시 연결하도록 Retry-After 로 보냄
+        self.wait = math.ceil(settings.SSE_RETRY_MS / 1000)
+
+
+def last_event_id(user_id):
+    """유저의 마지막 이벤트 번호, 이벤트가 없으면 0"""
+    return cache.get(SEQUENCE_KEY.format(user_id)) or 0
+
+
+def publish(user_id, model, action, object_ids):
+    """
+    유저의 변경 이벤트를 캐시에 추가
+
+    같은 호스트의 모든 worker 가 함께 쓰는 캐시를 broker 로 사용한다.
+    이벤트는 번호가 붙어 SSE_EVENT_TTL 동안 남고, 구독자는 번호만 확인하다가 새 이벤트만 읽는다.
+    """
+    key = SEQUENCE_KEY.format(user_id)
+    cache.add(key, 0, None)
+    for object_id in object_ids:
+        sequence = cache.incr(key)
+        cache.set(EVENT_KEY.format(user_id, sequence),
+                  {'model': model, 'action': action, 'id': object_id}, settings.SSE_EVENT_TTL)
+
+
+def publish_on_commit(user_id, model, action, object_ids, using=None):
+    """트랜잭션이 커밋된 뒤에 이벤트를 보냄, 롤백되면 보내지 않음"""
+    object_ids = list(object_ids)
+    if object_ids:
+        transaction.on_commit(lambda: publish(user_id, model, action, object_ids), using=using)
+
+
+def _format(event_id=None, event=None, data=None, comment=None):
+    lines = []
+    if comment is not None:
+        lines.append(f': {comment}')
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    if event is not None:
+        lines.append(f'event: {event}')
+    if data is not None:
+        lines.append(f'data: {json.dumps(data, separators=(",", ":"))}')
+
+    return ('\n'.join(lines) + '\n\n').encode()
+
+
+def _release_connections():
+    """스트림을 여는 동안 DB 연결을 잡고 있지 않도록 닫음, 이후에는 캐시만 읽음"""
+    for connection in connections.all():
+        if not connection.in_atomic_block:
+            connection.close()
+
+
+def stream(user_id, last_id=None):
+    """
+    SSE 형식으로 유저의 변경 이벤트를 보내는 generator
+
+    last_id(Last-Event-ID) 다음 이벤트부터 보내고, 없으면 연결한 뒤의 이벤트만 보낸다.
+    기다리는 동안에는 SSE_POLL_INTERVAL 마다 캐시의 번호 하나만 읽으므로 쉬는 구독자의 비용이 거의 없다.
+    놓친 이벤트가 이미 만료되었으면 reset 이벤트를 보내고, 클라이언트는 delta sync 로 다시 맞춘다.
+    SSE_MAX_DURATION 이 지나면 연결을 끝내고, 클라이언트는 Last-Event-ID 로 다시 연결한다.
+    """
+    _release_connections()
+    if last_id is None:
+        last_id = last_event_id(user_id)
+    # 연결이 끊어지면 클라이언트가 다시 연결하기까지 기다리는 시간(ms)
+    yield f'retry: {settings.SSE_RETRY_MS}\n\n'.encode()
+
+    deadline = time.monotonic() + settings.SSE_MAX_DURATION
+    idle_since = time.monotonic()
+    missing = None
+    while time.monotonic() < deadline:
+        current = last_event_id(user_id)
+        if current < last_id:
+            # 캐시가 비워져 번호가 처음부터 다시 시작된 경우
+            last_id = current
+            yield _format(event_id=current, event='reset', data={'reason': 'restarted'})
+        elif current > last_id:
+            keys = [EVENT_KEY.format(user_id, sequence)
+                    for sequence in range(last_id + 1, min(current, last_id + settings.SSE_MAX_BACKLOG) + 1)]
+            found = cache.get_many(keys)
+            if current - last_id > settings.SSE_MAX_BACKLOG or (keys[0] not in found and missing == keys[0]):
+                # 너무 많이 밀렸거나 만료, 기록되지 않은 이벤트, 다음 이벤트부터 보내고 delta sync 를 요청
+                last_id = current
+                missing = None
+                yield _format(event_id=current, event='reset', data={'reason': 'expired'})
+                continue
+            missing = None
+            for sequence, key in enumerate(keys, last_id + 1):
+                if key not in found:
+                    # publish 가 번호를 올린 뒤 이벤트를 쓰기 전일 수 있으므로 한 번 더 기다림
+                    missing = key
+                    break
+                last_id = sequence
+                idle_since = time.monotonic()
+                yield _format(event_id=sequence, data=found[key])
+            if missing is None:
+                continue
+
+        if time.monotonic() - idle_since >= settings.SSE_HEARTBEAT:
+            idle_since = time.monotonic()
+            yield _format(comment='ping')
+        time.sleep(settings.SSE_POLL_INTERVAL)
+
+
+def subscriber_count():
+    """이 프로세스에서 열려 있는 스트림 수"""
+    return _subscribers
+
+
+def _release_subscriber():
+    global _subscribers
+    with _subscribers_lock:
+        _subscribers -= 1
+
+
+class _Subscription:
+    """
+    스트림을 감싸 연결이 닫히면 구독자 수를 줄임, 시작하기 전에 닫혀도 줄어듦
+
+    응답이 close() 되지 않고 버려져도 GC 될 때 weakref.finalize 로 수를 줄인다.
+    finalize 는 한 번만 실행되므로 close() 와 GC 가 모두 일어나도 한 번만 줄어든다.
+    """
+
+    def __init__(self, events):
+        self._events = events
+        self._release = weakref.finalize(self, _release_subscriber)
+
+    def __iter__(self):
+        return self._events
+
+    def close(self):
+        self._release()
+        self._events.close()
+
+
+def subscribe(user_id, last_id=None):
+    """
+    구독자 수를 세는 stream 을 반환
+
+    sync worker 에서는 구독자마다 thread 하나가 SSE_POLL_INTERVAL 마다 깨어나며 연결을 잡고 있으므로
+    프로세스의 구독자가 SSE_MAX_SUBSCRIBERS 이면 TooManySubscribers(503) 로 거절한다.
+    StreamingHttpResponse 가 닫히거나 응답이 버려져 GC 될 때 수가 줄어든다.
+    """
+    global _subscribers
+    with _subscribers_lock:
+        if _subscribers >= settings.SSE_MAX_SUBSCRIBERS:
+            raise TooManySubscribers()
+        _subscribers += 1
+
+    return _Subscription(stream(user_id, last_id))
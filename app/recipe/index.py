@@ -0,0 +1,235 @@
+import heapq
+import threading
+from collections import Counter, OrderedDict, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router, transaction
+
+from core.models import Recipe
+
+VERSION_CACHE_KEY = 'recipe:index-version:{}'
+
+
+class UserRecipeIndex:
+    """
+    한 유저의 recipe 별 tags, ingredients 집합과 역색인(inverted index)
+
+    tag / ingredient id 에서 그것을 사용하는 recipe id 집합으로의 색인을 두어,
+    유사도나 재료 포함 여부를 계산할 때 겹치는 항목이 있는 recipe 만 살펴본다.
+    """
+
+    def __init__(self, version):
+        self.version = version
+        self.tags = {}
+        self.ingredients = {}
+        self.tag_postings = defaultdict(set)
+        self.ingredient_postings = defaultdict(set)
+        # ingredient 개수별 recipe id, 겹치는 재료가 없어도 k 개 이하만 부족한 recipe 를 찾을 때 사용
+        self.by_size = defaultdict(set)
+
+    def set_recipe(self, recipe_id, tag_ids, ingredient_ids):
+        """recipe 의 연결을 새로 저장"""
+        self.remove_recipe(recipe_id)
+        self.tags[recipe_id] = frozenset(tag_ids)
+        self.ingredients[recipe_id] = frozenset(ingredient_ids)
+        for tag_id in self.tags[recipe_id]:
+            self.tag_postings[tag_id].add(recipe_id)
+        for ingredient_id in self.ingredients[recipe_id]:
+            self.ingredient_postings[ingredient_id].add(recipe_id)
+        self.by_size[len(self.ingredients[recipe_id])].add(recipe_id)
+
+    def remove_recipe(self, recipe_id):
+        for tag_id in self.tags.pop(recipe_id, ()):
+            self._discard(self.tag_postings, tag_id, recipe_id)
+        ingredients = self.ingredients.pop(recipe_id, None)
+        if ingredients is None:
+            return
+        for ingredient_id in ingredients:
+            self._discard(self.ingredient_postings, ingredient_id, recipe_id)
+        self._discard(self.by_size, len(ingredients), recipe_id)
+
+    def _discard(self, postings, key, recipe_id):
+        postings[key].discard(recipe_id)
+        if not postings[key]:
+            del postings[key]
+
+    def similar(self, recipe_id, limit):
+        """
+        tags, ingredients 합집합의 Jaccard 유사도가 높은 recipe 를 반환
+
+        [(recipe_id, score), ...] 유사도 내림차순, 같으면 최근 recipe 먼저
+        """
+        tags = self.tags.get(recipe_id, frozenset())
+        ingredients = self.ingredients.get(recipe_id, frozenset())
+        size = len(tags) + len(ingredients)
+        if not size:
+            return []
+
+        # 겹치는 항목 수(교집합 크기)를 역색인에서 바로 센다
+        overlap = Counter()
+        for tag_id in tags:
+            overlap.update(self.tag_postings[tag_id])
+        for ingredient_id in ingredients:
+            overlap.update(self.ingredient_postings[ingredient_id])
+        del overlap[recipe_id]
+
+        scores = (
+            (shared / (size + len(self.tags[other]) + len(self.ingredients[other]) - shared), other)
+            for other, shared in overlap.items()
+        )
+
+        return [(other, score) for score, other in heapq.nlargest(limit, scores)]
+
+    def cookable(self, ingredient_ids, max_missing, limit):
+        """
+        가지고 있는 재료로 만들 수 있거나, 최대 max_missing 개만 부족한 recipe 를 반환
+
+        [(recipe_id, coverage, missing_ids), ...] 재료를 많이 갖춘 recipe 먼저,
+        같으면 가진 재료를 더 많이 사용하는 recipe 먼저.
+        가진 재료의 역색인만 살펴보므로 전체 recipe 수와 관계없이 계산한다.
+        재료가 없는 recipe 는 제외
+        """
+        have = frozenset(ingredient_ids)
+        matched = Counter()
+        for ingredient_id in have:
+            matched.update(self.ingredient_postings.get(ingredient_id, ()))
+
+        candidates = [
+            (recipe_id, count) for recipe_id, count in matched.items()
+            if len(self.ingredients[recipe_id]) - count <= max_missing
+        ]
+        # 가진 재료와 하나도 겹치지 않지만 재료 수가 max_missing 이하인 recipe
+        # max_missing 이 커도 있는 재료 수만 살펴봄
+        for size, recipe_ids in list(self.by_size.items()):
+            if 0 < size <= max_missing:
+                candidates.extend((recipe_id, 0) for recipe_id in recipe_ids if recipe_id not in matched)
+
+        ranked = heapq.nlargest(
+            limit,
+            candidates,
+            key=lambda item: (item[1] / len(self.ingredients[item[0]]), item[1], item[0]),
+        )
+
+        return [
+            (recipe_id, count / len(self.ingredients[recipe_id]), sorted(self.ingredients[recipe_id] - have))
+            for recipe_id, count in ranked
+        ]
+
+
+class RecipeIndexRegistry:
+    """
+    프로세스 안에서 유저별 UserRecipeIndex 를 관리
+
+    색인의 버전은 공유 캐시에 두어, 다른 프로세스에서 연결이 바뀌면 버전이 달라진
+    색인을 버리고 다시 만든다. 같은 프로세스에서 바뀐 recipe 는 그 recipe 만 다시 읽는다.
+    """
+
+    def __init__(self, max_users):
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+        self._max_users = max_users
+
+    def get(self, user_id):
+        """유저의 최신 색인을 반환, 없거나 버전이 다르면 DB 에서 새로 만듦"""
+        version = self._version(user_id)
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is not None and index.version == version:
+                self._indexes.move_to_end(user_id)
+                return index
+
+        index = UserRecipeIndex(version)
+        for recipe_id, _, tag_ids, ingredient_ids in self._load(Recipe.objects.filter(user_id=user_id)):
+            index.set_recipe(recipe_id, tag_ids, ingredient_ids)
+
+        with self._lock:
+            self._indexes[user_id] = index
+            self._indexes.move_to_end(user_id)
+            while len(self._indexes) > self._max_users:
+                self._indexes.popitem(last=False)
+
+        return index
+
+    def recipes_changed(self, recipe_ids):
+        """
+        recipe 의 연결이 바뀌거나 생성, 삭제되었을 때 색인에 반영
+
+        트랜잭션 안이면 커밋한 뒤에 한 번 더 반영하여, 그 사이 다른 프로세스가
+        커밋 전 데이터로 색인을 만들었더라도 다시 만들도록 한다.
+        """
+        recipe_ids = list(recipe_ids)
+        if not recipe_ids:
+            return
+        self._apply(recipe_ids)
+        using = router.db_for_write(Recipe)
+        if transaction.get_connection(using).in_atomic_block:
+            transaction.on_commit(lambda: self._apply(recipe_ids), using=using)
+
+    def recipe_deleted(self, user_id, recipe_id):
+        version = self._bump(user_id)
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is not None and index.version == version - 1:
+                index.remove_recipe(recipe_id)
+                index.version = version
+            else:
+                self._indexes.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._indexes.clear()
+
+    def _apply(self, recipe_ids):
+        rows = {}
+        for recipe_id, user_id, tag_ids, ingredient_ids in self._load(Recipe.objects.filter(pk__in=recipe_ids)):
+            rows.setdefault(user_id, []).append((recipe_id, tag_ids, ingredient_ids))
+
+        for user_id, recipes in rows.items():
+            version = self._bump(user_id)
+            with self._lock:
+                index = self._indexes.get(user_id)
+                if index is None:
+                    continue
+                # 다른 프로세스에서 그 사이 변경이 있었다면 다음 조회 때 새로 만듦
+                if index.version != version - 1:
+                    del self._indexes[user_id]
+                    continue
+                for recipe_id, tag_ids, ingredient_ids in recipes:
+                    index.set_recipe(recipe_id, tag_ids, ingredient_ids)
+                index.version = version
+
+    def _load(self, recipes):
+        """through 테이블에서 recipe 별 (recipe_id, user_id, tag_ids, ingredient_ids) 를 읽음"""
+        links = {
+            recipe_id: (recipe_id, user_id, set(), set())
+            for recipe_id, user_id in recipes.values_list('id', 'user_id')
+        }
+        # through 테이블은 user_id 가 없으므로 recipe 를 읽는 DB 를 그대로 사용
+        tag_rows = Recipe.tags.through.objects.using(recipes.db).filter(recipe_id__in=recipes.values('id')) \
+            .values_list('recipe_id', 'tag_id')
+        for recipe_id, tag_id in tag_rows:
+            links[recipe_id][2].add(tag_id)
+        ingredient_rows = Recipe.ingredients.through.objects.using(recipes.db).filter(recipe_id__in=recipes.values('id')) \
+            .values_list('recipe_id', 'ingredient_id')
+        for recipe_id, ingredient_id in ingredient_rows:
+            links[recipe_id][3].add(ingredient_id)
+
+        return links.values()
+
+    def _version(self, user_id):
+        return cache.get_or_set(VERSION_CACHE_KEY.format(user_id), 0, None)
+
+    def _bump(self, user_id):
+        """공유 캐시의 색인 버전을 원자적으로 증가시키고 새 버전을 반환"""
+        key = VERSION_CACHE_KEY.format(user_id)
+        cache.add(key, 0, None)
+        try:
+            return cache.incr(key)
+        except ValueError:
+            # 그 사이 캐시에서 삭제된 경우
+            cache.set(key, 1, None)
+            return 1
+
+
+registry = RecipeIndexRegistry(settings.RECIPE_INDEX_MAX_USERS)
@@ -0,0 +1,100 @@
+from collections import OrderedDict
+
+from django.db import IntegrityError, router, transaction
+
+from core.models import Recipe, Ingredient, IngredientName
+from . import events
+from .signals import links_changed
+
+# 연결 필드 이름과 through 테이블에서 대상 객체를 가리키는 컬럼
+LINK_FIELDS = {
+    'tags': 'tag_id',
+    'ingredients': 'ingredient_id',
+}
+
+
+def apply_link_changes(recipe_ids, add=None, remove=None):
+    """
+    여러 recipe 의 tags, ingredients 연결을 한 번에 추가/삭제
+
+    add, remove 는 {'tags': [id, ...], 'ingredients': [id, ...]} 형태.
+    through 테이블에 필요한 INSERT / DELETE 만 bulk 로 실행하고, 연결이 바뀐 recipe 에
+    대해 links_changed signal 을 한 번 보낸다. 소유권 확인은 호출하는 쪽에서 한다.
+    """
+    add = add or {}
+    remove = remove or {}
+    recipe_ids = list(recipe_ids)
+    added = removed = 0
+
+    with transaction.atomic(using=router.db_for_write(Recipe)):
+        for field, column in LINK_FIELDS.items():
+            through = getattr(Recipe, field).through
+            add_ids = set(add.get(field, ()))
+            remove_ids = set(remove.get(field, ())) - add_ids
+
+            if add_ids:
+                existing = set(through.objects.filter(
+                    recipe_id__in=recipe_ids,
+                    **{column + '__in': add_ids}
+                ).values_list('recipe_id', column))
+                rows = [
+                    through(recipe_id=recipe_id, **{column: target_id})
+                    for recipe_id in recipe_ids
+                    for target_id in add_ids
+                    if (recipe_id, target_id) not in existing
+                ]
+                through.objects.bulk_create(rows)
+                added += len(rows)
+
+            if remove_ids:
+                removed += through.objects.filter(
+                    recipe_id__in=recipe_ids,
+                    **{column + '__in': remove_ids}
+                ).delete()[0]
+
+        if added or removed:
+            links_changed.send(sender=Recipe, recipe_ids=recipe_ids)
+
+    return added, removed
+
+
+def get_or_create_by_names(model, user, names):
+    """
+    유저의 tag 또는 ingredient 를 이름으로 찾고 없는 이름은 만들어 {이름: id} 를 반환
+
+    조회 한 번과 bulk INSERT 한 번(ingredient 는 IngredientName 을 포함하여 두 번)으로 처리하고, bulk_create 는 post_save 를 보내지 않으므로
+    새로 만든 객체의 생성 이벤트는 직접 보낸다.
+    동시에 같은 이름을 만든 요청이 있어 unique 제약에 걸리면 없는 이름을 하나씩 get_or_create 로 다시 처리한다.
+    """
+    names = list(OrderedDict.fromkeys(names))
+    if not names:
+        return {}
+    found = dict(model.objects.filter(user=user, name__in=names).values_list('name', 'id'))
+    missing = [name for name in names if name not in found]
+    if missing:
+        using = router.db_for_write(model, user_id=user.pk)
+        if model is Ingredient:
+            catalog = IngredientName.objects.resolve(missing, using=using)
+            rows = [model(user=user, catalog_id=catalog[name], name=name) for name in missing]
+        else:
+            rows = [model(user=user, name=name) for name in missing]
+        try:
+            with transaction.atomic(using=using):
+                created = model.objects.bulk_create(rows)
+        except IntegrityError:
+            created = []
+            for row in rows:
+                lookup = {'catalog_id': row.catalog_id} if model is Ingredient else {'name': row.name}
+                obj, was_created = model.objects.get_or_create(user=user, **lookup)
+                if was_created:
+                    created.append(obj)
+                else:
+                    found[row.name] = obj.pk
+        if any(obj.pk is None for obj in created):
+            # id 를 돌려주지 않는 DB(SQLite 등)는 새로 만든 이름만 다시 조회
+            created = model.objects.filter(user=user, name__in=missing)
+        created = dict((obj.name, obj.pk) for obj in created)
+        events.publish_on_commit(user.pk, model._meta.model_name, events.CREATED, created.values(), using)
+        found.update(created)
+
+    return found
@@ -1,39 +1,144 @@
+from django.db import router, transaction
+from django.http import QueryDict
 from rest_framework import serializers
 
 from core.models import Tag, Ingredient, Recipe
+from core.serializers import NativeDecimalField, HeaderCheckedImageField
+from .operations import get_or_create_by_names
 
 
 class TagSerializer(serializers.ModelSerializer):
+    """
+    태그 객체의 직렬화
+
+    유저마다 같은 이름은 하나만 가지므로 이미 있는 이름으로 만들면 기존 태그를 반환하고 created 는 False
+    """
     class Meta:
         model = Tag
         fields = ('id', 'name')
         read_only_Fields = ('id',)
 
+    def create(self, validated_data):
+        # 동시에 같은 이름을 만들어 unique 제약에 걸리면 get_or_create 가 다시 조회함
+        instance, self.created = Tag.objects.get_or_create(**validated_data)
+        return instance
+
 
 class IngredientSerializer(serializers.ModelSerializer):
-    """성분 객체의 직렬화"""
+    """
+    성분 객체의 직렬화
+
+    name 은 IngredientName 에 저장되므로 직접 선언한다.
+    유저마다 같은 이름은 하나만 가지므로 이미 있는 이름으로 만들면 기존 재료를 반환하고 created 는 False
+    """
+    name = serializers.CharField(max_length=255)
+
     class Meta:
         model = Ingredient
         fields = ('id', 'name')
         read_only_Fields = ('id',)
 
+    def create(self, validated_data):
+        # 동시에 같은 이름을 만들어 unique 제약에 걸리면 get_or_create 가 다시 조회함
+        instance, self.created = Ingredient.objects.get_or_create(**validated_data)
+        return instance
+
+
+class PrimaryKeyOrNameRelatedField(serializers.RelatedField):
+    """
+    id 또는 이름으로 tag, ingredient 를 가리키는 field
+
+    값의 형식만 확인하고 조회는 하지 않는다, RecipeSerializer 가 모든 값을 한 번에 조회한다.
+    JSON 등은 숫자만 id 로 보므로 "2024" 같은 이름도 만들 수 있다.
+    form, multipart 입력은 모두 문자열이므로 숫자로만 된 문자열을 id 로 본다.
+    """
+    default_error_messages = {
+        'invalid': 'id(숫자) 또는 이름(문자열)을 입력해주세요.',
+        'blank': '이름은 비어있을 수 없습니다.',
+        'max_length': '이름은 {max_length}자를 넘을 수 없습니다.',
+    }
+    # Tag.name, IngredientName.name 의 길이
+    max_length = 255
+
+    def to_internal_value(self, data):
+        if isinstance(data, int) and not isinstance(data, bool):
+            return data
+        if not isinstance(data, str):
+            self.fail('invalid')
+        data = data.strip()
+        if data.isdigit() and isinstance(getattr(self.root, 'initial_data', None), QueryDict):
+            return int(data)
+        if not data:
+            self.fail('blank')
+        if len(data) > self.max_length:
+            self.fail('max_length', max_length=self.max_length)
+
+        return data
+
+    def to_representation(self, value):
+        return value.pk
+
 
 class RecipeSerializer(serializers.ModelSerializer):
-    """recipe 객체의 직렬화"""
-    ingredients = serializers.PrimaryKeyRelatedField(
+    """
+    recipe 객체의 직렬화
+
+    tags, ingredients 는 id 와 이름을 함께 받는다. 없는 이름은 만들고 있는 이름은 연결하므로
+    tag, ingredient 를 따로 만들지 않고 한 번의 요청으로 recipe 를 만들 수 있다.
+    """
+    ingredients = PrimaryKeyOrNameRelatedField(
         many=True,
         queryset=Ingredient.objects.all()
     )
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = PrimaryKeyOrNameRelatedField(
         many=True,
         queryset=Tag.objects.all()
     )
+    price = NativeDecimalField(max_digits=5, decimal_places=2)
 
     class Meta:
         model = Recipe
         fields = ('id', 'title', 'ingredients', 'tags', 'time_minutes', 'price', 'link')
         read_only_Fields = ('id',)
 
+    def validate(self, attrs):
+        """id 로 지정한 tag, ingredient 가 현재 유저의 것인지 한 번에 확인"""
+        user = self.context['request'].user
+        for model, field in ((Tag, 'tags'), (Ingredient, 'ingredients')):
+            ids = {value for value in attrs.get(field, ()) if isinstance(value, int)}
+            if not ids:
+                continue
+            found = set(model.objects.filter(user=user, id__in=ids).values_list('id', flat=True))
+            missing = ids - found
+            if missing:
+                raise serializers.ValidationError(
+                    {field: f'존재하지 않는 id 입니다: {sorted(missing)}'}
+                )
+
+        return attrs
+
+    def _resolve_names(self, validated_data):
+        """tags, ingredients 의 이름을 id 로 바꿈, 없는 이름은 bulk 로 만듦"""
+        user = self.context['request'].user
+        for model, field in ((Tag, 'tags'), (Ingredient, 'ingredients')):
+            if field not in validated_data:
+                continue
+            values = validated_data[field]
+            ids = get_or_create_by_names(model, user, [value for value in values if isinstance(value, str)])
+            validated_data[field] = list(dict.fromkeys(
+                ids[value] if isinstance(value, str) else value for value in values
+            ))
+
+    def create(self, validated_data):
+        with transaction.atomic(using=router.db_for_write(Recipe)):
+            self._resolve_names(validated_data)
+            return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        with transaction.atomic(using=router.db_for_write(Recipe)):
+            self._resolve_names(validated_data)
+            return super().update(instance, validated_data)
+
 
 class RecipeDetailSerializer(RecipeSerializer):
     """recipe detail 직렬화"""
@@ -43,7 +148,63 @@ class RecipeDetailSerializer(RecipeSerializer):
 
 class RecipeImageSerializer(serializers.ModelSerializer):
     """recipe 에 이미지를 업로드하는 직렬화 모델 생성"""
+    image = HeaderCheckedImageField(allow_null=True, required=False)
+
     class Meta:
         model = Recipe
         fields = ('id', 'image')
         read_only_Fields = ('id',)
+
+
+class LinkIdsSerializer(serializers.Serializer):
+    """추가/삭제할 tag, ingredient 의 id 목록"""
+    tags = serializers.ListField(child=serializers.IntegerField(), required=False)
+    ingredients = serializers.ListField(child=serializers.IntegerField(), required=False)
+
+
+class RecipeLinksSerializer(serializers.Serializer):
+    """recipe 의 tags, ingredients 연결을 부분적으로 추가/삭제하는 직렬화"""
+    add = LinkIdsSerializer(required=False)
+    remove = LinkIdsSerializer(required=False)
+
+    def validate(self, attrs):
+        """현재 유저의 tag, ingredient 만 연결할 수 있는지 확인"""
+        user = self.context['request'].user
+        for model, field in ((Tag, 'tags'), (Ingredient, 'ingredients')):
+            ids = set(attrs.get('add', {}).get(field, ())) | set(attrs.get('remove', {}).get(field, ()))
+            if not ids:
+                continue
+            found = set(model.objects.filter(user=user, id__in=ids).values_list('id', flat=True))
+            missing = ids - found
+            if missing:
+                raise serializers.ValidationError(
+                    {field: f'존재하지 않는 id 입니다: {sorted(missing)}'}
+                )
+
+        return attrs
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    """현재 유저의 recipe id 목록"""
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False,
+        max_length=1000,
+    )
+
+    def validate_recipes(self, value):
+        """현재 유저의 recipe 인지 확인"""
+        ids = set(value)
+        found = set(
+            Recipe.objects.filter(user=self.context['request'].user, id__in=ids)
+            .values_list('id', flat=True)
+        )
+        missing = ids - found
+        if missing:
+            raise serializers.ValidationError(f'존재하지 않는 id 입니다: {sorted(missing)}')
+
+        return sorted(ids)
+
+
+class BulkRecipeLinksSerializer(RecipeIdsSerializer, RecipeLinksSerializer):
+    """여러 recipe 에 같은 연결 변경을 한 번에 적용하는 직렬화"""
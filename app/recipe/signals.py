@@ -0,0 +1,168 @@
+from django.db.models.signals import pre_save, post_save, post_delete, pre_delete, m2m_changed
+from django.db import router, transaction
+from django.dispatch import receiver, Signal
+from django.utils import timezone
+
+from core.models import Tag, Ingredient, Recipe, Tombstone
+from core.sharding import use_user_shard
+from .documents import invalidate_details
+from . import events, stats
+from .index import registry
+
+# recipe 의 tags, ingredients 연결이 바뀌었을 때 보내는 signal
+# m2m_changed 뿐 아니라 through 테이블을 직접 수정하는 bulk 작업에서도 보낸다
+links_changed = Signal(providing_args=['recipe_ids'])
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def recipe_changed(sender, instance, using, **kwargs):
+    """recipe 가 수정, 삭제되면 detail 문서를 무효화"""
+    invalidate_details([instance.pk], using)
+
+
+@receiver(post_delete, sender=Recipe)
+def delete_recipe_image(sender, instance, using, **kwargs):
+    """recipe 가 삭제되면 커밋한 뒤에 이미지 파일도 삭제"""
+    if instance.image:
+        storage, name = instance.image.storage, instance.image.name
+        transaction.on_commit(lambda: storage.delete(name), using=using)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_links_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """recipe 의 tags, ingredients 연결이 바뀌면 detail 문서를 무효화"""
+    # 연결된 recipe 는 instance 와 같은 유저의 shard 에 있음
+    with use_user_shard(instance.user_id):
+        _send_links_changed(instance, action, reverse, pk_set)
+
+
+def _send_links_changed(instance, action, reverse, pk_set):
+    if not reverse:
+        if action.startswith('post_'):
+            links_changed.send(sender=Recipe, recipe_ids=[instance.pk])
+        return
+
+    # tag.recipe_set.add() 처럼 반대 방향에서 변경한 경우 pk_set 은 recipe 의 id
+    # clear() 는 pk_set 이 없으므로 지우기 전에 id 를 기억해두고 지운 뒤에 signal 을 보냄
+    if action == 'pre_clear':
+        instance._linked_recipe_ids = list(instance.recipe_set.values_list('id', flat=True))
+    elif action == 'post_clear':
+        links_changed.send(sender=Recipe, recipe_ids=instance.__dict__.pop('_linked_recipe_ids', []))
+    elif action in ('post_add', 'post_remove'):
+        links_changed.send(sender=Recipe, recipe_ids=list(pk_set))
+
+
+@receiver(links_changed)
+def refresh_linked_recipes(sender, recipe_ids, **kwargs):
+    """연결이 바뀐 recipe 의 detail 문서를 무효화하고 delta sync 를 위해 updated_at 을 갱신"""
+    if not recipe_ids:
+        return
+    using = router.db_for_write(Recipe)
+    invalidate_details(recipe_ids, using)
+    Recipe.objects.filter(pk__in=recipe_ids).update(updated_at=timezone.now())
+    registry.recipes_changed(recipe_ids)
+
+    owners = {}
+    for user_id, recipe_id in Recipe.objects.filter(pk__in=recipe_ids).values_list('user_id', 'id'):
+        owners.setdefault(user_id, []).append(recipe_id)
+    for user_id, ids in owners.items():
+        events.publish_on_commit(user_id, 'recipe', events.UPDATED, ids, using)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def recipe_attr_changed(sender, instance, created, using, **kwargs):
+    """tag, ingredient 의 이름이 바뀌면 이를 참조하는 recipe 의 detail 문서를 무효화"""
+    if not created:
+        invalidate_details(instance.recipe_set.values_list('id', flat=True), using)
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def recipe_attr_deleting(sender, instance, **kwargs):
+    """tag, ingredient 가 삭제될 때는 m2m_changed 가 발생하지 않으므로 연결된 recipe 를 기억"""
+    instance._linked_recipe_ids = list(instance.recipe_set.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def recipe_attr_deleted(sender, instance, **kwargs):
+    """연결이 삭제된 뒤에 links_changed 를 보냄"""
+    with use_user_shard(instance.user_id):
+        links_changed.send(sender=Recipe, recipe_ids=instance.__dict__.pop('_linked_recipe_ids', []))
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def record_tombstone(sender, instance, **kwargs):
+    """삭제된 객체를 delta sync 에서 알려줄 수 있도록 tombstone 을 남김"""
+    Tombstone.objects.create(
+        user_id=instance.user_id,
+        model=sender._meta.model_name,
+        object_id=instance.pk,
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def index_recipe_created(sender, instance, created, **kwargs):
+    """새로 만든 recipe 를 유사도 색인에 추가"""
+    if created:
+        with use_user_shard(instance.user_id):
+            registry.recipes_changed([instance.pk])
+
+
+@receiver(post_delete, sender=Recipe)
+def index_recipe_deleted(sender, instance, **kwargs):
+    """삭제된 recipe 를 유사도 색인에서 제거"""
+    registry.recipe_deleted(instance.user_id, instance.pk)
+
+
+@receiver(pre_save, sender=Recipe)
+def stats_remember_previous(sender, instance, using, **kwargs):
+    """수정 전의 price, time_minutes 를 기억하여 post_save 에서 통계를 보정"""
+    if instance.pk is None or instance._state.adding:
+        return
+    instance._stats_previous = Recipe.objects.using(using).filter(pk=instance.pk) \
+        .values_list('user_id', 'price', 'time_minutes').first()
+
+
+@receiver(post_save, sender=Recipe)
+def stats_recipe_saved(sender, instance, created, **kwargs):
+    """생성된 recipe 를 통계에 더하고, 수정된 경우 이전 값을 빼고 새 값을 더함"""
+    if created:
+        stats.record(instance.user_id, instance.price, instance.time_minutes, 1)
+        return
+
+    previous = instance.__dict__.pop('_stats_previous', None)
+    current = (instance.user_id, stats.to_price(instance.price), instance.time_minutes)
+    if previous is None or previous == current:
+        return
+    # 이전 값을 빼다가 다시 집계했으면 새 값도 이미 반영되어 있음
+    if stats.record(previous[0], previous[1], previous[2], -1) or previous[0] != current[0]:
+        stats.record(*current, 1)
+
+
+@receiver(post_delete, sender=Recipe)
+def stats_recipe_deleted(sender, instance, **kwargs):
+    """삭제된 recipe 를 통계에서 뺌"""
+    stats.record(instance.user_id, instance.price, instance.time_minutes, -1)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def publish_saved(sender, instance, created, using, **kwargs):
+    """생성, 수정된 객체를 변경 스트림의 구독자에게 알림"""
+    action = events.CREATED if created else events.UPDATED
+    events.publish_on_commit(instance.user_id, sender._meta.model_name, action, [instance.pk], using)
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def publish_deleted(sender, instance, using, **kwargs):
+    """삭제된 객체를 변경 스트림의 구독자에게 알림"""
+    events.publish_on_commit(instance.user_id, sender._meta.model_name, events.DELETED, [instance.pk], using)
@@ -0,0 +1,147 @@
+from decimal import Decimal
+
+from django.db import IntegrityError, router, transaction
+from django.db.models import Count, F, Sum
+
+from core.models import Recipe, RecipeStats, RecipeStatsBucket
+from core.sharding import use_user_shard
+
+# 히스토그램 버킷의 너비
+BUCKET_WIDTHS = {
+    RecipeStatsBucket.PRICE: 1,
+    RecipeStatsBucket.TIME: 5,
+}
+PERCENTILES = (50, 90, 99)
+
+
+def to_price(value):
+    """float 로 만든 recipe 도 있으므로 문자열을 거쳐 소수점 2자리 Decimal 로 변환"""
+    return Decimal(str(value)).quantize(Decimal('0.01'))
+
+
+def _bucket(metric, value):
+    """값이 속하는 버킷의 하한값"""
+    width = BUCKET_WIDTHS[metric]
+    return int(value // width) * width
+
+
+def _add_to_bucket(user_id, metric, value, delta):
+    """버킷을 증감, 빼려는 버킷이 없거나 비어 있으면 False"""
+    bucket = _bucket(metric, value)
+    buckets = RecipeStatsBucket.objects.filter(user_id=user_id, metric=metric, bucket=bucket)
+    if delta < 0:
+        return bool(buckets.filter(count__gte=-delta).update(count=F('count') + delta))
+    if buckets.update(count=F('count') + delta):
+        return True
+    try:
+        with transaction.atomic(using=router.db_for_write(RecipeStatsBucket)):
+            RecipeStatsBucket.objects.create(user_id=user_id, metric=metric, bucket=bucket, count=delta)
+    except IntegrityError:
+        # 다른 요청이 먼저 버킷을 만든 경우
+        buckets.update(count=F('count') + delta)
+
+    return True
+
+
+def record(user_id, price, time_minutes, delta):
+    """
+    recipe 하나를 통계에 더하거나(delta=1) 뺀다(delta=-1)
+
+    요약 행과 버킷을 F() 로 증감하므로 동시에 여러 요청이 와도 값이 맞는다.
+    요약 행이 없거나(통계를 만들기 전의 recipe 가 있는 유저) 빼면 0 보다 작아지는 경우에는
+    증감하지 않고 Recipe 테이블에서 다시 집계한다. 다시 집계했으면 False 를 반환하고,
+    이때는 이미 현재 recipe 가 반영되어 있으므로 같은 유저의 다음 증감을 하지 않아야 한다.
+    """
+    price = to_price(price)
+    with use_user_shard(user_id):
+        # count 가 0 보다 작아지지 않는 행만 증감
+        updated = RecipeStats.objects.filter(user_id=user_id, count__gte=max(-delta, 0)).update(
+            count=F('count') + delta,
+            price_total=F('price_total') + price * delta,
+            time_total=F('time_total') + time_minutes * delta,
+        )
+        if updated and all([
+            _add_to_bucket(user_id, RecipeStatsBucket.PRICE, price, delta),
+            _add_to_bucket(user_id, RecipeStatsBucket.TIME, time_minutes, delta),
+        ]):
+            return True
+        rebuild(user_id)
+
+    return False
+
+
+def rebuild(user_id):
+    """유저의 통계를 Recipe 테이블에서 다시 집계"""
+    with use_user_shard(user_id), transaction.atomic(using=router.db_for_write(Recipe)):
+        _rebuild(user_id)
+
+
+def _rebuild(user_id):
+    recipes = Recipe.objects.filter(user_id=user_id)
+    summary = recipes.aggregate(count=Count('id'), price_total=Sum('price'), time_total=Sum('time_minutes'))
+    RecipeStats.objects.update_or_create(user_id=user_id, defaults={
+        'count': summary['count'],
+        'price_total': summary['price_total'] or 0,
+        'time_total': summary['time_total'] or 0,
+    })
+
+    RecipeStatsBucket.objects.filter(user_id=user_id).delete()
+    buckets = {}
+    for price, time_minutes in recipes.values_list('price', 'time_minutes').iterator():
+        for metric, value in ((RecipeStatsBucket.PRICE, price), (RecipeStatsBucket.TIME, time_minutes)):
+            key = (metric, _bucket(metric, value))
+            buckets[key] = buckets.get(key, 0) + 1
+    RecipeStatsBucket.objects.bulk_create([
+        RecipeStatsBucket(user_id=user_id, metric=metric, bucket=bucket, count=count)
+        for (metric, bucket), count in buckets.items()
+    ])
+
+
+def _percentile(buckets, total, metric, percentile):
+    """히스토그램에서 버킷 안을 선형 보간하여 근사 백분위 값을 계산"""
+    if not buckets:
+        return None
+    rank = total * percentile / 100
+    seen = 0
+    for bucket, count in buckets:
+        if seen + count >= rank:
+            return bucket + BUCKET_WIDTHS[metric] * (rank - seen) / count
+        seen += count
+
+    return buckets[-1][0] + BUCKET_WIDTHS[metric]
+
+
+def _round(value):
+    return None if value is None else round(value, 2)
+
+
+def summarize(user_id):
+    """요약 행과 버킷만 읽어서 통계를 반환, recipe 수와 관계없이 쿼리 2번"""
+    stats = RecipeStats.objects.filter(user_id=user_id).first()
+    count = stats.count if stats else 0
+    histograms = {metric: [] for metric in BUCKET_WIDTHS}
+    if count:
+        rows = RecipeStatsBucket.objects.filter(user_id=user_id, count__gt=0) \
+            .order_by('metric', 'bucket').values_list('metric', 'bucket', 'count')
+        for metric, bucket, bucket_count in rows:
+            histograms[metric].append((bucket, bucket_count))
+
+    result = {'count': count}
+    totals = {
+        RecipeStatsBucket.PRICE: stats.price_total if stats else 0,
+        RecipeStatsBucket.TIME: stats.time_total if stats else 0,
+    }
+    for metric, buckets in histograms.items():
+        result[metric] = {
+            'average': round(float(totals[metric]) / count, 2) if count else None,
+            'percentiles': {
+                f'p{percentile}': _round(_percentile(buckets, count, metric, percentile))
+                for percentile in PERCENTILES
+            },
+            'histogram': [
+                {'bucket': bucket, 'width': BUCKET_WIDTHS[metric], 'count': bucket_count}
+                for bucket, bucket_count in buckets
+            ],
+        }
+
+    return result
@@ -0,0 +1,153 @@
+import gc
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from recipe import events
+
+EVENTS_URL = reverse('recipe:events')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def read_events(response):
+    """스트림에서 (id, event, data) 목록을 읽음, heartbeat 와 retry 는 제외"""
+    result = []
+    for chunk in b''.join(response.streaming_content).decode().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in chunk.splitlines() if not line.startswith(':'))
+        if 'data' in fields:
+            result.append((fields.get('id'), fields.get('event', 'message'), fields['data']))
+
+    return result
+
+
+@override_settings(SSE_POLL_INTERVAL=0.01, SSE_MAX_DURATION=0.1)
+class EventStreamApiTests(TestCase):
+    """Server-Sent Events 변경 스트림 테스트"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user('test@master.com', 'pass1234')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_login_required(self):
+        res = APIClient().get(EVENTS_URL, HTTP_ACCEPT='text/event-stream')
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertTrue(res.content.startswith(b'event: error\ndata: '))
+
+    def test_resume_after_last_event_id(self):
+        """Last-Event-ID 다음의 이벤트만 보냄"""
+        events.publish(self.user.pk, 'recipe', events.CREATED, [1, 2])
+        events.publish(self.user.pk, 'tag', events.DELETED, [3])
+        events.publish(self.user.pk + 1, 'recipe', events.CREATED, [4])
+
+        res = self.client.get(EVENTS_URL, HTTP_ACCEPT='text/event-stream', HTTP_LAST_EVENT_ID='1')
+
+        self.assertEqual(res['Content-Type'], 'text/event-stream')
+        self.assertEqual(read_events(res), [
+            ('2', 'message', '{"model":"recipe","action":"created","id":2}'),
+            ('3', 'message', '{"model":"tag","action":"deleted","id":3}'),
+        ])
+
+    def test_new_subscriber_gets_new_events(self):
+        events.publish(self.user.pk, 'recipe', events.CREATED, [1])
+        res = self.client.get(EVENTS_URL, HTTP_ACCEPT='text/event-stream')
+        chunks = iter(res.streaming_content)
+
+        self.assertTrue(next(chunks).startswith(b'retry: '))
+        events.publish(self.user.pk, 'recipe', events.UPDATED, [1])
+        self.assertEqual(next(chunks), b'id: 2\ndata: {"model":"recipe","action":"updated","id":1}\n\n')
+
+    def test_expired_events_reset(self):
+        """놓친 이벤트가 만료되었으면 reset 을 보내고 다음 이벤트부터 보냄"""
+        events.publish(self.user.pk, 'recipe', events.CREATED, [1, 2])
+        cache.delete(events.EVENT_KEY.format(self.user.pk, 1))
+
+        res = self.client.get(EVENTS_URL, HTTP_ACCEPT='text/event-stream', HTTP_LAST_EVENT_ID='0')
+
+        self.assertEqual(read_events(res), [('2', 'reset', '{"reason":"expired"}')])
+
+    @override_settings(SSE_HEARTBEAT=0)
+    def test_heartbeat(self):
+        res = self.client.get(EVENTS_URL, HTTP_ACCEPT='text/event-stream')
+
+        self.assertIn(b': ping\n\n', b''.join(res.streaming_content))
+
+    def test_subscriber_limit(self):
+        """프로세스의 구독자가 SSE_MAX_SUBSCRIBERS 이면 503, 연결이 버려지면 다시 받음"""
+        # 다른 테스트에서 끝까지 읽지 않은 스트림은 GC 될 때 구독자 수를 돌려주므로 미리 정리하여 고정
+        gc.collect()
+        with override_settings(SSE_MAX_SUBSCRIBERS=events.subscriber_count() + 1):
+            opened = self.client.get(EVENTS_URL, HTTP_ACCEPT='text/event-stream')
+            rejected = self.client.get(EVENTS_URL, HTTP_ACCEPT='text/event-stream')
+
+            self.assertEqual(opened.status_code, status.HTTP_200_OK)
+            self.assertEqual(rejected.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+            self.assertEqual(rejected['Retry-After'], '3')
+            # response.close() 는 request_finished 로 테스트의 DB 연결까지 닫으므로 버려서 GC 로 닫음
+            del opened
+            gc.collect()
+            reopened = self.client.get(EVENTS_URL, HTTP_ACCEPT='text/event-stream')
+
+            self.assertEqual(reopened.status_code, status.HTTP_200_OK)
+            del reopened
+            gc.collect()
+
+    def test_unclosed_stream_released(self):
+        """close() 없이 버려진 스트림도 GC 될 때 구독자 수를 돌려줌"""
+        gc.collect()
+        subscribers = events.subscriber_count()
+        # test client 처럼 응답을 닫아주는 wrapper 없이 구독
+        subscription = events.subscribe(self.user.pk)
+        next(iter(subscription))
+
+        self.assertEqual(events.subscriber_count(), subscribers + 1)
+        del subscription
+        gc.collect()
+        self.assertEqual(events.subscriber_count(), subscribers)
+
+    def test_batch_stream_released(self):
+        """batch 로 연 스트림은 거절되고 구독자 수가 0 으로 돌아옴"""
+        gc.collect()
+        payload = {'requests': [{'path': EVENTS_URL}]}
+
+        res = self.client.post(reverse('batch'), payload, format='json')
+
+        self.assertEqual(res.data['responses'][0]['status'], status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(events.subscriber_count(), 0)
+
+    def test_invalid_last_event_id(self):
+        res = self.client.get(EVENTS_URL, {'last_event_id': 'abc'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(SSE_POLL_INTERVAL=0.01, SSE_MAX_DURATION=0.1)
+class EventPublishTests(TransactionTestCase):
+    """모델 signal 이 커밋된 뒤에 이벤트를 보내는지 테스트"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user('test@master.com', 'pass1234')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_model_changes_published(self):
+        tag = self.client.post(reverse('recipe:tag-list'), {'name': 'Vegan'}).data['id']
+        recipe = self.client.post(RECIPES_URL, {'title': 'Curry', 'time_minutes': 5, 'price': '5.00'}).data['id']
+        self.client.post(reverse('recipe:recipe-links', args=[recipe]), {'add': {'tags': [tag]}}, format='json')
+        self.client.delete(reverse('recipe:recipe-detail', args=[recipe]))
+
+        res = self.client.get(EVENTS_URL, HTTP_ACCEPT='text/event-stream', HTTP_LAST_EVENT_ID='0')
+
+        self.assertEqual([data for _, _, data in read_events(res)], [
+            f'{{"model":"tag","action":"created","id":{tag}}}',
+            f'{{"model":"recipe","action":"created","id":{recipe}}}',
+            f'{{"model":"recipe","action":"updated","id":{recipe}}}',
+            f'{{"model":"recipe","action":"deleted","id":{recipe}}}',
+        ])
@@ -42,7 +42,7 @@ class PrivateIngredientsAPITests(TestCase):
 
         res = self.client.get(INGREDIENTS_URL)
 
-        ingredients = Ingredient.objects.all().order_by('-name')
+        ingredients = Ingredient.objects.filter(user=self.user).order_by('-name')
         serializer = IngredientSerializer(ingredients, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         # ingredients 와 serializer 2개 모두 쿼리셋을 가져옴
@@ -78,6 +78,16 @@ class PrivateIngredientsAPITests(TestCase):
 
         self.assertTrue(exists)
 
+    def test_create_existing_ingredient(self):
+        """이미 있는 이름으로 만들면 새로 만들지 않고 기존 재료를 200 으로 반환하는지 테스트"""
+        ingredient = Ingredient.objects.create(user=self.user, name='Cabbage')
+
+        res = self.client.post(INGREDIENTS_URL, {'name': 'Cabbage'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['id'], ingredient.id)
+        self.assertEqual(Ingredient.objects.filter(user=self.user).count(), 1)
+
     def test_create_ingredient_invalid(self):
         """invalid 한 payload 의 ingredient 를 생성했을 경우의 테스트"""
         payload = {'name': ''}
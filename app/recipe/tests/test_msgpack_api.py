@@ -0,0 +1,141 @@
+import os
+import tempfile
+from decimal import Decimal
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.test import APIClient
+from PIL import Image
+
+from core.models import Recipe, Tag, Ingredient
+from core.renderers import MessagePackParser, MessagePackRenderer
+
+RECIPES_URL = reverse('recipe:recipe-list')
+MSGPACK = 'application/msgpack'
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def image_upload_url(recipe_id):
+    return reverse('recipe:recipe-upload-image', args=[recipe_id])
+
+
+def sample_recipe(user, **params):
+    defaults = {'title': 'sample recipe', 'time_minutes': 10, 'price': Decimal('5.50')}
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+def unpack(res):
+    return MessagePackParser().parse(BytesIO(res.content))
+
+
+def as_json(data):
+    """MessagePack 으로 받은 값을 JSON 응답과 비교할 수 있도록 Decimal 을 문자열로 변환"""
+    if isinstance(data, dict):
+        return {key: as_json(value) for key, value in data.items()}
+    if isinstance(data, list):
+        return [as_json(value) for value in data]
+    if isinstance(data, Decimal):
+        return str(data)
+    return data
+
+
+class MessagePackCodecTests(TestCase):
+    """MessagePack renderer / parser 테스트"""
+
+    def test_decimal_round_trip(self):
+        """Decimal 은 자릿수까지 정확하게 복원"""
+        data = {'price': [Decimal('5.50'), Decimal('-0.01'), Decimal('5E+1'),
+                          Decimal('123456789012345678901234567890.12')]}
+
+        self.assertEqual(
+            [str(value) for value in MessagePackParser().parse(BytesIO(MessagePackRenderer().render(data)))['price']],
+            ['5.50', '-0.01', '5E+1', '123456789012345678901234567890.12'],
+        )
+
+    def test_decimal_compact(self):
+        """Decimal 이 JSON 문자열이나 float 보다 크지 않게 인코딩되는지 테스트"""
+        packed = len(MessagePackRenderer().render(Decimal('125.50')))
+
+        self.assertLessEqual(packed, len(b'"125.50"'))
+        self.assertLess(packed, len(MessagePackRenderer().render(125.50)))
+
+    def test_parse_invalid(self):
+        with self.assertRaises(ParseError):
+            MessagePackParser().parse(BytesIO(b'\x92\x01'))
+
+
+class MessagePackApiTests(TestCase):
+    """Accept / Content-Type 으로 MessagePack 을 선택하는 API 테스트"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'test@master.com',
+            'pass1234'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_parity_with_json(self):
+        """recipe 목록의 MessagePack 응답이 JSON 응답과 같은 값인지 테스트"""
+        recipe = sample_recipe(user=self.user, title='김치찌개')
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Korean'))
+        sample_recipe(user=self.user, price=Decimal('12.00'))
+
+        res = self.client.get(RECIPES_URL, HTTP_ACCEPT=MSGPACK)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], MSGPACK)
+        data = unpack(res)
+        self.assertIsInstance(data[0]['price'], Decimal)
+        self.assertEqual(as_json(data), self.client.get(RECIPES_URL).json())
+
+    def test_detail_parity_with_json(self):
+        """미리 렌더링된 JSON 문서가 있어도 MessagePack 으로 응답"""
+        recipe = sample_recipe(user=self.user)
+        recipe.ingredients.add(Ingredient.objects.create(user=self.user, name='Salt'))
+        json_data = self.client.get(detail_url(recipe.id)).json()
+
+        res = self.client.get(detail_url(recipe.id), HTTP_ACCEPT=MSGPACK)
+
+        self.assertEqual(as_json(unpack(res)), json_data)
+
+    def test_create_recipe(self):
+        """MessagePack 본문으로 recipe 를 생성"""
+        body = MessagePackRenderer().render({
+            'title': 'Bibimbap',
+            'time_minutes': 20,
+            'price': Decimal('7.25'),
+            'tags': [],
+            'ingredients': [],
+        })
+
+        res = self.client.post(RECIPES_URL, body, content_type=MSGPACK, HTTP_ACCEPT=MSGPACK)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(user=self.user, id=unpack(res)['id'])
+        self.assertEqual(recipe.price, Decimal('7.25'))
+
+    def test_upload_image_metadata(self):
+        """upload-image 응답도 MessagePack 으로 받을 수 있는지 테스트"""
+        recipe = sample_recipe(user=self.user)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as temp:
+            Image.new('RGB', (10, 10)).save(temp, format='JPEG')
+            temp.seek(0)
+            res = self.client.post(image_upload_url(recipe.id), {'image': temp},
+                                   format='multipart', HTTP_ACCEPT=MSGPACK)
+
+        recipe.refresh_from_db()
+        self.addCleanup(recipe.image.delete)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(unpack(res)['image'].endswith(os.path.basename(recipe.image.name)))
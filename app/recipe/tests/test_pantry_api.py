@@ -0,0 +1,118 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Ingredient
+from recipe.index import registry, UserRecipeIndex
+
+
+PANTRY_URL = reverse('recipe:recipe-pantry')
+
+
+def sample_recipe(user, **params):
+    defaults = {'title': 'sample recipe', 'time_minutes': 10, 'price': 5.00}
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class CookableIndexTests(TestCase):
+    """재료 포함 여부 계산 테스트"""
+
+    def setUp(self):
+        self.index = UserRecipeIndex(0)
+        self.index.set_recipe(1, set(), {1, 2})
+        self.index.set_recipe(2, set(), {1, 2, 3})
+        self.index.set_recipe(3, set(), {4})
+        self.index.set_recipe(4, set(), set())
+
+    def test_fully_covered(self):
+        self.assertEqual(self.index.cookable({1, 2}, 0, 10), [(1, 1.0, [])])
+
+    def test_missing_items(self):
+        """부족한 재료 수까지 허용하고, 겹치는 재료가 없는 작은 recipe 도 포함"""
+        result = self.index.cookable({1, 2}, 1, 10)
+
+        self.assertEqual([recipe_id for recipe_id, _, _ in result], [1, 2, 3])
+        self.assertEqual(result[1][2], [3])
+        self.assertEqual(result[2], (3, 0.0, [4]))
+
+    def test_huge_max_missing(self):
+        """max_missing 이 커도 재료 수별 목록만 살펴봄"""
+        result = self.index.cookable({1, 2}, 10 ** 12, 10)
+
+        self.assertEqual([recipe_id for recipe_id, _, _ in result], [1, 2, 3])
+
+
+class PantryApiTests(TestCase):
+    """가지고 있는 재료로 만들 수 있는 recipe API 테스트"""
+
+    def setUp(self):
+        cache.clear()
+        registry.clear()
+        self.user = get_user_model().objects.create_user(
+            'test@master.com',
+            'pass1234'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.egg = Ingredient.objects.create(user=self.user, name='Egg')
+        self.rice = Ingredient.objects.create(user=self.user, name='Rice')
+        self.ham = Ingredient.objects.create(user=self.user, name='Ham')
+        self.omelette = sample_recipe(user=self.user, title='Omelette')
+        self.omelette.ingredients.add(self.egg)
+        self.fried_rice = sample_recipe(user=self.user, title='Fried rice')
+        self.fried_rice.ingredients.add(self.egg, self.rice, self.ham)
+
+    def test_pantry_fully_covered(self):
+        """가진 재료로 모두 만들 수 있는 recipe 만 반환"""
+        res = self.client.get(PANTRY_URL, {'ingredients': f'{self.egg.id},{self.rice.id}'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['recipe']['title'] for r in res.data], ['Omelette'])
+        self.assertEqual(res.data[0]['coverage'], 1.0)
+
+    def test_pantry_missing(self):
+        """missing 개수만큼 부족한 recipe 도 재료를 많이 갖춘 순서로 반환"""
+        res = self.client.get(PANTRY_URL, {'ingredients': f'{self.egg.id},{self.rice.id}', 'missing': 1})
+
+        self.assertEqual([r['recipe']['title'] for r in res.data], ['Omelette', 'Fried rice'])
+        self.assertEqual(res.data[1]['missing'], [self.ham.id])
+
+    def test_pantry_limit_clamped(self):
+        """음수 limit 은 끝에서부터 자르지 않고 1 개만 반환하는지 테스트"""
+        params = {'ingredients': f'{self.egg.id},{self.rice.id}', 'missing': 1}
+
+        res = self.client.get(PANTRY_URL, dict(params, limit=-1))
+
+        self.assertEqual([r['recipe']['title'] for r in res.data], ['Omelette'])
+
+    def test_pantry_huge_missing(self):
+        """아주 큰 missing 은 최대값으로 제한되어 바로 응답하는지 테스트"""
+        params = {'ingredients': f'{self.egg.id},{self.rice.id}', 'missing': 10 ** 12}
+
+        res = self.client.get(PANTRY_URL, params)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['recipe']['title'] for r in res.data], ['Omelette', 'Fried rice'])
+
+    def test_pantry_reflects_changes(self):
+        """재료 연결이 바뀌면 결과에 반영되는지 테스트"""
+        params = {'ingredients': f'{self.egg.id},{self.rice.id}'}
+        self.client.get(PANTRY_URL, params)
+
+        self.fried_rice.ingredients.remove(self.ham)
+        res = self.client.get(PANTRY_URL, params)
+
+        self.assertEqual([r['recipe']['title'] for r in res.data], ['Fried rice', 'Omelette'])
+
+    def test_pantry_requires_ingredients(self):
+        """ingredients 가 없거나 잘못되면 400 을 반환"""
+        self.assertEqual(self.client.get(PANTRY_URL).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            self.client.get(PANTRY_URL, {'ingredients': 'egg'}).status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
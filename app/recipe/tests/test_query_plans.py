@@ -0,0 +1,97 @@
+import os
+from unittest import skipIf
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient, IngredientName
+from core.sharding import shard_for_user
+from core.tests.query_plans import QueryPlanSnapshotMixin, UPDATE_ENV
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+
+
+class QueryPlanTests(QueryPlanSnapshotMixin, TestCase):
+    """recipe/views.py 의 목록 queryset 의 쿼리 수와 실행 계획을 snapshot 과 비교"""
+    plan_snapshot_dir = os.path.join(os.path.dirname(__file__), 'query_plans')
+
+    @classmethod
+    def setUpTestData(cls):
+        # 실행 계획이 실제와 비슷하도록 여러 유저의 데이터를 넣고 통계를 갱신
+        # 재료 이름 목록은 유저 한 명의 재료보다 훨씬 크고, 유저마다 일부만 사용
+        # 실행 계획은 default 에서 확인하므로 유저의 데이터도 default 에 둠
+        cache.clear()
+        users = [get_user_model().objects.create_user(f'user{i}@master.com', 'pass1234', shard='default')
+                 for i in range(20)]
+        cls.user = users[0]
+        catalog = IngredientName.objects.resolve([f'Ingredient {i}' for i in range(300)], using='default')
+        for number, user in enumerate(users):
+            Tag.objects.bulk_create([Tag(user=user, name=f'Tag {i}') for i in range(20)])
+            Ingredient.objects.bulk_create([
+                Ingredient(user=user, catalog_id=catalog[f'Ingredient {(number * 15 + i) % 300}']) for i in range(20)
+            ])
+            Recipe.objects.bulk_create([
+                Recipe(user=user, title=f'Recipe {i}', time_minutes=i % 60, price=i % 30)
+                for i in range(100)
+            ])
+            # SQLite 의 bulk_create 는 id 를 채우지 않으므로 다시 읽음, 앞의 10개씩만 연결
+            tags = list(Tag.objects.filter(user=user).order_by('id'))
+            ingredients = list(Ingredient.objects.filter(user=user).order_by('id'))
+            recipes = Recipe.objects.filter(user=user).order_by('id')
+            Recipe.tags.through.objects.using('default').bulk_create([
+                Recipe.tags.through(recipe=recipe, tag=tags[i % 10]) for i, recipe in enumerate(recipes)
+            ])
+            Recipe.ingredients.through.objects.using('default').bulk_create([
+                Recipe.ingredients.through(recipe=recipe, ingredient=ingredients[i % 10])
+                for i, recipe in enumerate(recipes)
+            ])
+        cls.tag_ids = ','.join(str(tag.id) for tag in Tag.objects.filter(user=cls.user).order_by('id')[:2])
+        cls.ingredient_ids = ','.join(str(i.id) for i in Ingredient.objects.filter(user=cls.user).order_by('id')[:2])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def setUp(self):
+        cache.clear()
+        # 유저의 shard 는 캐시되므로 미리 읽어두어 요청의 쿼리에 포함되지 않게 함
+        shard_for_user(self.user.pk)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_tags(self):
+        self.assertQueryPlans('tags', lambda: self.client.get(TAGS_URL))
+
+    def test_tags_assigned_only(self):
+        self.assertQueryPlans('tags_assigned_only', lambda: self.client.get(TAGS_URL, {'assigned_only': 1}))
+
+    def test_ingredients(self):
+        self.assertQueryPlans('ingredients', lambda: self.client.get(INGREDIENTS_URL))
+
+    def test_ingredients_assigned_only(self):
+        self.assertQueryPlans(
+            'ingredients_assigned_only', lambda: self.client.get(INGREDIENTS_URL, {'assigned_only': 1}))
+
+    def test_recipes(self):
+        self.assertQueryPlans('recipes', lambda: self.client.get(RECIPES_URL))
+
+    def test_recipes_by_tags(self):
+        self.assertQueryPlans('recipes_by_tags', lambda: self.client.get(RECIPES_URL, {'tags': self.tag_ids}))
+
+    def test_recipes_by_ingredients(self):
+        self.assertQueryPlans(
+            'recipes_by_ingredients', lambda: self.client.get(RECIPES_URL, {'ingredients': self.ingredient_ids}))
+
+    def test_recipes_by_tags_and_ingredients(self):
+        self.assertQueryPlans('recipes_by_tags_and_ingredients', lambda: self.client.get(
+            RECIPES_URL, {'tags': self.tag_ids, 'ingredients': self.ingredient_ids}))
+
+    @skipIf(os.environ.get(UPDATE_ENV) == '1', 'snapshot 을 저장하는 중')
+    def test_missing_snapshot_fails(self):
+        """snapshot 에 없는 항목은 저장하지 않고 실패"""
+        with self.assertRaisesRegex(AssertionError, 'snapshot 이 없습니다'):
+            self.assertQueryPlans('missing', lambda: self.client.get(TAGS_URL))
@@ -1,20 +1,31 @@
 import os
+import struct
 import tempfile
+from unittest import skipIf
+from unittest.mock import patch
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, connections
 # TestCase 는 transaction 테스트 케이스로 모든 작업이 끝났을 때 갱신이 됨
 # 중간에 오류가 발생했을 경우에는 그 전에 했던 작업들도 모두 기본 초기화
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from core.models import Recipe, Tag, Ingredient
+from core.counting import count_with_estimate
+from core.models import Recipe, RecipeStats, Tag, Ingredient
+from recipe.documents import get_cached_detail, build_detail
+from recipe.operations import get_or_create_by_names
 from recipe.serializer import RecipeSerializer, RecipeDetailSerializer
 
 from PIL import Image
 
 RECIPES_URL = reverse('recipe:recipe-list')
+BULK_DELETE_URL = reverse('recipe:recipe-bulk-delete')
 
 
 def image_upload_url(recipe_id):
@@ -80,7 +91,7 @@ class PrivateRecipeApiTests(TestCase):
 
         res = self.client.get(RECIPES_URL)
 
-        recipes = Recipe.objects.all().order_by('-id')
+        recipes = Recipe.objects.filter(user=self.user).order_by('-id')
         serializer = RecipeSerializer(recipes, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data, serializer.data)
@@ -121,7 +132,8 @@ class PrivateRecipeApiTests(TestCase):
         # return 되는 OrderedDict 는 순서를 기억하는 사전형
         serializer = RecipeDetailSerializer(recipe)
 
-        self.assertEqual(res.data, serializer.data)
+        # detail 응답은 미리 렌더링 된 JSON 이므로 res.data 대신 res.json() 으로 비교
+        self.assertEqual(res.json(), serializer.data)
 
     def test_create_basic_recipe(self):
         """recipe 생성 테스트"""
@@ -133,7 +145,7 @@ class PrivateRecipeApiTests(TestCase):
         res = self.client.post(RECIPES_URL, payload)
 
         self.assertEqual(res.status_code, status.HTTP_201_CREATED)
-        recipe = Recipe.objects.get(id=res.data['id'])
+        recipe = Recipe.objects.get(user=self.user, id=res.data['id'])
         # recipe 객체에 payload 의 key 값이 있는지 확인
         for key in payload.keys():
             # 변수를 전달하여 속성에 접근 recipe.key 는 검색이 되지 않음
@@ -155,7 +167,7 @@ class PrivateRecipeApiTests(TestCase):
         res = self.client.post(RECIPES_URL, payload)
 
         self.assertEqual(res.status_code, status.HTTP_201_CREATED)
-        recipe = Recipe.objects.get(id=res.data['id'])
+        recipe = Recipe.objects.get(user=self.user, id=res.data['id'])
         # Many-To-Many 필드 관계이며, 해당 recipe 를 참조한 tag 객체를 모두 불러옴
         tags = recipe.tags.all()
         # tags1, tags2 객체 2개가 존재하는지 확인
@@ -177,12 +189,113 @@ class PrivateRecipeApiTests(TestCase):
         res = self.client.post(RECIPES_URL, payload)
 
         self.assertEqual(res.status_code, status.HTTP_201_CREATED)
-        recipe = Recipe.objects.get(id=res.data['id'])
+        recipe = Recipe.objects.get(user=self.user, id=res.data['id'])
         ingredients = recipe.ingredients.all()
         self.assertEqual(ingredients.count(), 2)
         self.assertIn(ingredient1, ingredients)
         self.assertIn(ingredient2, ingredients)
 
+    def test_create_recipe_with_tag_names(self):
+        """없는 이름은 만들고 있는 이름은 현재 유저의 tag 를 연결하는지 테스트"""
+        existing = sample_tag(user=self.user, name='Vegan')
+        other_user = get_user_model().objects.create_user('other@master.com', 'pass1234')
+        sample_tag(user=other_user, name='Quick')
+        ingredient = sample_ingredient(user=self.user, name='Tofu')
+        payload = {
+            'title': 'Tofu Bowl',
+            'tags': ['Vegan', 'Quick', 'Quick'],
+            'ingredients': [ingredient.id, 'Rice'],
+            'time_minutes': 15,
+            'price': 7.00,
+        }
+
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(user=self.user, id=res.data['id'])
+        tags = recipe.tags.all()
+        self.assertEqual(len(tags), 2)
+        self.assertIn(existing, tags)
+        self.assertTrue(all(tag.user == self.user for tag in tags))
+        self.assertEqual(set(recipe.ingredients.values_list('name', flat=True)), {'Tofu', 'Rice'})
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(sorted(res.data['tags']), sorted(tag.id for tag in tags))
+
+    def test_create_recipe_queries_do_not_grow_with_names(self):
+        """이름의 수와 관계없이 같은 수의 쿼리로 recipe 를 만드는지 테스트"""
+        def create(count):
+            payload = {
+                'title': f'Recipe {count}',
+                'tags': [f'Tag {count} {i}' for i in range(count)],
+                'ingredients': [f'Ingredient {count} {i}' for i in range(count)],
+                'time_minutes': 10,
+                'price': 5.00,
+            }
+            with CaptureQueriesContext(connection) as context:
+                res = self.client.post(RECIPES_URL, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            return len(context.captured_queries)
+
+        # 처음 만들 때만 실행되는 통계 생성 등의 쿼리를 제외
+        create(1)
+        self.assertEqual(create(2), create(10))
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 13)
+
+    def test_numeric_tag_names(self):
+        """JSON 의 숫자 문자열은 이름, form 입력의 숫자 문자열은 id 로 보는지 테스트"""
+        tag = sample_tag(user=self.user, name='Vegan')
+        payload = {'title': 'Stew', 'tags': ['2024'], 'ingredients': [], 'time_minutes': 10, 'price': 5.00}
+
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(list(Recipe.objects.get(user=self.user, id=res.data['id']).tags.values_list('name', flat=True)),
+                         ['2024'])
+
+        res = self.client.post(RECIPES_URL, dict(payload, tags=[str(tag.id)]), format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(list(Recipe.objects.get(user=self.user, id=res.data['id']).tags.all()), [tag])
+
+    def test_names_created_concurrently(self):
+        """조회한 뒤 다른 요청이 같은 이름을 먼저 만들어 unique 제약에 걸려도 기존 객체를 사용"""
+        existing = sample_tag(user=self.user, name='Vegan')
+        filter_results = [Tag.objects.filter(user=self.user).none()]
+        real_filter = Tag.objects.filter
+
+        # 처음 조회할 때는 아직 만들어지지 않은 것처럼 보이게 함
+        def filter(*args, **kwargs):
+            return filter_results.pop() if filter_results else real_filter(*args, **kwargs)
+
+        with patch.object(Tag.objects, 'filter', side_effect=filter):
+            ids = get_or_create_by_names(Tag, self.user, ['Vegan', 'Quick'])
+
+        self.assertEqual(ids['Vegan'], existing.id)
+        self.assertEqual(ids['Quick'], Tag.objects.get(user=self.user, name='Quick').id)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_create_recipe_with_other_users_tag_id(self):
+        """다른 유저의 tag id 는 연결할 수 없는지 테스트"""
+        other_user = get_user_model().objects.create_user('other@master.com', 'pass1234')
+        tag = sample_tag(user=other_user)
+        payload = {'title': 'Stew', 'tags': [tag.id], 'ingredients': [], 'time_minutes': 10, 'price': 5.00}
+
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Recipe.objects.filter(user=self.user).exists())
+
+    def test_create_recipe_with_invalid_tag_value(self):
+        """id, 이름이 아닌 값은 400 을 반환하고 아무것도 만들지 않는지 테스트"""
+        payload = {'title': 'Stew', 'tags': ['New', {'name': 'x'}], 'ingredients': ['Salt'],
+                   'time_minutes': 10, 'price': 5.00}
+
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Tag.objects.filter(user=self.user).exists())
+        self.assertFalse(Ingredient.objects.filter(user=self.user).exists())
+
     def test_one_create_tag(self):
         """
         sample_tag 함수에서 name='Main course' 로 설정.
@@ -221,6 +334,16 @@ class PrivateRecipeApiTests(TestCase):
         self.assertEqual(len(tags), 1)
         self.assertIn(new_tag, tags)
 
+    def test_partial_update_recipe_with_tag_names(self):
+        """patch 로 tags 를 이름으로 바꾸는 테스트"""
+        recipe = sample_recipe(user=self.user)
+        recipe.tags.add(sample_tag(user=self.user))
+
+        res = self.client.patch(detail_url(recipe.id), {'tags': ['Curry']}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(recipe.tags.values_list('name', flat=True)), ['Curry'])
+
     def test_full_update_recipe(self):
         """
         put 을 통한 recipe 업데이트 테스트
@@ -247,6 +370,90 @@ class PrivateRecipeApiTests(TestCase):
         self.assertEqual(len(tags), 0)
 
 
+class RecipeDetailDocumentTests(TestCase):
+    """미리 렌더링 된 recipe detail 문서 테스트"""
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@master.com',
+            'pass1234'
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = sample_recipe(user=self.user)
+        self.tag = sample_tag(user=self.user)
+        self.recipe.tags.add(self.tag)
+
+    def test_detail_served_without_queries(self):
+        """두 번째 조회부터는 DB 를 조회하지 않고 문서를 반환하는지 테스트"""
+        url = detail_url(self.recipe.id)
+        self.client.get(url)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json()['tags'][0]['name'], self.tag.name)
+
+    def test_detail_rebuilt_after_tag_rename(self):
+        """tag 이름이 바뀌면 문서가 다시 만들어지는지 테스트"""
+        url = detail_url(self.recipe.id)
+        self.client.get(url)
+        self.tag.name = 'Dessert'
+        self.tag.save()
+
+        res = self.client.get(url)
+
+        self.assertEqual(res.json()['tags'][0]['name'], 'Dessert')
+
+    def test_detail_rebuilt_after_links_change(self):
+        """ingredients 연결이 바뀌면 문서가 다시 만들어지는지 테스트"""
+        url = detail_url(self.recipe.id)
+        self.client.get(url)
+        ingredient = sample_ingredient(user=self.user)
+        ingredient.recipe_set.add(self.recipe)
+
+        res = self.client.get(url)
+
+        self.assertEqual(res.json()['ingredients'][0]['name'], ingredient.name)
+
+    def test_detail_rebuilt_after_update(self):
+        """PATCH 이후 변경된 내용이 조회되는지 테스트"""
+        url = detail_url(self.recipe.id)
+        self.client.get(url)
+        self.client.patch(url, {'title': 'Chicken Stew'})
+
+        res = self.client.get(url)
+
+        self.assertEqual(res.json()['title'], 'Chicken Stew')
+
+    def test_stale_detail_written_after_invalidation_ignored(self):
+        """무효화 전에 조회한 recipe 로 만든 문서는 이후 조회에서 사용하지 않는지 테스트"""
+        url = detail_url(self.recipe.id)
+        _, generation = get_cached_detail(self.recipe.id)
+        stale = Recipe.objects.get(user=self.user, id=self.recipe.id)
+        self.client.patch(url, {'title': 'Chicken Stew'})
+        build_detail(stale, generation)
+
+        self.assertIsNone(get_cached_detail(self.recipe.id)[0])
+        res = self.client.get(url)
+        self.assertEqual(res.json()['title'], 'Chicken Stew')
+
+    def test_cached_detail_limited_to_user(self):
+        """캐시된 문서도 다른 유저에게는 404 를 반환하는지 테스트"""
+        url = detail_url(self.recipe.id)
+        self.client.get(url)
+        user2 = get_user_model().objects.create_user(
+            'other@master.com',
+            'pass4321'
+        )
+        self.client.force_authenticate(user2)
+
+        res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
 class RecipeImageUploadTests(TestCase):
 
     def setUp(self):
@@ -286,6 +493,37 @@ class RecipeImageUploadTests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_upload_image_bomb_rejected_before_decode(self):
+        """헤더의 픽셀 수가 너무 크면 Pillow 로 열지 않고 거절"""
+        header = b'\x89PNG\r\n\x1a\n' + struct.pack('>I', 13) + b'IHDR' + struct.pack('>II', 50000, 50000)
+        upload = SimpleUploadedFile('bomb.png', header + bytes(100))
+
+        with patch('PIL.Image.open') as image_open:
+            res = self.client.post(image_upload_url(self.recipe.id), {'image': upload}, format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data['image'][0].code, 'max_pixels')
+        image_open.assert_not_called()
+
+    @override_settings(IMAGE_MAX_BYTES=100)
+    def test_upload_image_too_large(self):
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as temp:
+            Image.new('RGB', (100, 100)).save(temp, format='JPEG')
+            temp.seek(0)
+            res = self.client.post(image_upload_url(self.recipe.id), {'image': temp}, format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data['image'][0].code, 'max_bytes')
+
+    def test_upload_image_unsupported_format(self):
+        with tempfile.NamedTemporaryFile(suffix='.bmp') as temp:
+            Image.new('RGB', (10, 10)).save(temp, format='BMP')
+            temp.seek(0)
+            res = self.client.post(image_upload_url(self.recipe.id), {'image': temp}, format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data['image'][0].code, 'format')
+
     def test_filter_recipes_by_tags(self):
         """tag 가 있는 recipe 만 리턴되는지 테스트"""
         recipe1 = sample_recipe(user=self.user, title='Poo Phat Pong Curry')
@@ -323,3 +561,158 @@ class RecipeImageUploadTests(TestCase):
         self.assertIn(serializer1.data, res.data)
         self.assertIn(serializer2.data, res.data)
         self.assertNotIn(serializer3.data, res.data)
+
+
+class RecipeRangeFilterTests(TestCase):
+    """price, time_minutes 범위 검색과 정렬 테스트"""
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@master.com',
+            'pass1234'
+        )
+        self.client.force_authenticate(self.user)
+        self.cheap = sample_recipe(user=self.user, title='Toast', price=2.00, time_minutes=5)
+        self.middle = sample_recipe(user=self.user, title='Curry', price=8.50, time_minutes=40)
+        self.expensive = sample_recipe(user=self.user, title='Steak', price=30.00, time_minutes=25)
+
+    def test_filter_by_price_range(self):
+        """price_min, price_max 사이의 recipe 만 리턴되는지 테스트"""
+        res = self.client.get(RECIPES_URL, {'price_min': '2.5', 'price_max': '30'})
+
+        self.assertEqual([r['title'] for r in res.data], ['Steak', 'Curry'])
+
+    def test_filter_by_time_max(self):
+        """time_max 이하의 recipe 만 리턴되는지 테스트"""
+        res = self.client.get(RECIPES_URL, {'time_max': 25})
+
+        self.assertEqual([r['title'] for r in res.data], ['Steak', 'Toast'])
+
+    def test_filter_combined_with_tags(self):
+        """tags 필터와 범위 검색을 함께 사용하는 테스트"""
+        tag = sample_tag(user=self.user)
+        self.cheap.tags.add(tag)
+        self.expensive.tags.add(tag)
+
+        res = self.client.get(RECIPES_URL, {'tags': str(tag.id), 'price_max': 10})
+
+        self.assertEqual([r['title'] for r in res.data], ['Toast'])
+
+    def test_ordering(self):
+        """ordering 으로 정렬 순서를 지정하는 테스트"""
+        res = self.client.get(RECIPES_URL, {'ordering': 'price'})
+        self.assertEqual([r['title'] for r in res.data], ['Toast', 'Curry', 'Steak'])
+
+        res = self.client.get(RECIPES_URL, {'ordering': '-time_minutes'})
+        self.assertEqual([r['title'] for r in res.data], ['Curry', 'Steak', 'Toast'])
+
+    def test_invalid_parameters(self):
+        """잘못된 값이나 허용되지 않은 정렬 필드는 400 을 반환"""
+        self.assertEqual(
+            self.client.get(RECIPES_URL, {'price_min': 'cheap'}).status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
+        self.assertEqual(
+            self.client.get(RECIPES_URL, {'ordering': 'user__password'}).status_code,
+            status.HTTP_400_BAD_REQUEST,
+        )
+
+
+class RecipeBulkDeleteTests(TestCase):
+    """여러 recipe 를 나누어 삭제하는 API 테스트"""
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'test@master.com',
+            'pass1234'
+        )
+        self.client.force_authenticate(self.user)
+
+    @override_settings(DELETION_BATCH_SIZE=2)
+    def test_bulk_delete(self):
+        """지정한 recipe 만 삭제되고 삭제한 수를 리턴"""
+        recipes = [sample_recipe(user=self.user, title=f'Recipe {i}') for i in range(5)]
+        kept = sample_recipe(user=self.user, title='Kept')
+
+        res = self.client.post(BULK_DELETE_URL, {'recipes': [r.id for r in recipes]}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['deleted'], 5)
+        self.assertEqual(list(Recipe.objects.filter(user=self.user).values_list('id', flat=True)), [kept.id])
+
+    def test_bulk_delete_other_users_recipe(self):
+        """다른 유저의 recipe 는 삭제할 수 없음"""
+        user2 = get_user_model().objects.create_user('other@master.com', 'pass4321')
+        recipe = sample_recipe(user=user2)
+
+        res = self.client.post(BULK_DELETE_URL, {'recipes': [recipe.id]}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(Recipe.objects.filter(user=user2, id=recipe.id).exists())
+
+
+class RecipePaginationTests(TestCase):
+    """?limit= 으로 나누어 반환하는 목록과 전체 수 테스트"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user('test@master.com', 'pass1234')
+        self.client.force_authenticate(self.user)
+        for i in range(3):
+            sample_recipe(user=self.user, title=f'Recipe {i}', price=i + 1)
+
+    def test_without_limit_returns_full_list(self):
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(len(res.data), 3)
+
+    def test_exact_count_under_threshold(self):
+        res = self.client.get(RECIPES_URL, {'limit': 2})
+
+        self.assertEqual(res.data['count'], 3)
+        self.assertFalse(res.data['count_estimated'])
+        self.assertEqual([r['title'] for r in res.data['results']], ['Recipe 2', 'Recipe 1'])
+        self.assertIn('offset=2', res.data['next'])
+
+    @override_settings(LIST_EXACT_COUNT_THRESHOLD=1)
+    def test_estimated_count_from_user_counter(self):
+        """threshold 를 넘으면 COUNT(*) 대신 유저의 recipe 수를 추정값으로 사용"""
+        RecipeStats.objects.filter(user=self.user).update(count=2)
+
+        res = self.client.get(RECIPES_URL, {'limit': 2})
+
+        self.assertEqual(res.data['count'], 2)
+        self.assertTrue(res.data['count_estimated'])
+        # 추정값보다 실제가 많을 수 있으므로 페이지가 가득 차면 다음 링크를 줌
+        self.assertIsNotNone(res.data['next'])
+
+    @override_settings(LIST_EXACT_COUNT_THRESHOLD=1)
+    def test_count_without_user_counter_is_exact(self):
+        """유저의 통계 행이 없으면 0 을 추정값으로 쓰지 않고 정확하게 셈"""
+        RecipeStats.objects.filter(user=self.user).delete()
+
+        res = self.client.get(RECIPES_URL, {'limit': 2})
+
+        self.assertEqual(res.data['count'], 3)
+        self.assertIn('offset=2', res.data['next'])
+
+    @skipIf(connection.vendor == 'postgresql', 'PostgreSQL 은 planner 의 추정값을 사용')
+    @override_settings(LIST_EXACT_COUNT_THRESHOLD=1)
+    def test_filtered_count_without_estimate_is_exact(self):
+        """필터가 있고 planner 추정값이 없으면(SQLite) 정확하게 셈"""
+        res = self.client.get(RECIPES_URL, {'limit': 1, 'price_min': 2})
+
+        self.assertEqual(res.data['count'], 2)
+        self.assertFalse(res.data['count_estimated'])
+
+    def test_count_with_estimate(self):
+        """threshold 까지는 LIMIT 을 건 COUNT 로 정확하게 세고, 넘으면 주어진 추정값을 사용"""
+        for name in ('Spicy', 'Sweet', 'Sour'):
+            Tag.objects.create(user=self.user, name=name)
+
+        with CaptureQueriesContext(connections[Tag.objects.filter(user=self.user).db]) as queries:
+            self.assertEqual(count_with_estimate(Tag.objects.filter(user=self.user), threshold=5), (3, False))
+        self.assertIn('LIMIT 6', queries.captured_queries[0]['sql'])
+        self.assertEqual(count_with_estimate(Tag.objects.filter(user=self.user), threshold=1, estimate=10), (10, True))
+        self.assertEqual(count_with_estimate(Tag.objects.filter(user=self.user), threshold=1, estimate=0), (2, True))
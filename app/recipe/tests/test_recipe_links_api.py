@@ -0,0 +1,127 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+
+BULK_LINKS_URL = reverse('recipe:recipe-bulk-links')
+
+
+def links_url(recipe_id):
+    """recipe links URL 을 리턴"""
+    return reverse('recipe:recipe-links', args=[recipe_id])
+
+
+def sample_recipe(user, **params):
+    defaults = {'title': 'sample recipe', 'time_minutes': 10, 'price': 5.00}
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class RecipeLinksApiTests(TestCase):
+    """recipe 의 tags, ingredients 부분 추가/삭제 테스트"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'test@master.com',
+            'pass1234'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = sample_recipe(user=self.user)
+        self.tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        self.tag2 = Tag.objects.create(user=self.user, name='Dessert')
+        self.ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+
+    def test_add_and_remove_links(self):
+        """기존 연결은 유지하고 요청한 연결만 추가/삭제되는지 테스트"""
+        self.recipe.tags.add(self.tag1)
+        self.recipe.ingredients.add(self.ingredient)
+        payload = {
+            'add': {'tags': [self.tag1.id, self.tag2.id]},
+            'remove': {'ingredients': [self.ingredient.id]},
+        }
+
+        res = self.client.post(links_url(self.recipe.id), payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(res.data['tags']), {self.tag1.id, self.tag2.id})
+        self.assertEqual(res.data['ingredients'], [])
+        self.assertEqual(self.recipe.tags.count(), 2)
+        self.assertEqual(self.recipe.ingredients.count(), 0)
+
+    def test_links_refresh_detail(self):
+        """연결을 추가하면 detail 응답에도 반영되는지 테스트"""
+        detail_url = reverse('recipe:recipe-detail', args=[self.recipe.id])
+        self.client.get(detail_url)
+
+        self.client.post(links_url(self.recipe.id), {'add': {'tags': [self.tag1.id]}}, format='json')
+
+        res = self.client.get(detail_url)
+        self.assertEqual(res.json()['tags'][0]['name'], self.tag1.name)
+
+    def test_links_other_users_tag(self):
+        """다른 유저의 tag 는 연결할 수 없음"""
+        user2 = get_user_model().objects.create_user(
+            'other@master.com',
+            'pass4321'
+        )
+        tag = Tag.objects.create(user=user2, name='Fruity')
+
+        res = self.client.post(links_url(self.recipe.id), {'add': {'tags': [tag.id]}}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.recipe.tags.count(), 0)
+
+    def test_bulk_links(self):
+        """여러 recipe 에 같은 tag 를 한 번에 연결하는 테스트"""
+        recipes = [sample_recipe(user=self.user, title=f'Recipe {i}') for i in range(50)]
+        recipes[0].tags.add(self.tag1)
+        payload = {'recipes': [recipe.id for recipe in recipes], 'add': {'tags': [self.tag1.id]}}
+
+        res = self.client.post(BULK_LINKS_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {'recipes': 50, 'added': 49, 'removed': 0})
+        self.assertEqual(self.tag1.recipe_set.count(), 50)
+
+    def test_bulk_links_query_count(self):
+        """recipe 수와 관계없이 쿼리 수가 일정한지 테스트"""
+        recipes = [sample_recipe(user=self.user, title=f'Recipe {i}') for i in range(20)]
+        payload = {
+            'recipes': [recipe.id for recipe in recipes],
+            'add': {'tags': [self.tag1.id, self.tag2.id]},
+            'remove': {'ingredients': [self.ingredient.id]},
+        }
+        small = dict(payload, recipes=payload['recipes'][:2])
+
+        with CaptureQueriesContext(connection) as small_queries:
+            self.client.post(BULK_LINKS_URL, small, format='json')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(BULK_LINKS_URL, payload, format='json')
+
+        self.assertEqual(len(queries), len(small_queries))
+        self.assertEqual(self.tag2.recipe_set.count(), 20)
+
+    def test_bulk_links_other_users_recipe(self):
+        """다른 유저의 recipe 는 변경할 수 없음"""
+        user2 = get_user_model().objects.create_user(
+            'other@master.com',
+            'pass4321'
+        )
+        recipe = sample_recipe(user=user2)
+
+        res = self.client.post(
+            BULK_LINKS_URL, {'recipes': [recipe.id], 'add': {'tags': [self.tag1.id]}}, format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(recipe.tags.count(), 0)
@@ -0,0 +1,130 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.index import registry, UserRecipeIndex
+
+
+def similar_url(recipe_id):
+    """similar recipe URL 을 리턴"""
+    return reverse('recipe:recipe-similar', args=[recipe_id])
+
+
+def sample_recipe(user, **params):
+    defaults = {'title': 'sample recipe', 'time_minutes': 10, 'price': 5.00}
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class UserRecipeIndexTests(TestCase):
+    """역색인 Jaccard 유사도 계산 테스트"""
+
+    def test_similar(self):
+        index = UserRecipeIndex(0)
+        index.set_recipe(1, {1}, {10, 11, 12})
+        index.set_recipe(2, {1}, {10, 11})
+        index.set_recipe(3, set(), {12})
+        index.set_recipe(4, {2}, {13})
+
+        self.assertEqual(index.similar(1, 10), [(2, 0.75), (3, 0.25)])
+
+    def test_set_recipe_replaces_links(self):
+        index = UserRecipeIndex(0)
+        index.set_recipe(1, set(), {10})
+        index.set_recipe(2, set(), {10})
+        index.set_recipe(2, set(), {11})
+
+        self.assertEqual(index.similar(1, 10), [])
+        self.assertNotIn(10, index.ingredient_postings.get(11, ()))
+
+
+class SimilarRecipeApiTests(TestCase):
+    """similar recipe API 테스트"""
+
+    def setUp(self):
+        cache.clear()
+        registry.clear()
+        self.user = get_user_model().objects.create_user(
+            'test@master.com',
+            'pass1234'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.salt = Ingredient.objects.create(user=self.user, name='Salt')
+        self.pepper = Ingredient.objects.create(user=self.user, name='Pepper')
+        self.noodle = Ingredient.objects.create(user=self.user, name='Noodle')
+        self.spicy = Tag.objects.create(user=self.user, name='Spicy')
+        self.recipe = sample_recipe(user=self.user, title='Ramen')
+        self.recipe.ingredients.add(self.salt, self.pepper, self.noodle)
+        self.recipe.tags.add(self.spicy)
+
+    def test_similar_recipes_ranked(self):
+        """유사도가 높은 recipe 부터 반환되는지 테스트"""
+        close = sample_recipe(user=self.user, title='Udon')
+        close.ingredients.add(self.salt, self.noodle)
+        close.tags.add(self.spicy)
+        far = sample_recipe(user=self.user, title='Steak')
+        far.ingredients.add(self.salt)
+        sample_recipe(user=self.user, title='Salad')
+
+        res = self.client.get(similar_url(self.recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['recipe']['title'] for r in res.data], ['Udon', 'Steak'])
+        self.assertEqual(res.data[0]['score'], 0.75)
+
+    def test_similar_limit_clamped(self):
+        """limit 이 0 이하이거나 너무 크면 1 ~ 100 으로 제한하는지 테스트"""
+        for title in ('Udon', 'Soba'):
+            sample_recipe(user=self.user, title=title).ingredients.add(self.salt)
+
+        res = self.client.get(similar_url(self.recipe.id), {'limit': -1})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 1)
+
+        res = self.client.get(similar_url(self.recipe.id), {'limit': 10 ** 9})
+        self.assertEqual(len(res.data), 2)
+
+    def test_similar_updated_incrementally(self):
+        """색인을 만든 뒤 연결이 바뀌면 결과에 반영되는지 테스트"""
+        other = sample_recipe(user=self.user, title='Udon')
+        self.client.get(similar_url(self.recipe.id))
+
+        other.ingredients.add(self.noodle)
+        res = self.client.get(similar_url(self.recipe.id))
+        self.assertEqual([r['recipe']['title'] for r in res.data], ['Udon'])
+
+        other.delete()
+        res = self.client.get(similar_url(self.recipe.id))
+        self.assertEqual(res.data, [])
+
+    def test_similar_after_tag_deleted(self):
+        """tag 가 삭제되면 색인에서도 연결이 빠지는지 테스트"""
+        other = sample_recipe(user=self.user, title='Curry')
+        other.tags.add(self.spicy)
+        self.client.get(similar_url(self.recipe.id))
+
+        self.spicy.delete()
+        res = self.client.get(similar_url(self.recipe.id))
+
+        self.assertEqual(res.data, [])
+
+    def test_similar_limited_to_user(self):
+        """다른 유저의 recipe 는 비교 대상이 아니고, 조회할 수도 없음"""
+        user2 = get_user_model().objects.create_user(
+            'other@master.com',
+            'pass4321'
+        )
+        other = sample_recipe(user=user2)
+        other.ingredients.add(self.salt)
+
+        res = self.client.get(similar_url(self.recipe.id))
+        self.assertEqual(res.data, [])
+
+        res = self.client.get(similar_url(other.id))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,118 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, RecipeStats, RecipeStatsBucket
+from core.sharding import shard_for_user
+
+
+STATS_URL = reverse('recipe:stats')
+
+
+def sample_recipe(user, **params):
+    defaults = {'title': 'sample recipe', 'time_minutes': 10, 'price': 5.00}
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class StatsApiTests(TestCase):
+    """유저별 recipe 통계 API 테스트"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@master.com',
+            'pass1234'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_login_required(self):
+        res = APIClient().get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_empty_stats(self):
+        """recipe 가 없으면 count 0 을 반환"""
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['count'], 0)
+        self.assertIsNone(res.data['price']['average'])
+
+    def test_stats_updated_incrementally(self):
+        """생성, 수정, 삭제가 통계에 반영되는지 테스트"""
+        sample_recipe(user=self.user, price=4.50, time_minutes=10)
+        recipe = sample_recipe(user=self.user, price=10.00, time_minutes=30)
+        removed = sample_recipe(user=self.user, price=99.00, time_minutes=90)
+        recipe.price = 5.50
+        recipe.save()
+        removed.delete()
+
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.data['count'], 2)
+        self.assertEqual(res.data['price']['average'], 5.0)
+        self.assertEqual(res.data['time_minutes']['average'], 20.0)
+        self.assertEqual(
+            [(b['bucket'], b['count']) for b in res.data['price']['histogram']],
+            [(4, 1), (5, 1)],
+        )
+        self.assertEqual(res.data['price']['percentiles']['p50'], 5.0)
+
+    def test_recipes_created_before_stats(self):
+        """통계 행이 없던 유저의 recipe 를 삭제해도 count 가 실제 recipe 수와 같고 음수가 되지 않음"""
+        recipes = [sample_recipe(user=self.user, price=i + 1) for i in range(3)]
+        RecipeStats.objects.filter(user=self.user).delete()
+        RecipeStatsBucket.objects.filter(user=self.user).delete()
+
+        recipes[0].delete()
+        self.assertEqual(self.client.get(STATS_URL).data['count'], 2)
+        RecipeStats.objects.filter(user=self.user).update(count=0)
+        recipes[1].delete()
+        recipes[2].price = 7.00
+        recipes[2].save()
+
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.data['count'], 1)
+        self.assertEqual(res.data['price']['average'], 7.0)
+        self.assertEqual(sum(b['count'] for b in res.data['price']['histogram']), 1)
+
+    def test_stats_constant_queries(self):
+        """recipe 수와 관계없이 쿼리 수가 일정한지 테스트"""
+        for i in range(30):
+            sample_recipe(user=self.user, price=i, time_minutes=i)
+
+        with self.assertNumQueries(2, using=shard_for_user(self.user.pk)):
+            self.client.get(STATS_URL)
+
+    def test_stats_limited_to_user(self):
+        """다른 유저의 recipe 는 통계에 포함하지 않음"""
+        user2 = get_user_model().objects.create_user(
+            'other@master.com',
+            'pass4321'
+        )
+        sample_recipe(user=user2)
+
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.data['count'], 0)
+
+    def test_rebuild_command(self):
+        """rebuild_recipe_stats 가 통계를 다시 집계하는지 테스트"""
+        sample_recipe(user=self.user, price=4.50, time_minutes=10)
+        sample_recipe(user=self.user, price=10.00, time_minutes=30)
+        expected = self.client.get(STATS_URL).data
+        # signal 을 거치지 않는 변경으로 통계가 어긋난 상황
+        RecipeStats.objects.filter(user=self.user).update(count=0)
+        RecipeStatsBucket.objects.filter(user=self.user).delete()
+
+        call_command('rebuild_recipe_stats', user=[self.user.id], stdout=StringIO())
+
+        self.assertEqual(self.client.get(STATS_URL).data, expected)
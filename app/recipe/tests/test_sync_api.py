@@ -0,0 +1,105 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+
+SYNC_URL = reverse('recipe:sync')
+
+
+def sample_recipe(user, **params):
+    defaults = {'title': 'sample recipe', 'time_minutes': 10, 'price': 5.00}
+    defaults.update(params)
+
+    return Recipe.objects.create(user=user, **defaults)
+
+
+@override_settings(SYNC_CURSOR_OVERLAP=0)
+class SyncApiTests(TestCase):
+    """delta sync API 테스트"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'test@master.com',
+            'pass1234'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        # 이전 동기화 이전에 만들어진 객체
+        self.old_recipe = sample_recipe(user=self.user, title='Old recipe')
+        self.old_tag = Tag.objects.create(user=self.user, name='Old tag')
+        past = timezone.now() - timedelta(hours=1)
+        Recipe.objects.filter(user=self.user).update(updated_at=past)
+        Tag.objects.filter(user=self.user).update(updated_at=past)
+        self.cursor = self.client.get(SYNC_URL).data['cursor']
+
+    def test_login_required(self):
+        """인증받지 않은 요청은 401 을 반환"""
+        res = APIClient().get(SYNC_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_full_sync(self):
+        """since 가 없으면 전체 목록을 반환"""
+        res = self.client.get(SYNC_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['title'] for r in res.data['recipes']], ['Old recipe'])
+        self.assertEqual([t['name'] for t in res.data['tags']], ['Old tag'])
+
+    def test_sync_returns_only_changes(self):
+        """cursor 이후에 생성, 수정된 객체만 반환하는지 테스트"""
+        sample_recipe(user=self.user, title='New recipe')
+        Ingredient.objects.create(user=self.user, name='Salt')
+
+        res = self.client.get(SYNC_URL, {'since': self.cursor})
+
+        self.assertEqual([r['title'] for r in res.data['recipes']], ['New recipe'])
+        self.assertEqual(res.data['tags'], [])
+        self.assertEqual([i['name'] for i in res.data['ingredients']], ['Salt'])
+
+    def test_sync_link_change_updates_recipe(self):
+        """tag 를 연결하면 recipe 가 변경된 것으로 반환되는지 테스트"""
+        self.old_recipe.tags.add(self.old_tag)
+
+        res = self.client.get(SYNC_URL, {'since': self.cursor})
+
+        self.assertEqual(len(res.data['recipes']), 1)
+        self.assertEqual(res.data['recipes'][0]['tags'], [self.old_tag.id])
+
+    def test_sync_returns_tombstones(self):
+        """삭제된 객체의 id 가 deleted 에 담기는지 테스트"""
+        recipe_id, tag_id = self.old_recipe.id, self.old_tag.id
+        self.old_recipe.delete()
+        self.old_tag.delete()
+
+        res = self.client.get(SYNC_URL, {'since': self.cursor})
+
+        self.assertEqual(res.data['deleted']['recipe'], [recipe_id])
+        self.assertEqual(res.data['deleted']['tag'], [tag_id])
+        self.assertEqual(res.data['recipes'], [])
+
+    def test_sync_limited_to_user(self):
+        """다른 유저의 변경 사항은 반환하지 않음"""
+        user2 = get_user_model().objects.create_user(
+            'other@master.com',
+            'pass4321'
+        )
+        sample_recipe(user=user2).delete()
+
+        res = self.client.get(SYNC_URL, {'since': self.cursor})
+
+        self.assertEqual(res.data['recipes'], [])
+        self.assertEqual(res.data['deleted']['recipe'], [])
+
+    def test_invalid_cursor(self):
+        """cursor 형식이 잘못되면 400 을 반환"""
+        res = self.client.get(SYNC_URL, {'since': 'yesterday'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
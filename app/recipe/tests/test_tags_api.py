@@ -42,7 +42,7 @@ class PrivateTagsApiTests(TestCase):
 
         res = self.client.get(TAGS_URL)
 
-        tags = Tag.objects.all().order_by('-name')
+        tags = Tag.objects.filter(user=self.user).order_by('-name')
         # 하나 이상의 인스턴스 또는 쿼리셋을 직렬화 시키기 위해 many=True 설정
         # many=True 를 설정하지 않으면 단일 인스턴스 객체만 전달이 됨
         serializer = TagSerializer(tags, many=True)
@@ -79,6 +79,16 @@ class PrivateTagsApiTests(TestCase):
         ).exists()
         self.assertTrue(exists)
 
+    def test_create_existing_tag(self):
+        """같은 이름의 태그가 있으면 새로 만들지 않고 기존 태그를 200 으로 반환"""
+        tag = Tag.objects.create(user=self.user, name='Simple')
+
+        res = self.client.post(TAGS_URL, {'name': 'Simple'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['id'], tag.id)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
     def test_create_tag_invalid(self):
         """invalid 한 payload 의 태그를 생성했을 경우의 테스트"""
         payload = {'name': ''}
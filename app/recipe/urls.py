@@ -12,5 +12,8 @@ router.register('recipes', views.RecipeViewSet)
 app_name = 'recipe'
 
 urlpatterns = [
+    path('sync/', views.SyncView.as_view(), name='sync'),
+    path('stats/', views.StatsView.as_view(), name='stats'),
+    path('events/', views.EventStreamView.as_view(), name='events'),
     path('', include(router.urls))
 ]
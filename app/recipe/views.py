@@ -1,18 +1,37 @@
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils import timezone
 from rest_framework import viewsets, mixins, status
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
-from core.models import Tag, Ingredient, Recipe
+from core.deletion import delete_in_batches
+from core.models import Tag, Ingredient, Recipe, RecipeStats, Tombstone
+from core.pagination import EstimatedCountPagination
+from core.renderers import EventStreamRenderer, FastJSONRenderer
+from core.sharding import UserShardMixin
+from user.tests.authentication import SignedTokenAuthentication
+from .documents import get_cached_detail, build_detail
+from .index import registry
+from . import events, stats
+from .operations import apply_link_changes
 from .serializer import TagSerializer, IngredientSerializer, RecipeSerializer,\
-                        RecipeDetailSerializer, RecipeImageSerializer
+                        RecipeDetailSerializer, RecipeImageSerializer,\
+                        RecipeLinksSerializer, BulkRecipeLinksSerializer, RecipeIdsSerializer
 
 
-class BaseRecipeAttrViewSet(viewsets.GenericViewSet, mixins.ListModelMixin, mixins.CreateModelMixin):
+class BaseRecipeAttrViewSet(UserShardMixin, viewsets.GenericViewSet, mixins.ListModelMixin, mixins.CreateModelMixin):
     """TagViewSet, IngredientViewSet 의 중복 코드를 Base 코드로 두어 처리"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (TokenAuthentication, SignedTokenAuthentication)
     permission_classes = (IsAuthenticated,)
+    pagination_class = EstimatedCountPagination
 
     def get_queryset(self):
         """최근 인증된 사용자에 대해서만 객체 반환"""
@@ -28,6 +47,17 @@ class BaseRecipeAttrViewSet(viewsets.GenericViewSet, mixins.ListModelMixin, mixi
         return queryset.filter(user=self.request.user).order_by('-name').distinct()
         # return self.queryset.filter(user=self.request.user).order_by('-name')
 
+    def create(self, request, *args, **kwargs):
+        """새로운 객체는 201, 같은 이름의 객체가 이미 있으면 그 객체를 200 으로 반환"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        self.perform_create(serializer)
+        if not getattr(serializer, 'created', True):
+            return Response(serializer.data, status=status.HTTP_200_OK)
+
+        headers = self.get_success_headers(serializer.data)
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+
     def perform_create(self, serializer):
         """새로운 객체를 생성"""
         serializer.save(user=self.request.user)
@@ -45,17 +75,52 @@ class IngredientViewSet(BaseRecipeAttrViewSet):
     serializer_class = IngredientSerializer
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(UserShardMixin, viewsets.ModelViewSet):
     """데이터베이스의 레시피 관리"""
     serializer_class = RecipeSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (TokenAuthentication, SignedTokenAuthentication)
     permission_classes = (IsAuthenticated,)
+    pagination_class = EstimatedCountPagination
+    # 목록을 거르는 query parameter, 하나도 없으면 유저의 recipe 수를 전체 수의 추정값으로 사용
+    list_filter_params = ('tags', 'ingredients', 'price_min', 'price_max', 'time_max')
+
+    # ?ordering= 로 정렬할 수 있는 필드, 같은 값은 id 로 정렬하여 순서를 고정
+    ordering_fields = ('id', 'price', 'time_minutes', 'title')
+    default_ordering = '-id'
 
     def _params_to_ints(self, qs):
         """list 로 된 str 타입의 ID 를 int 타입으로 형변환"""
         return [int(str_id) for str_id in qs.split(',')]
 
+    def _param_to_number(self, name, convert):
+        """query parameter 를 숫자로 변환, 형식이 잘못되면 400 을 반환"""
+        value = self.request.query_params.get(name)
+        if value in (None, ''):
+            return None
+        try:
+            return convert(value)
+        except (ValueError, InvalidOperation):
+            raise ValidationError({name: '숫자를 입력해주세요.'})
+
+    def _get_limit(self, default, max_limit=100):
+        """?limit= 을 1 ~ max_limit 범위로 제한하여 반환, 없으면 default"""
+        limit = self._param_to_number('limit', int)
+        if limit is None:
+            return default
+
+        return max(1, min(limit, max_limit))
+
+    def _get_ordering(self):
+        """?ordering=price, -time_minutes 처럼 지정한 정렬 순서를 반환"""
+        ordering = self.request.query_params.get('ordering') or self.default_ordering
+        if ordering.lstrip('-') not in self.ordering_fields:
+            raise ValidationError({'ordering': f'정렬할 수 있는 필드: {", ".join(self.ordering_fields)}'})
+        if ordering.lstrip('-') == 'id':
+            return (ordering,)
+
+        return (ordering, '-id' if ordering.startswith('-') else 'id')
+
     def get_queryset(self):
         """인증 된 유저의 recipe 필터 검색"""
         tags = self.request.query_params.get('tags')
@@ -71,11 +136,40 @@ class RecipeViewSet(viewsets.ModelViewSet):
         if ingredients:
             ingredient_id = self._params_to_ints(ingredients)
             queryset = queryset.filter(ingredients__id__in=ingredient_id)
+        # ?price_min=5&price_max=10&time_max=30
+        # (user, price), (user, time_minutes) 인덱스로 범위 검색과 정렬을 처리
+        price_min = self._param_to_number('price_min', Decimal)
+        price_max = self._param_to_number('price_max', Decimal)
+        time_max = self._param_to_number('time_max', int)
+        if price_min is not None:
+            queryset = queryset.filter(price__gte=price_min)
+        if price_max is not None:
+            queryset = queryset.filter(price__lte=price_max)
+        if time_max is not None:
+            queryset = queryset.filter(time_minutes__lte=time_max)
+        if self.action == 'list':
+            # 목록의 recipe 마다 tag, ingredient 를 조회하지 않도록 한 번에 가져옴
+            queryset = queryset.prefetch_related('tags', 'ingredients')
         # http://127.0.0.1:8000/api/recipe/recipes/?tags=2&ingredients=1
-        return queryset.filter(user=self.request.user)
+        return queryset.filter(user=self.request.user).order_by(*self._get_ordering())
         # """최근 인증된 사용자에 대해서만 객체 반환"""
         # return self.queryset.filter(user=self.request.user)
 
+    def get_count_estimate(self):
+        """
+        조건 없는 목록이면 recipe 가 저장, 삭제될 때 갱신되는 유저의 recipe 수를 추정값으로 사용
+
+        통계 행이 없거나 값이 잘못되었으면 추정값 대신 정확하게 센다.
+        """
+        if any(self.request.query_params.get(name) for name in self.list_filter_params):
+            return None
+
+        count = RecipeStats.objects.filter(user=self.request.user).values_list('count', flat=True).first()
+        if count is None or count < 0:
+            return Recipe.objects.filter(user=self.request.user).count()
+
+        return count
+
     def get_serializer_class(self):
         """적절한 serializer 클래스 반환"""
         # ModelViewSet.RetrieveMixin.retrieve
@@ -86,8 +180,37 @@ class RecipeViewSet(viewsets.ModelViewSet):
         elif self.action == 'upload_image':
             return RecipeImageSerializer
 
+        elif self.action == 'links':
+            return RecipeLinksSerializer
+
+        elif self.action == 'bulk_links':
+            return BulkRecipeLinksSerializer
+
+        elif self.action == 'bulk_delete':
+            return RecipeIdsSerializer
+
         return self.serializer_class
 
+    def retrieve(self, request, *args, **kwargs):
+        """
+        미리 렌더링 된 recipe detail JSON 을 그대로 반환
+
+        캐시에 문서가 있으면 recipe 를 조회하지 않고, 소유자만 확인한다.
+        JSON 이 아닌 형식(browsable API 등)을 요청하면 기본 retrieve 를 사용
+        """
+        if request.accepted_renderer.format != 'json':
+            return super().retrieve(request, *args, **kwargs)
+
+        cached, generation = get_cached_detail(kwargs['pk'])
+        if cached is not None:
+            user_id, document = cached
+            if user_id != request.user.pk:
+                raise Http404
+        else:
+            document = build_detail(self.get_object(), generation)
+
+        return HttpResponse(document, content_type='application/json')
+
     def perform_create(self, serializer):
         """새로운 recipe 생성"""
         serializer.save(user=self.request.user)
@@ -108,3 +231,208 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    @action(methods=['GET'], detail=True)
+    def similar(self, request, pk=None):
+        """
+        tags, ingredients 가 비슷한 유저의 다른 recipe 를 유사도 순으로 반환
+
+        ?limit= 최대 개수(기본 10, 최대 100)
+        """
+        recipe = self.get_object()
+        ranked = registry.get(request.user.pk).similar(recipe.id, self._get_limit(10))
+
+        recipes = Recipe.objects.prefetch_related('tags', 'ingredients') \
+            .in_bulk([recipe_id for recipe_id, _ in ranked])
+        results = [
+            {'score': round(score, 4), 'recipe': RecipeSerializer(recipes[recipe_id]).data}
+            for recipe_id, score in ranked
+            if recipe_id in recipes
+        ]
+
+        return Response(results, status=status.HTTP_200_OK)
+
+    @action(methods=['GET'], detail=False)
+    def pantry(self, request):
+        """
+        가지고 있는 재료로 만들 수 있는 recipe 를 재료를 많이 갖춘 순서로 반환
+
+        ?ingredients=1,2,3 가지고 있는 재료 id
+        ?missing=     부족해도 되는 재료 수(기본 0, 최대 100)
+        ?limit=       최대 개수(기본 20, 최대 100)
+        """
+        ingredients = request.query_params.get('ingredients')
+        if not ingredients:
+            raise ValidationError({'ingredients': '가지고 있는 재료의 id 를 입력해주세요.'})
+        try:
+            ingredient_ids = self._params_to_ints(ingredients)
+        except ValueError:
+            raise ValidationError({'ingredients': '숫자를 입력해주세요.'})
+        max_missing = max(0, min(self._param_to_number('missing', int) or 0, 100))
+
+        ranked = registry.get(request.user.pk).cookable(ingredient_ids, max_missing, self._get_limit(20))
+
+        recipes = Recipe.objects.prefetch_related('tags', 'ingredients') \
+            .in_bulk([recipe_id for recipe_id, _, _ in ranked])
+        results = [
+            {
+                'coverage': round(coverage, 4),
+                'missing': missing,
+                'recipe': RecipeSerializer(recipes[recipe_id]).data,
+            }
+            for recipe_id, coverage, missing in ranked
+            if recipe_id in recipes
+        ]
+
+        return Response(results, status=status.HTTP_200_OK)
+
+    @action(methods=['POST'], detail=True)
+    def links(self, request, pk=None):
+        """
+        recipe 의 tags, ingredients 를 전체 목록 없이 추가/삭제
+
+        {"add": {"tags": [1, 2]}, "remove": {"ingredients": [3]}}
+        """
+        recipe = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        apply_link_changes(
+            [recipe.id],
+            add=serializer.validated_data.get('add'),
+            remove=serializer.validated_data.get('remove'),
+        )
+
+        return Response(RecipeSerializer(recipe).data, status=status.HTTP_200_OK)
+
+    @action(methods=['POST'], detail=False, url_path='bulk-links')
+    def bulk_links(self, request):
+        """
+        여러 recipe 에 같은 tags, ingredients 추가/삭제를 한 번에 적용
+
+        {"recipes": [1, 2, 3], "add": {"tags": [4]}}
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        added, removed = apply_link_changes(
+            serializer.validated_data['recipes'],
+            add=serializer.validated_data.get('add'),
+            remove=serializer.validated_data.get('remove'),
+        )
+
+        return Response({
+            'recipes': len(serializer.validated_data['recipes']),
+            'added': added,
+            'removed': removed,
+        }, status=status.HTTP_200_OK)
+
+    @action(methods=['POST'], detail=False, url_path='bulk-delete')
+    def bulk_delete(self, request):
+        """
+        여러 recipe 를 한 번에 삭제, DELETION_BATCH_SIZE 개씩 나누어 삭제
+
+        {"recipes": [1, 2, 3]}
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        deleted = delete_in_batches(
+            Recipe.objects.filter(user=request.user, id__in=serializer.validated_data['recipes'])
+        )
+
+        return Response({'deleted': deleted}, status=status.HTTP_200_OK)
+
+
+class SyncView(UserShardMixin, APIView):
+    """
+    마지막 동기화 이후 생성, 수정, 삭제된 recipe, tag, ingredient 만 반환
+
+    GET /api/recipe/sync/?since=<cursor>
+    since 가 없으면 전체 목록을 반환하고, 응답의 cursor 를 다음 요청의 since 로 사용.
+    커밋이 늦게 끝난 변경을 놓치지 않도록 SYNC_CURSOR_OVERLAP 만큼 겹쳐서 조회하므로
+    클라이언트는 id 기준으로 덮어쓰기(upsert) 해야 한다.
+    """
+    authentication_classes = (TokenAuthentication, SignedTokenAuthentication)
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request, *args, **kwargs):
+        now = timezone.now()
+        since = self._parse_cursor(request.query_params.get('since'))
+        user = request.user
+
+        recipes = Recipe.objects.filter(user=user).prefetch_related('tags', 'ingredients')
+        tags = Tag.objects.filter(user=user)
+        ingredients = Ingredient.objects.filter(user=user)
+        deleted = {Tombstone.RECIPE: [], Tombstone.TAG: [], Tombstone.INGREDIENT: []}
+
+        if since is not None:
+            # (user, updated_at), (user, deleted_at) 인덱스의 범위 검색
+            since -= timedelta(seconds=settings.SYNC_CURSOR_OVERLAP)
+            recipes = recipes.filter(updated_at__gt=since)
+            tags = tags.filter(updated_at__gt=since)
+            ingredients = ingredients.filter(updated_at__gt=since)
+            tombstones = Tombstone.objects.filter(user=user, deleted_at__gt=since) \
+                .values_list('model', 'object_id')
+            for model, object_id in tombstones:
+                deleted[model].append(object_id)
+
+        return Response({
+            'cursor': self._make_cursor(now),
+            'recipes': RecipeSerializer(recipes, many=True).data,
+            'tags': TagSerializer(tags, many=True).data,
+            'ingredients': IngredientSerializer(ingredients, many=True).data,
+            'deleted': deleted,
+        })
+
+    def _make_cursor(self, value):
+        """시각을 microsecond 단위의 정수 문자열 cursor 로 변환"""
+        return str(int(value.timestamp() * 1000000))
+
+    def _parse_cursor(self, cursor):
+        if not cursor:
+            return None
+        try:
+            return datetime.fromtimestamp(int(cursor) / 1000000, tz=timezone.utc)
+        except (ValueError, OverflowError, OSError):
+            raise ValidationError({'since': 'cursor 형식이 올바르지 않습니다.'})
+
+
+class EventStreamView(APIView):
+    """
+    유저의 recipe, tag, ingredient 변경을 Server-Sent Events 로 보냄
+
+    GET /api/recipe/events/ (Accept: text/event-stream)
+    이벤트의 data 는 {"model", "action", "id"} 이고, 다시 연결할 때 마지막 id 를 Last-Event-ID 로 보낸다.
+    reset 이벤트를 받으면 놓친 이벤트가 있으므로 sync API 로 다시 맞춘다.
+    스트림은 DB 연결 없이 캐시만 확인하지만 연결마다 worker thread 를 잡고 있으므로
+    프로세스의 연결 수가 SSE_MAX_SUBSCRIBERS 이면 503 과 Retry-After 로 거절한다.
+    """
+    authentication_classes = (TokenAuthentication, SignedTokenAuthentication)
+    permission_classes = (IsAuthenticated,)
+    renderer_classes = (EventStreamRenderer, FastJSONRenderer)
+
+    def get(self, request, *args, **kwargs):
+        last_id = request.META.get('HTTP_LAST_EVENT_ID') or request.query_params.get('last_event_id')
+        try:
+            last_id = int(last_id) if last_id else None
+        except ValueError:
+            raise ValidationError({'last_event_id': '이벤트 id 형식이 올바르지 않습니다.'})
+
+        response = StreamingHttpResponse(events.subscribe(request.user.pk, last_id), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # nginx 등 proxy 가 스트림을 버퍼링하지 않도록 함
+        response['X-Accel-Buffering'] = 'no'
+
+        return response
+
+
+class StatsView(UserShardMixin, APIView):
+    """
+    유저의 recipe 수, price / time_minutes 평균, 백분위, 분포를 반환
+
+    recipe 가 저장, 삭제될 때 갱신되는 요약 행과 히스토그램 버킷만 읽으므로
+    recipe 수와 관계없이 일정한 시간에 응답한다. 백분위는 버킷 안을 보간한 근사값
+    """
+    authentication_classes = (TokenAuthentication, SignedTokenAuthentication)
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request, *args, **kwargs):
+        return Response(stats.summarize(request.user.pk))
@@ -0,0 +1,153 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.cache import cache
+from django.db import router
+from django.db.models import F
+from django.utils.translation import ugettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+
+ACCESS = 'access'
+REFRESH = 'refresh'
+
+TOKEN_SALT = 'user.signed-token'
+GENERATION_CACHE_KEY = 'user:token-generation:{}'
+
+
+def _generation_cache_key(user_id):
+    return GENERATION_CACHE_KEY.format(user_id)
+
+
+def get_token_generation(user_id):
+    """
+    유저의 토큰 세대 번호를 반환
+
+    캐시에 있으면 DB 를 조회하지 않고, 없을 경우에만 DB 에서 읽어 캐시에 저장
+    """
+    key = _generation_cache_key(user_id)
+    generation = cache.get(key)
+    if generation is None:
+        generation = get_user_model().objects.filter(pk=user_id) \
+            .values_list('token_generation', flat=True).first()
+        if generation is None:
+            return None
+        cache.set(key, generation, settings.SIGNED_TOKEN_GENERATION_CACHE_TIMEOUT)
+
+    return generation
+
+
+def revoke_tokens(user):
+    """세대 번호를 증가시켜 유저에게 발급된 모든 서명 토큰을 무효화"""
+    model = get_user_model()
+    model.objects.filter(pk=user.pk).update(token_generation=F('token_generation') + 1)
+    user.token_generation = model.objects.filter(pk=user.pk) \
+        .values_list('token_generation', flat=True).get()
+    cache.set(
+        _generation_cache_key(user.pk),
+        user.token_generation,
+        settings.SIGNED_TOKEN_GENERATION_CACHE_TIMEOUT,
+    )
+
+
+def _make_token(user, token_type, lifetime):
+    payload = {
+        'uid': user.pk,
+        'gen': user.token_generation,
+        'typ': token_type,
+        'exp': int(time.time()) + lifetime,
+    }
+    return signing.dumps(payload, salt=TOKEN_SALT)
+
+
+def issue_token_pair(user):
+    """유저에게 수명이 짧은 access 토큰과 refresh 토큰을 발급"""
+    return {
+        'access': _make_token(user, ACCESS, settings.SIGNED_TOKEN_ACCESS_LIFETIME),
+        'refresh': _make_token(user, REFRESH, settings.SIGNED_TOKEN_REFRESH_LIFETIME),
+        'expires_in': settings.SIGNED_TOKEN_ACCESS_LIFETIME,
+    }
+
+
+def decode_token(token, token_type):
+    """
+    서명, 토큰 종류, 만료 시간을 확인하고 payload 를 반환
+
+    유효하지 않은 토큰이면 AuthenticationFailed 를 발생
+    """
+    try:
+        payload = signing.loads(token, salt=TOKEN_SALT)
+    except signing.BadSignature:
+        raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+    if payload.get('typ') != token_type:
+        raise exceptions.AuthenticationFailed(_('Invalid token.'))
+    if payload.get('exp', 0) < time.time():
+        raise exceptions.AuthenticationFailed(_('Token has expired.'))
+
+    return payload
+
+
+def user_from_refresh_token(token):
+    """refresh 토큰의 유저를 DB 에서 조회하여 세대 번호와 활성 상태까지 확인"""
+    payload = decode_token(token, REFRESH)
+    try:
+        user = get_user_model().objects.get(pk=payload['uid'])
+    except get_user_model().DoesNotExist:
+        raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+    if not user.is_active:
+        raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+    if user.token_generation != payload['gen']:
+        raise exceptions.AuthenticationFailed(_('Token has been revoked.'))
+
+    return user
+
+
+class SignedTokenAuthentication(BaseAuthentication):
+    """
+    서명된 access 토큰 인증
+
+    Authorization: Bearer <access token>
+
+    서명 확인과 캐시된 세대 번호 비교만으로 인증하고, 유저 테이블은 조회하지 않는다.
+    request.user 는 id 만 채워진 인스턴스이며, 다른 필드는 처음 접근할 때 DB 에서 읽는다.
+    """
+    keyword = 'Bearer'
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+
+        if len(auth) != 2:
+            msg = _('Invalid token header.')
+            raise exceptions.AuthenticationFailed(msg)
+
+        try:
+            token = auth[1].decode()
+        except UnicodeError:
+            msg = _('Invalid token header. Token string should not contain invalid characters.')
+            raise exceptions.AuthenticationFailed(msg)
+
+        return self.authenticate_credentials(token)
+
+    def authenticate_credentials(self, token):
+        payload = decode_token(token, ACCESS)
+
+        generation = get_token_generation(payload['uid'])
+        if generation is None:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        if generation != payload['gen']:
+            raise exceptions.AuthenticationFailed(_('Token has been revoked.'))
+
+        model = get_user_model()
+        user = model.from_db(router.db_for_read(model), ['id'], [payload['uid']])
+
+        return (user, token)
+
+    def authenticate_header(self, request):
+        return self.keyword
@@ -1,7 +1,9 @@
 from django.contrib.auth import get_user_model, authenticate
 
 from django.utils.translation import ugettext_lazy as _
-from rest_framework import serializers
+from rest_framework import exceptions, serializers
+
+from .authentication import revoke_tokens, user_from_refresh_token
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -27,6 +29,8 @@ class UserSerializer(serializers.ModelSerializer):
         if password:
             user.set_password(password)
             user.save()
+            # 비밀번호가 바뀌면 이전에 발급된 서명 토큰은 사용할 수 없음
+            revoke_tokens(user)
 
         return user
 
@@ -58,3 +62,17 @@ class AuthTokenSerializer(serializers.Serializer):
         attrs['user'] = user
 
         return attrs
+
+
+class RefreshTokenSerializer(serializers.Serializer):
+    """refresh 토큰 검증 직렬화(Serializer)"""
+    refresh = serializers.CharField(trim_whitespace=False)
+
+    def validate(self, attrs):
+        """refresh 토큰을 확인하고 토큰의 유저를 attrs 에 추가"""
+        try:
+            attrs['user'] = user_from_refresh_token(attrs['refresh'])
+        except exceptions.AuthenticationFailed as exc:
+            raise serializers.ValidationError(exc.detail, code='authorization')
+
+        return attrs
@@ -0,0 +1,118 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag
+from user.tests.authentication import issue_token_pair, revoke_tokens
+
+
+SIGNED_TOKEN_URL = reverse('user:token-signed')
+REFRESH_TOKEN_URL = reverse('user:token-refresh')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+class SignedTokenApiTests(TestCase):
+    """서명된 access / refresh 토큰 테스트"""
+
+    def setUp(self):
+        cache.clear()
+        # 유저 테이블 조회 여부를 default 의 쿼리 수로 확인하므로 유저의 데이터도 default 에 둠
+        self.user = get_user_model().objects.create_user(
+            'test@master.com',
+            'pass1234',
+            shard='default',
+        )
+        self.client = APIClient()
+
+    def test_create_signed_token(self):
+        """이메일, 비밀번호로 access / refresh 토큰이 발급되는지 테스트"""
+        res = self.client.post(SIGNED_TOKEN_URL, {'email': 'test@master.com', 'password': 'pass1234'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('access', res.data)
+        self.assertIn('refresh', res.data)
+
+    def test_create_signed_token_invalid_credentials(self):
+        """비밀번호가 틀리면 토큰이 발급되지 않아야 함"""
+        res = self.client.post(SIGNED_TOKEN_URL, {'email': 'test@master.com', 'password': 'wrong'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertNotIn('access', res.data)
+
+    def test_access_token_authenticates_without_user_lookup(self):
+        """access 토큰으로 인증할 때 유저 테이블을 조회하지 않는지 테스트"""
+        Tag.objects.create(user=self.user, name='Vegan')
+        tokens = issue_token_pair(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + tokens['access'])
+        # 처음 요청에서 세대 번호가 캐시에 저장 됨
+        self.client.get(TAGS_URL)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data[0]['name'], 'Vegan')
+
+    def test_invalid_access_token(self):
+        """서명이 맞지 않는 토큰은 401 을 반환"""
+        tokens = issue_token_pair(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + tokens['access'] + 'x')
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_expired_access_token(self):
+        """만료된 access 토큰은 401 을 반환"""
+        tokens = issue_token_pair(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + tokens['access'])
+
+        with patch('time.time', return_value=10 ** 11):
+            res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_token_rejected_as_access_token(self):
+        """refresh 토큰으로는 API 인증을 할 수 없어야 함"""
+        tokens = issue_token_pair(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + tokens['refresh'])
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_revoked_access_token(self):
+        """세대 번호가 바뀌면 기존 access 토큰은 사용할 수 없음"""
+        tokens = issue_token_pair(self.user)
+        revoke_tokens(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + tokens['access'])
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_token(self):
+        """refresh 토큰으로 새로운 토큰이 발급되는지 테스트"""
+        tokens = issue_token_pair(self.user)
+
+        res = self.client.post(REFRESH_TOKEN_URL, {'refresh': tokens['refresh']})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + res.data['access'])
+        self.assertEqual(self.client.get(TAGS_URL).status_code, status.HTTP_200_OK)
+
+    def test_refresh_token_revoked_by_password_change(self):
+        """비밀번호를 변경하면 refresh 토큰도 사용할 수 없음"""
+        tokens = issue_token_pair(self.user)
+        self.client.force_authenticate(self.user)
+        self.client.patch(reverse('user:me'), {'password': 'newpass123'})
+        self.client.force_authenticate(None)
+
+        res = self.client.post(REFRESH_TOKEN_URL, {'refresh': tokens['refresh']})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
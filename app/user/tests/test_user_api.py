@@ -1,10 +1,13 @@
 from django.test import TestCase
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.urls import reverse
 
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from core.models import DeletionJob
+
 
 CREATE_USER_URL = reverse('user:create')
 TOKEN_URL = reverse('user:token')
@@ -20,6 +23,8 @@ class PublicUserApiTests(TestCase):
     """user API 테스트(public)"""
 
     def setUp(self):
+        # 토큰 발급의 throttle 상태를 초기화
+        cache.clear()
         self.client = APIClient()
 
     def test_create_valid_user_success(self):
@@ -133,3 +138,13 @@ class PrivateUserApiTests(TestCase):
         self.assertEqual(self.user.name, payload['name'])
         self.assertTrue(self.user.check_password(payload['password']))
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_delete_user_schedules_deletion(self):
+        """DELETE 는 계정을 바로 비활성화하고 삭제 작업을 등록"""
+        res = self.client.delete(ME_URL)
+
+        self.user.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(res.data['status'], DeletionJob.PENDING)
+        self.assertFalse(self.user.is_active)
+        self.assertTrue(DeletionJob.objects.filter(user_id=self.user.id).exists())
@@ -1,8 +1,13 @@
-from rest_framework import generics, authentication, permissions
+from rest_framework import generics, authentication, permissions, status
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
+from rest_framework.views import APIView
 
-from .serializers import UserSerializer, AuthTokenSerializer
+from core.deletion import schedule_user_deletion
+from core.throttling import LoginRateThrottle
+from .authentication import issue_token_pair
+from .serializers import UserSerializer, AuthTokenSerializer, RefreshTokenSerializer
 
 
 class CreateUserView(generics.CreateAPIView):
@@ -14,9 +19,30 @@ class CreateTokenView(ObtainAuthToken):
     """유저에 대한 새로운 인증 토큰 생성"""
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    throttle_classes = (LoginRateThrottle,)
 
 
-class ManageUserView(generics.RetrieveUpdateAPIView):
+class CreateSignedTokenView(APIView):
+    """유저에 대한 서명된 access / refresh 토큰 발급"""
+    serializer_class = AuthTokenSerializer
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    throttle_classes = (LoginRateThrottle,)
+    authentication_classes = ()
+    permission_classes = ()
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.serializer_class(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+
+        return Response(issue_token_pair(serializer.validated_data['user']))
+
+
+class RefreshSignedTokenView(CreateSignedTokenView):
+    """refresh 토큰으로 새로운 토큰 발급"""
+    serializer_class = RefreshTokenSerializer
+
+
+class ManageUserView(generics.RetrieveUpdateDestroyAPIView):
     """인증 된 유저의 관리"""
     serializer_class = UserSerializer
     authentication_classes = (authentication.TokenAuthentication,)
@@ -25,3 +51,9 @@ class ManageUserView(generics.RetrieveUpdateAPIView):
     def get_object(self):
         """객체가 호출될 때 사용자에게 연결"""
         return self.request.user
+
+    def destroy(self, request, *args, **kwargs):
+        """계정을 바로 비활성화하고, 데이터는 삭제 작업에서 나누어 삭제"""
+        job = schedule_user_deletion(self.get_object())
+
+        return Response({'status': job.status}, status=status.HTTP_202_ACCEPTED)